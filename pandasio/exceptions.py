@@ -12,3 +12,11 @@ class DataWrongShapeError(ValueError):
 
 class IdentifierByteRepresentationError(ValueError):
     pass
+
+
+class FileLayoutNotSupportedError(ValueError):
+    pass
+
+
+class ChecksumMismatchError(ValueError):
+    pass
@@ -1,16 +1,47 @@
-from numpy import array, uint16, dtype, uint8, uint32, fromfile, frombuffer
+from numpy import array, uint16, dtype, uint8, uint32, uint64, int64, fromfile, frombuffer, zeros, concatenate,\
+    isnan, isnat, count_nonzero, amin, amax, nan, cumsum, searchsorted, datetime_data, argmin, argmax, packbits,\
+    unpackbits, full, iinfo, asarray, ones, may_share_memory, errstate, isfinite, can_cast, array_equal
+from numpy.ma import MaskedArray, getmaskarray, getdata, concatenate as masked_concatenate
 from collections import namedtuple
+from zlib import crc32
 from typing import Union
 from pandasio.utils.numpy_utils import get_numpy_type, get_type_char_char,\
-    get_type_char_int, NumpyTypeChars
-from pandasio.utils.numpy_compression import round_array_returning_integers, compress_array, decompress_array
-from pandasio.utils.exceptions import DataSizeNotPositiveError, NumBytesForStringInvalidError
-from pandasio.exceptions import IdentifierByteRepresentationError
+    get_type_char_int, NumpyTypeChars, encode_utf8_strings, decode_utf8_strings
+from pandasio.utils.numpy_compression import round_array_returning_integers, compress_array, decompress_array,\
+    CompressionResult, get_accumulation_dtype, COMPRESSION_MODES, dictionary_encode_array, get_dictionary_codes_dtype,\
+    COMPRESSION_MODE_AUTO, select_compression_mode, detect_decimal_precision, round_trips_after_rounding,\
+    get_arithmetic_sequence_step, arithmetic_sequence, round_trips_after_compression
+from pandasio.utils.block_compression import block_compress, block_decompress, validate_block_compression,\
+    BLOCK_COMPRESSION_CODECS, BLOCK_COMPRESSION_SHUFFLES
+from pandasio.utils.datetime_utils import compress_time_delta_array, get_unit_data, get_units_from_dtype
+from pandasio.utils.exceptions import DataSizeNotPositiveError, NumBytesForStringInvalidError,\
+    CompressionModeInvalidError
+from pandasio.exceptions import IdentifierByteRepresentationError, DataWrongShapeError
 
 
 ByteResultTuple = namedtuple('ByteResultTuple', ['num_bytes', 'byte_code'])
+SegmentStatistics = namedtuple('SegmentStatistics', ['min_value', 'max_value', 'null_count'])
 _COMPRESSION_MODE_ELEMENT_WISE = 'e'
+_COMPRESSION_MODE_MINIMUM = 'm'
+_COMPRESSION_MODE_BIT_PACKED = 'b'
+_COMPRESSION_MODE_DELTA_OF_DELTA = 'd'
+_COMPRESSION_MODE_RUN_LENGTH = 'r'
+_COMPRESSION_MODE_XOR = 'x'
+_COMPRESSION_MODE_ARITHMETIC_SEQUENCE = 's'
+NUM_POINTS_PER_PREFIX_SUM_BLOCK = 1 << 20
 NUM_BYTES_PER_DEFINITION_WITHOUT_IDENTIFIER = 40
+NUM_BYTES_SEGMENT_STATISTIC = 8
+SEGMENT_INFO_DTYPE = dtype([
+    ('num_points', uint32),
+    ('offset', uint64),
+    ('num_bytes', uint64),
+    ('null_count', uint32),
+    ('min_value', uint8, (NUM_BYTES_SEGMENT_STATISTIC,)),
+    ('max_value', uint8, (NUM_BYTES_SEGMENT_STATISTIC,)),
+    ('options', uint16),
+    ('bytes_extra_information', uint32),
+    ('details', uint8, (32,))
+])
 
 
 def _get_panda_bar_info_dtype(num_bytes_for_identifier: int) -> dtype:
@@ -73,11 +104,17 @@ class _PandaBar:
         self._identifier = identifier
         self._bytes_per_value = bytes_per_value
         self._type_char = get_type_char_char(type_char)
-        self._dtype = get_numpy_type(self._type_char, 8*self._bytes_per_value)
+        if self._is_string():
+            # strings are variable-length, bytes_per_value is the size of one character
+            self._bytes_per_value = dtype(self._type_char + '1').itemsize
+            self._dtype = dtype(self._type_char)
+        else:
+            self._dtype = get_numpy_type(self._type_char, 8*self._bytes_per_value)
         self._is_index = is_index
 
         self._data = None  # numpy array
         self._encoded_data = None  # numpy array
+        self._slice_carry = {}  # running sums left by data_slice_from_file, see _running_sum_slice
 
         # other metrics used as helpers
         self._num_points = None
@@ -86,18 +123,66 @@ class _PandaBar:
         self._use_compression = True
         self._use_hash_table = False
         self._use_floating_point_rounding = False
+        self._use_segments = False
 
         # compression options
+        self._auto_compression = False
         self._compression_dtype = None
         self._compression_mode = None
         self._compression_reference_value = None
         self._compression_reference_value_dtype = None
+        self._compression_bit_width = None
+        self._compression_secondary_reference_value = None
+        self._compression_run_length_dtype = None
+        self._compression_num_runs = None
+        self._compression_num_bytes = None
+        # True when _encode_data stored the data uncompressed only because compressing it could not help,
+        # compression is turned back on for the next encode
+        self._compression_is_skipped = False
 
         # floating point rounding
         self._floating_point_rounding_num_decimals = None
+        # True when the rounding was detected from the data or read from file rather than asked for, it is then
+        # dropped with the data it was detected on, see detect_floating_point_rounding
+        self._floating_point_rounding_is_detected = False
+
+        # datetime64/timedelta64 units, the data is stored as int64 counts of the storage units
+        self._time_units = None
+        self._time_storage_units = None
+
+        # strings, stored as the offsets of each string (encoded like integers) followed by the UTF-8 bytes
+        self._string_bytes = None  # numpy uint8 array
+        self._string_num_bytes = None
+
+        # validity bitmap, True for the rows holding a value. float and time bars keep their nulls as NaN/NaT
+        # in memory and only get a bitmap on encode; the other bars keep it here. None when no row is null
+        self._use_validity = False
+        self._validity = None  # numpy bool array
+        self._num_valid_points = None
+
+        # general-purpose codec the encoded bytes go through last, see set_block_compression
+        self._use_block_compression = False
+        self._block_compression_codec = None
+        self._block_compression_shuffle = None
+        self._block_compression_num_bytes = None
+
+        # CRC32 of the data bytes as stored in the file, see set_checksums
+        self._use_checksum = False
+        self._checksum = None
+
+        # dictionary (hash table) encoding, the distinct values the encoded codes index into
+        self._dictionary = None
+
+        # segments (row groups), each a _PandaBar encoding its own run of rows
+        self._segment_size = None
+        self._segments = None
+        self._segment_statistics = None
+        self._segment_offsets = None
+        self._num_bytes_segments = None
 
         # additional information that may be needed to detail options
         self._num_bytes_extra_information = 0 if num_extra_bytes_required is None else num_extra_bytes_required
+        self._extra_information = b''
 
         if options is not None:
             self._decode_options(options)
@@ -124,12 +209,12 @@ class _PandaBar:
         )
         bars = [
             _PandaBar(
-                b['identifier'],
+                str(b['identifier']),
                 b['bytes_per_point'],
                 b['type_char'],
                 options=b['options'],
                 num_extra_bytes_required=b['bytes_extra_information'],
-                details_bytes=b''.join([b['def_byte_{}'.format(i + 1)] for i in range(0, 32)])
+                details_bytes=b''.join([b['def_byte_{}'.format(i + 1)].tobytes() for i in range(0, 32)])
             )
             for b in raw_bars
         ]
@@ -142,8 +227,14 @@ class _PandaBar:
         # :param identifier_is_string: boolean indicating whether to cast identifier to string
         :return: named tuple of ByteResultTuple
         """
+        # encoding may turn off compression, so it must happen before the options are encoded
+        self._encode_data()
+        self._extra_information = self._encode_extra_information()
+        self._num_bytes_extra_information = len(self._extra_information)
+
         option_integer = self._encode_options()
         encode_id = self._identifier
+        details_bytes = self._encode_details_bytes()
         info = array(
             [(
                 encode_id,
@@ -151,16 +242,12 @@ class _PandaBar:
                 self._bytes_per_value,
                 get_type_char_int(self._type_char),
                 self._num_bytes_extra_information
-            )],
+            ) + tuple(details_bytes)],
             dtype=_get_panda_bar_info_dtype(
                 num_bytes_for_identifier
             )
         )
-
-        self._encode_data()
-
-        details_bytes = self._encode_details_bytes()
-        ret_bytes = info.tobytes() + details_bytes
+        ret_bytes = info.tobytes()
         return ByteResultTuple(num_bytes=len(ret_bytes), byte_code=ret_bytes)
 
     def data_to_file(self, file_handle) -> int:
@@ -170,9 +257,79 @@ class _PandaBar:
         :return: int number of bytes written
         """
         self._encode_data()
+        if self._use_segments:
+            return sum([c.data_to_file(file_handle) for c in self._segments])
         self._encoded_data.tofile(file_handle)
         return self._encoded_data.nbytes
 
+    def release_encoded_data(self):
+        """
+        Drops the encoded copy of the data once it has been written, if the decoded data is still held
+        :return: None
+        """
+        if self._data is not None:
+            self._encoded_data = None
+            self._segments = None
+        return
+
+    def copy_from_buffer(self, buffer):
+        """
+        Copies the encoded and decoded data that are views into buffer, see data_from_buffer, so the bar no longer
+        needs it, e.g. before the file mapped by buffer is rewritten
+        :param buffer: buffer the data was read from
+        :return: None
+        """
+        if self._use_segments and self._segments is not None:
+            for c in self._segments:
+                c.copy_from_buffer(buffer)
+        if self._encoded_data is not None and may_share_memory(self._encoded_data, buffer):
+            self._encoded_data = array(self._encoded_data)
+        if self._data is not None and may_share_memory(self._data, buffer):
+            self._data = array(self._data)
+        return
+
+    def extra_information(self) -> bytes:
+        """
+        :return: the extra information bytes that go with the bar definition, as of the last encode_info
+        """
+        return self._extra_information
+
+    def decode_extra_information(self, from_bytes: bytes):
+        """
+        Decodes the extra information bytes that follow the bar definitions
+        :param from_bytes: the num_extra_bytes_required() bytes belonging to this bar
+        :return: None, populates class internals
+        """
+        self._extra_information = from_bytes
+        counter = 0
+        if self._use_segments:
+            counter += self._decode_segment_table(from_bytes[counter:])
+            return
+        if self._use_hash_table:
+            counter += self._decode_dictionary(from_bytes[counter:])
+        if self._use_compression and self._compression_mode == _COMPRESSION_MODE_RUN_LENGTH:
+            self._compression_num_runs = int(frombuffer(from_bytes, dtype=uint32, count=1, offset=counter)[0])
+            counter += 4
+        if self._use_compression and self._compression_mode == _COMPRESSION_MODE_XOR:
+            self._compression_num_bytes = int(frombuffer(from_bytes, dtype=uint64, count=1, offset=counter)[0])
+            counter += 8
+        if self._uses_string_offsets():
+            self._string_num_bytes = int(frombuffer(from_bytes, dtype=uint64, count=1, offset=counter)[0])
+            counter += 8
+        if self._use_validity:
+            counter += self._decode_validity(from_bytes[counter:])
+        if self._use_block_compression:
+            codec, shuffle = frombuffer(from_bytes, dtype=uint8, count=2, offset=counter)
+            self._block_compression_codec = BLOCK_COMPRESSION_CODECS[codec]
+            self._block_compression_shuffle = BLOCK_COMPRESSION_SHUFFLES[shuffle]
+            counter += 2
+            self._block_compression_num_bytes = int(frombuffer(from_bytes, dtype=uint64, count=1, offset=counter)[0])
+            counter += 8
+        if self._use_checksum:
+            self._checksum = int(frombuffer(from_bytes, dtype=uint32, count=1, offset=counter)[0])
+            counter += 4
+        return
+
     def data_from_file(self, file_handle, num_points: int) -> int:
         """
         reads the encoded data from the file handle
@@ -180,40 +337,596 @@ class _PandaBar:
         :param num_points: number of points that are in the PandaCage storage
         :return: integer, number of bytes read from the file
         """
+        if self._use_segments:
+            base_offset = file_handle.tell()
+            read_bytes = 0
+            for c, offset in zip(self._segments, self._segment_offsets):
+                file_handle.seek(base_offset + offset)
+                read_bytes += c.data_from_file(file_handle, c.num_points())
+            self._data = None
+            return read_bytes
         self._num_points = num_points
-        read_num_points = num_points
-        read_dtype = self._dtype
-        if self._use_compression:
-            read_dtype = self._compression_dtype
-            if _COMPRESSION_MODE_ELEMENT_WISE in self._compression_mode:
-                read_num_points -= 1
+        read_dtype, read_num_points = self._stored_dtype_and_count(num_points)
         self._encoded_data = fromfile(
             file_handle,
             read_dtype,
             count=read_num_points
         )
+        self._data = None
         return self._encoded_data.nbytes
 
-    def set_data(self, data: array):
+    def data_from_buffer(self, buffer, offset: int, num_points: int) -> int:
+        """
+        points the encoded data at a region of a buffer (e.g. a numpy memmap) without copying it
+        :param buffer: object exposing the buffer protocol holding the whole file
+        :param offset: byte offset of this bar's data within the buffer
+        :param num_points: number of points that are in the PandaCage storage
+        :return: integer, number of bytes spanned by the encoded data
+        """
+        if self._use_segments:
+            read_bytes = 0
+            for c, segment_offset in zip(self._segments, self._segment_offsets):
+                read_bytes += c.data_from_buffer(buffer, offset + segment_offset, c.num_points())
+            self._data = None
+            return read_bytes
+        self._num_points = num_points
+        read_dtype, read_num_points = self._stored_dtype_and_count(num_points)
+        self._encoded_data = frombuffer(
+            buffer,
+            dtype=read_dtype,
+            count=read_num_points,
+            offset=offset
+        )
+        self._data = None
+        return self._encoded_data.nbytes
+
+    def data_slice_from_file(self, file_handle, data_offset: int, num_points: int, start: int, stop: int) -> array:
+        """
+        reads and decodes rows [start, stop) without reading the rest of the data.
+        'm' and 'b' mode and uncompressed data seek straight to the rows, 's' mode generates them without reading
+        anything. 'e' mode needs the running sum of the differences before start: consecutive slices carry it
+        along, otherwise it is summed from the reference value block by block. 'd' mode does the same twice, once
+        for the differences and once for the values. 'r' mode reads the runs and expands the ones overlapping the
+        rows. 'x' mode decodes the whole run on the first slice and keeps it for the next ones; use row groups to
+        bound its memory. String bars read the offsets of the rows this way, then only the bytes between them.
+        Block compressed bars, see set_block_compression, are decoded whole like 'x' mode.
+        Bars with a validity bitmap read only the values of the valid rows, see get_data for how nulls come back.
+        :param file_handle: handle in 'rb' mode
+        :param data_offset: byte offset of this bar's data in the file
+        :param num_points: number of points that are in the PandaCage storage
+        :param start: first row to read
+        :param stop: row after the last row to read
+        :return: numpy array with the decoded rows
+        """
+        if self._use_segments:
+            pieces = [zeros(0, dtype=self._dtype)]
+            segment_start = 0
+            for c, offset in zip(self._segments, self._segment_offsets):
+                segment_stop = segment_start + c.num_points()
+                if segment_stop > start and segment_start < stop:
+                    pieces.append(c.data_slice_from_file(
+                        file_handle,
+                        data_offset + offset,
+                        c.num_points(),
+                        max(start, segment_start) - segment_start,
+                        min(stop, segment_stop) - segment_start
+                    ))
+                segment_start = segment_stop
+            if any([isinstance(p, MaskedArray) for p in pieces]):
+                return masked_concatenate(pieces)
+            return concatenate(pieces)
+        if stop <= start:
+            return zeros(0, dtype=self._dtype)
+
+        self._num_points = num_points
+        if self._use_block_compression:
+            return self._whole_run_slice_from_file(file_handle, data_offset, num_points, start, stop)
+        validity = None
+        if self._use_validity:
+            # only the valid rows are stored, so the rows map onto the values between their valid counts
+            validity = self._validity[start:stop]
+            start = count_nonzero(self._validity[:start])
+            stop = start + count_nonzero(validity)
+            num_points = self._num_valid_points
+        if stop <= start:
+            values = zeros(0, dtype=self._dtype)
+        elif not self._uses_string_offsets():
+            values = self._values_slice_from_file(file_handle, data_offset, num_points, start, stop)
+        else:
+            # the offsets of the strings, then the bytes between the first and the last of them
+            offsets = self._values_slice_from_file(file_handle, data_offset, num_points + 1, start, stop + 1)
+            offsets_dtype, offsets_count = self._encoded_values_dtype_and_count(num_points + 1)
+            string_bytes = self._read_encoded_slice(
+                file_handle,
+                data_offset + dtype(offsets_dtype).itemsize * offsets_count,
+                uint8,
+                int(offsets[0]),
+                int(offsets[-1])
+            )
+            values = decode_utf8_strings(offsets, string_bytes, self._type_char)
+        if validity is None:
+            return values
+        return self._mask_nulls(self._fill_nulls(values, validity), validity)
+
+    def _whole_run_slice_from_file(self, file_handle, data_offset: int, num_points: int, start: int,
+                                   stop: int) -> array:
+        """
+        reads and decodes rows [start, stop) by decoding all the rows on the first slice and keeping them
+        for the next ones. see data_slice_from_file
+        :param file_handle: handle in 'rb' mode
+        :param data_offset: byte offset of this bar's data in the file
+        :param num_points: number of points that are in the PandaCage storage
+        :param start: first row to read
+        :param stop: row after the last row to read
+        :return: numpy array with the decoded rows
+        """
+        rows = self._slice_carry.get('rows')
+        if rows is None or rows[0] != data_offset:
+            file_handle.seek(data_offset)
+            self.data_from_file(file_handle, num_points)
+            self._decode_data()
+            rows = (data_offset, self._data)
+            self._slice_carry['rows'] = rows
+            self._encoded_data = None
+            self._data = None
+        return self._mask_nulls(rows[1][start:stop], None if self._validity is None else self._validity[start:stop])
+
+    def _values_slice_from_file(self, file_handle, data_offset: int, num_points: int, start: int, stop: int) -> array:
+        """
+        reads and decodes values [start, stop) of a single run of encoded values, the offsets for a string bar.
+        see data_slice_from_file
+        :param file_handle: handle in 'rb' mode
+        :param data_offset: byte offset of the encoded values in the file
+        :param num_points: number of values
+        :param start: first value to read
+        :param stop: value after the last value to read
+        :return: numpy array with the decoded values
+        """
+        read_dtype, _ = self._encoded_values_dtype_and_count(num_points)
+        if not self._use_compression or self._compression_mode == _COMPRESSION_MODE_MINIMUM:
+            values = self._read_encoded_slice(file_handle, data_offset, read_dtype, start, stop)
+        elif self._compression_mode == _COMPRESSION_MODE_ARITHMETIC_SEQUENCE:
+            values = arithmetic_sequence(
+                self._compression_reference_value,
+                self._compression_secondary_reference_value,
+                start,
+                stop
+            )
+            return self._finish_decoding(values)
+        elif self._compression_mode == _COMPRESSION_MODE_BIT_PACKED:
+            first_bit = start * self._compression_bit_width
+            packed = self._read_encoded_slice(
+                file_handle,
+                data_offset,
+                read_dtype,
+                first_bit // 8,
+                (stop * self._compression_bit_width + 7) // 8
+            )
+            values = decompress_array(
+                packed,
+                self._compression_mode,
+                self._compression_reference_value,
+                bit_width=self._compression_bit_width,
+                num_points=stop - start,
+                bit_offset=first_bit % 8
+            )
+            return self._finish_decoding(values)
+        elif self._compression_mode == _COMPRESSION_MODE_RUN_LENGTH:
+            # the runs are few, read them all and keep the ones overlapping the rows
+            _, num_bytes = self._encoded_values_dtype_and_count(num_points)
+            run_values, run_lengths = self._split_runs(
+                self._read_encoded_slice(file_handle, data_offset, read_dtype, 0, num_bytes)
+            )
+            run_ends = cumsum(run_lengths, dtype=int64)
+            first_run = searchsorted(run_ends, start, side='right')
+            last_run = searchsorted(run_ends, stop - 1, side='right')
+            run_lengths = run_lengths[first_run:last_run + 1].astype(int64)
+            run_lengths[0] -= start - (run_ends[first_run] - run_lengths[0])
+            run_lengths[-1] -= run_ends[last_run] - stop
+            values = decompress_array(
+                run_values[first_run:last_run + 1],
+                self._compression_mode,
+                self._compression_reference_value,
+                run_lengths=run_lengths
+            )
+            return self._finish_decoding(values)
+        elif self._compression_mode == _COMPRESSION_MODE_XOR:
+            # each value depends on all the ones before it, so the whole run is decoded once and kept
+            decoded = self._slice_carry.get('decoded')
+            if decoded is None or decoded[0] != data_offset:
+                stream = self._read_encoded_slice(file_handle, data_offset, read_dtype, 0, self._compression_num_bytes)
+                decoded = (data_offset, decompress_array(
+                    stream,
+                    self._compression_mode,
+                    self._compression_reference_value,
+                    num_points=num_points
+                ))
+                self._slice_carry['decoded'] = decoded
+            return self._finish_decoding(decoded[1][start:stop])
+        elif self._compression_mode == _COMPRESSION_MODE_DELTA_OF_DELTA:
+            def read_differences(first: int, last: int) -> array:
+                return self._running_sum_slice(
+                    lambda a, b: self._read_encoded_slice(file_handle, data_offset, read_dtype, a, b),
+                    self._compression_secondary_reference_value,
+                    first,
+                    last,
+                    'differences'
+                )
+            values = self._running_sum_slice(read_differences, self._compression_reference_value, start, stop, 'values')
+            return self._finish_decoding(values)
+        else:  # element-wise differences
+            values = self._running_sum_slice(
+                lambda a, b: self._read_encoded_slice(file_handle, data_offset, read_dtype, a, b),
+                self._compression_reference_value,
+                start,
+                stop,
+                'values'
+            )
+            return self._finish_decoding(values)
+        if self._use_compression:
+            values = decompress_array(values, self._compression_mode, self._compression_reference_value)
+        return self._finish_decoding(values)
+
+    def _running_sum_slice(self, read_differences, reference_value, start: int, stop: int, carry_key: str) -> array:
+        """
+        gets rows [start, stop) of a run stored as a reference value and the differences between consecutive rows,
+        so the value of row i is the reference value plus the first i differences. The value of the row before
+        start is carried over from the previous slice when slices are consecutive, otherwise it is summed from
+        the reference value block by block
+        :param read_differences: function like (first, last) -> numpy array holding differences [first, last)
+        :param reference_value: value of the first row
+        :param start: first row to get
+        :param stop: row after the last row to get
+        :param carry_key: name the running sum is carried under between slices
+        :return: numpy array
+        """
+        if stop <= start:
+            return zeros(0, dtype=array(reference_value).dtype)
+        if start == 0:
+            values = decompress_array(read_differences(0, stop - 1), _COMPRESSION_MODE_ELEMENT_WISE, reference_value)
+        else:
+            carry = self._slice_carry.get(carry_key)
+            if carry is not None and carry[0] == start:
+                previous_value = carry[1]
+            else:
+                previous_value = reference_value
+                for block_start in range(0, start - 1, NUM_POINTS_PER_PREFIX_SUM_BLOCK):
+                    block = read_differences(block_start, min(block_start + NUM_POINTS_PER_PREFIX_SUM_BLOCK, start - 1))
+                    # unsigned differences, e.g. of dictionary codes, wrap around back into range like the array
+                    # sums do, where numpy does not warn about it
+                    with errstate(over='ignore'):
+                        previous_value = previous_value + block.sum(dtype=get_accumulation_dtype(block, previous_value))
+            differences = read_differences(start - 1, stop - 1)
+            values = cumsum(differences, dtype=get_accumulation_dtype(differences, previous_value)) + previous_value
+        self._slice_carry[carry_key] = (stop, values[-1])
+        return values
+
+    def _read_encoded_slice(self, file_handle, data_offset: int, read_dtype, start: int, stop: int) -> array:
+        """
+        reads encoded values [start, stop) of a bar stored as a single run of read_dtype values
+        :param file_handle: handle in 'rb' mode
+        :param data_offset: byte offset of this bar's data in the file
+        :param read_dtype: dtype of the encoded values
+        :param start: index of the first encoded value
+        :param stop: index after the last encoded value
+        :return: numpy array
+        """
+        file_handle.seek(data_offset + start * dtype(read_dtype).itemsize)
+        return fromfile(file_handle, read_dtype, count=stop - start)
+
+    def num_bytes_data(self, num_points: int) -> int:
+        """
+        computes the number of bytes the encoded data occupies in the file from the bar definition
+        :param num_points: number of points that are in the PandaCage storage
+        :return: integer, number of bytes
+        """
+        if self._use_segments:
+            return self._num_bytes_segments
+        read_dtype, read_num_points = self._stored_dtype_and_count(num_points)
+        return dtype(read_dtype).itemsize * read_num_points
+
+    def set_compression_mode(self, mode: str):
+        """
+        Sets how the data is compressed on write.
+        'm' stores differences from the minimum, narrowed to whole bytes. 'e' stores differences between
+        consecutive values, narrowed to whole bytes. 'b' bit-packs differences from the minimum at the
+        narrowest bit width that holds them; float bars fall back to 'm' unless they are rounded to integers.
+        'd' stores differences between consecutive differences, narrowed to whole bytes, which suits evenly
+        spaced index bars such as timestamps; float bars fall back to 'e' unless they are rounded to integers.
+        'r' stores each run of repeated values once with its length, which suits flags and labels that
+        change rarely. 'x' XORs the bits of each value with the previous one and keeps only the meaningful
+        bits, which suits slowly moving floats such as prices.
+        's' keeps only the start and step of data that is exactly start + i * step, such as a regular index,
+        a row counter or a constant, and writes no data bytes; other data falls back to 'm'. Bars left on the
+        default mode use 's' whenever their data allows it.
+        'a' picks one of these on every encode by trial-compressing a sample of the data, see
+        select_compression_mode, and compression_modes() tells which one was picked
+        :param mode: compression mode, one of 'm', 'e', 'b', 'd', 'r', 'x', 's' or 'a'
+        :return: None
+        """
+        if mode not in COMPRESSION_MODES + [COMPRESSION_MODE_AUTO]:
+            raise CompressionModeInvalidError('Mode must be one of {}, {} found'.format(
+                COMPRESSION_MODES + [COMPRESSION_MODE_AUTO], mode))
+        auto_compression = mode == COMPRESSION_MODE_AUTO
+        if self._use_compression and auto_compression == self._auto_compression and \
+                (auto_compression or mode == self._compression_mode):
+            return
+        if self._data is None:
+            self._decode_data()
+        self._use_compression = True
+        self._auto_compression = auto_compression
+        self._compression_mode = None if auto_compression else mode
+        self._encoded_data = None
+        self._segments = None
+        return
+
+    def compression_modes(self) -> list:
+        """
+        Encodes the data if it is not encoded yet and tells which compression mode each segment uses,
+        the mode picked when compressing with 'a'
+        :return: list with one compression mode per segment, or one for a bar that is not segmented.
+        None where the data is stored uncompressed
+        """
+        self._encode_data()
+        if self._use_segments:
+            return [m for c in self._segments for m in c.compression_modes()]
+        return [self._compression_mode if self._use_compression else None]
+
+    def set_floating_point_rounding(self, num_decimals: int = None):
+        """
+        Stores a float bar as integers, its values times 10^num_decimals rounded, which the integer compression
+        modes then narrow. Decimals past num_decimals are lost
+        :param num_decimals: number of decimals to keep, or None to store the floats as they are
+        :return: None
+        """
+        self._floating_point_rounding_is_detected = False
+        if (num_decimals is not None) == self._use_floating_point_rounding and \
+                num_decimals == self._floating_point_rounding_num_decimals:
+            return
+        if self._data is None:
+            self._decode_data()
+        self._use_floating_point_rounding = num_decimals is not None
+        self._floating_point_rounding_num_decimals = num_decimals
+        self._encoded_data = None
+        self._segments = None
+        return
+
+    def detect_floating_point_rounding(self) -> bool:
+        """
+        Turns floating point rounding on when the data comes back exactly at some number of decimals,
+        see detect_decimal_precision. NaN rows stored in the validity bitmap are left out. A detected number of
+        decimals, or one read from file, is only kept while the current data still comes back exactly at it.
+        Rounding asked for with set_floating_point_rounding, and bars only holding data as read from file, are
+        left as they are
+        :return: boolean, whether the bar rounds
+        """
+        if self._data is None or dtype(self._dtype).kind != 'f':
+            return self._use_floating_point_rounding
+        if self._use_floating_point_rounding and not self._floating_point_rounding_is_detected:
+            return True
+        values = self._encodable_values()[0]
+        if self._use_floating_point_rounding and self._floating_point_rounding_num_decimals is not None and \
+                round_trips_after_rounding(values, self._floating_point_rounding_num_decimals):
+            return True
+        self.set_floating_point_rounding(detect_decimal_precision(values))
+        self._floating_point_rounding_is_detected = self._use_floating_point_rounding
+        return self._use_floating_point_rounding
+
+    def set_block_compression(self, codec: str = None, shuffle: str = 'byte'):
+        """
+        Compresses the encoded bytes once more, as a single block, with a general-purpose codec from the standard
+        library: 'zlib' is the quickest to decode, 'lzma' usually the smallest and 'bz2' in between.
+        The bytes are shuffled first so those at the same position in each value sit together, 'byte' by byte
+        or 'bit' by bit, which the codecs compress much better for narrowed integers. Trades decode time for
+        size; reading a slice of the rows decodes the whole run, so use row groups to bound it
+        :param codec: 'zlib', 'lzma', 'bz2', or None to store the encoded bytes as they are
+        :param shuffle: 'byte', 'bit', or None to compress the bytes in their order
+        :return: None
+        """
+        if codec is None:
+            shuffle = None
+        else:
+            validate_block_compression(codec, shuffle)
+        if codec == self._block_compression_codec and shuffle == self._block_compression_shuffle:
+            return
+        if self._data is None:
+            self._decode_data()
+        self._block_compression_codec = codec
+        self._block_compression_shuffle = shuffle
+        self._encoded_data = None
+        self._segments = None
+        return
+
+    def set_checksums(self, enabled: bool):
+        """
+        Turns on or off storing a CRC32 of the bar's data bytes, as written to the file, with its definition.
+        A segmented bar stores one per segment, so appending rows never reads the existing ones.
+        The checksum is computed when the definition is next encoded and needs no new encode of the data
+        :param enabled: boolean
+        :return: None
+        """
+        self._use_checksum = enabled
+        if self._segments is not None:
+            for c in self._segments:
+                c._use_checksum = enabled
+        return
+
+    def verify_checksums(self) -> bool:
+        """
+        Checks the data bytes read from file, data_from_file or data_from_buffer, against the stored CRC32s,
+        those of the selected segments for a segmented bar. The bytes are hashed where they are, a memory map
+        included, without decoding them
+        :return: boolean, False if a checksum does not match. True for a bar without checksums
+        """
+        if self._use_segments:
+            return all([c.verify_checksums() for c in self._segments])
+        return not self._use_checksum or crc32(self._encoded_data) == self._checksum
+
+    def checksum_regions(self, data_offset: int, num_points: int) -> list:
+        """
+        Locates the runs of bytes the stored checksums cover, so a file can be verified without reading
+        it through the bar
+        :param data_offset: byte offset of this bar's data in the file
+        :param num_points: number of points that are in the PandaCage storage
+        :return: list like [(byte offset, number of bytes, CRC32)], empty for a bar without checksums
+        """
+        if self._use_segments:
+            return [r for c, offset in zip(self._segments, self._segment_offsets)
+                    for r in c.checksum_regions(data_offset + offset, c.num_points())]
+        if not self._use_checksum:
+            return []
+        return [(data_offset, self.num_bytes_data(num_points), self._checksum)]
+
+    def set_dictionary_encoding(self, enabled: bool):
+        """
+        Turns dictionary encoding on or off. The distinct values are stored once, in a table in the extra
+        information bytes, and each row as the narrowest unsigned integer code indexing into it. The codes are
+        then compressed with the bar's compression mode. Suits columns with few distinct values
+        :param enabled: boolean
+        :return: None
+        """
+        if enabled == self._use_hash_table:
+            return
+        if self._data is None:
+            self._decode_data()
+        self._use_hash_table = enabled
+        self._encoded_data = None
+        self._segments = None
+        return
+
+    def set_segment_size(self, segment_size: int = None):
+        """
+        Sets the number of rows per segment (row group). Each segment is encoded on its own, with its own
+        compression reference value and dtype, and keeps min/max/null-count statistics
+        :param segment_size: number of rows per segment, or None to encode the data as one run
+        :return: None
+        """
+        if segment_size == self._segment_size:
+            return
+        if self._data is None:
+            self._decode_data()
+        self._segment_size = segment_size
+        self._encoded_data = None
+        self._segments = None
+        return
+
+    def segment_size(self) -> int:
+        """
+        :return: number of rows per segment, or None if the data is not segmented
+        """
+        return self._segment_size
+
+    def segment_statistics(self) -> list:
+        """
+        :return: list of SegmentStatistics, one per segment, or None if the data is not segmented
+        """
+        return self._segment_statistics if self._use_segments else None
+
+    def segment_num_points(self) -> list:
+        """
+        :return: list with the number of points in each segment, or None if the data is not segmented
+        """
+        return [c.num_points() for c in self._segments] if self._use_segments else None
+
+    def select_segments(self, indices: list):
+        """
+        Keeps only the segments at indices, before the data is read, so the others are never read
+        :param indices: list of segment indices to keep, in order
+        :return: None
+        """
+        self._segments = [self._segments[i] for i in indices]
+        self._segment_statistics = [self._segment_statistics[i] for i in indices]
+        self._segment_offsets = [self._segment_offsets[i] for i in indices]
+        self._num_points = sum([c.num_points() for c in self._segments])
+        self._data = None
+        return
+
+    def set_data(self, data: array, copy: bool = True, validity: array = None):
         """
         Sets the internal data array of the PandaBar.
-        Casts the array into type of prev
-        :param data: numpy array holding the data
+        Casts the array into type of prev.
+        Null rows are given by validity, or by the mask of a numpy masked array. Float and time bars store
+        them as NaN/NaT, which always count as null; other bars keep the validity next to the data.
+        Either way only the valid rows are compressed, and a packed bitmap of the validity is written
+        with the bar
+        :param data: numpy array holding the data, or a numpy masked array
+        :param copy: boolean, when False and data already has the bar's dtype and is C-contiguous, the bar keeps
+        a reference to data instead of copying it. data must then not be modified until it has been written
+        :param validity: optional boolean array like data, False for the null rows. overrides a masked array's mask
         :return: None, populates class internals
         """
-        self._data = data.astype(self._dtype)
+        if isinstance(data, MaskedArray):
+            if validity is None:
+                validity = ~getmaskarray(data)
+            data = getdata(data)
+        if self._is_time() and datetime_data(self._dtype)[0] == 'generic':
+            self._time_units = get_units_from_dtype(data.dtype)
+            self._dtype = data.dtype
+        target_dtype = self._dtype
+        if self._is_string() and data.dtype.kind == self._type_char:
+            # string bars take the width of their data
+            target_dtype = data.dtype
+        if not copy and data.dtype == target_dtype and data.flags.c_contiguous:
+            self._data = data
+        else:
+            self._data = data.astype(target_dtype)
         self._num_points = self._data.size
+        if self._floating_point_rounding_is_detected:
+            # the decimals were detected on the data being replaced
+            self._use_floating_point_rounding = False
+            self._floating_point_rounding_num_decimals = None
+            self._floating_point_rounding_is_detected = False
+        self._validity = None
+        if validity is not None:
+            validity = asarray(validity, dtype=bool)
+            if validity.shape != self._data.shape:
+                raise DataWrongShapeError('PandaBar {} validity must be shaped like its data'.format(self._identifier))
+            if not validity.all():
+                if not self._has_native_nulls():
+                    self._validity = array(validity)
+                else:
+                    if self._data is data:
+                        self._data = array(data)
+                    self._data[~validity] = self._null_value()
         self._encoded_data = None
+        self._segments = None
         return
 
-    def get_data(self) -> array:
+    def get_data(self, copy: bool = True) -> array:
         """
-        Gets the data from the PandaBar
+        Gets the data from the PandaBar. Null rows of float and time bars are NaN/NaT; a bar of another kind
+        with null rows is returned as a numpy masked array masking them
+        :param copy: boolean, when False a read-only view of the bar's data is returned instead of a copy.
+        writing to it raises ValueError; take a copy of it to modify the values
         :return: numpy array containing data
         """
         if self._data is None:
             self._decode_data()
-        return array(self._data)  # makes a copy
+        if copy:
+            return self._mask_nulls(array(self._data), self._validity)  # makes a copy
+        view = self._data.view()
+        view.flags.writeable = False
+        return self._mask_nulls(view, self._validity)
+
+    def get_validity(self) -> array:
+        """
+        :return: numpy boolean array, False for the null rows, or None if no row is null
+        """
+        if self._data is None:
+            self._decode_data()
+        if self._has_native_nulls():
+            nulls = isnan(self._data) if self._type_char == NumpyTypeChars.FLOAT.value else isnat(self._data)
+            return ~nulls if nulls.any() else None
+        return None if self._validity is None else array(self._validity)
+
+    def prepare_for_read(self):
+        """
+        Decodes the data read from file, if it has not been decoded yet, so get_data() does not have to
+        :return: None
+        """
+        if self._data is None:
+            self._decode_data()
+        return
 
     def prepare_for_write(self):
         """
@@ -221,14 +934,23 @@ class _PandaBar:
         compression or other algorithms on the data
         :return: None, raises exception if there are any issues
         """
-        raise NotImplementedError()  # TODO
+        self.validate()
+        self._encode_data()
+        if self._use_segments:
+            # a full write lays the segments out back to back
+            self._locate_segments([c.num_bytes_data(c.num_points()) for c in self._segments])
+        return
 
     def validate(self) -> bool:
         """
         runs validation logic on data
         :return: True, or raises exception
         """
-        raise NotImplementedError()  # TODO
+        if self._data is None and self._encoded_data is None and self._segments is None:
+            raise DataSizeNotPositiveError('PandaBar {} has no data'.format(self._identifier))
+        if self._data is not None and self._data.ndim != 1:
+            raise DataWrongShapeError('PandaBar {} data must be one-dimensional'.format(self._identifier))
+        return True
 
     def is_index(self) -> bool:
         """
@@ -244,12 +966,96 @@ class _PandaBar:
         """
         return self._num_points
 
+    def data_type(self) -> dtype:
+        """
+        gets the numpy data type of the data
+        :return: numpy dtype
+        """
+        return dtype(self._dtype)
+
+    def can_append(self, data: array) -> bool:
+        """
+        Checks whether data can be appended to this bar without any of its values changing: its dtype must cast
+        to the bar's dtype within the same kind, and every value must come back the same from the bar's dtype,
+        so floats for an integer bar, integers out of range, narrowed floats and datetimes losing units are
+        turned down
+        :param data: numpy array, or a numpy masked array whose masked rows are not checked
+        :return: boolean
+        """
+        values = data.compressed() if isinstance(data, MaskedArray) else data
+        if values.dtype.kind in 'iu' and dtype(self._dtype).kind in 'iu':
+            # signed and unsigned integers are one kind here, whether the values fit decides
+            limits = iinfo(self._dtype)
+            return values.size == 0 or limits.min <= int(amin(values)) and int(amax(values)) <= limits.max
+        if not can_cast(values.dtype, self._dtype, 'same_kind'):
+            return False
+        with errstate(over='ignore', invalid='ignore'):
+            cast_values = values.astype(self._dtype).astype(values.dtype)
+        return array_equal(cast_values, values, equal_nan=values.dtype.kind in 'fmM')
+
     def num_extra_bytes_required(self) -> int:
         """
         :return: returns the number of extra bytes required for compression tables etc.
         """
         return self._num_bytes_extra_information
 
+    def _stored_dtype_and_count(self, num_points: int) -> tuple:
+        """
+        works out the dtype and number of values of the data as stored in the file, the encoded data
+        or the bytes block compression made of it
+        :param num_points: number of points that are in the PandaCage storage
+        :return: tuple like (dtype, count)
+        """
+        if self._use_block_compression:
+            return uint8, self._block_compression_num_bytes
+        return self._encoded_dtype_and_count(num_points)
+
+    def _encoded_dtype_and_count(self, num_points: int) -> tuple:
+        """
+        works out the dtype and number of values of the encoded data from the bar definition
+        :param num_points: number of points that are in the PandaCage storage
+        :return: tuple like (dtype, count)
+        """
+        if self._use_validity:
+            num_points = self._num_valid_points
+        if self._uses_string_offsets():
+            # the encoded offsets, then the UTF-8 bytes
+            offsets_dtype, offsets_count = self._encoded_values_dtype_and_count(num_points + 1)
+            return uint8, dtype(offsets_dtype).itemsize * offsets_count + self._string_num_bytes
+        return self._encoded_values_dtype_and_count(num_points)
+
+    def _encoded_values_dtype_and_count(self, num_points: int) -> tuple:
+        """
+        works out the dtype and number of the encoded values, the offsets for a string bar
+        :param num_points: number of values
+        :return: tuple like (dtype, count)
+        """
+        read_num_points = num_points
+        read_dtype = self._dtype
+        if self._use_floating_point_rounding or self._is_time() or self._uses_string_offsets():
+            read_dtype = int64
+        if self._use_hash_table:
+            read_dtype = get_dictionary_codes_dtype(self._dictionary.size)
+        if self._use_compression:
+            read_dtype = self._compression_dtype
+            if _COMPRESSION_MODE_ELEMENT_WISE in self._compression_mode:
+                read_num_points -= 1
+            if self._compression_mode == _COMPRESSION_MODE_DELTA_OF_DELTA:
+                read_num_points -= 2
+            if self._compression_mode == _COMPRESSION_MODE_BIT_PACKED:
+                read_num_points = (num_points * self._compression_bit_width + 7) // 8
+            if self._compression_mode == _COMPRESSION_MODE_RUN_LENGTH:
+                # the run values, then the run lengths
+                read_dtype = uint8
+                read_num_points = self._compression_num_runs * (
+                    self._compression_dtype.itemsize + self._compression_run_length_dtype.itemsize
+                )
+            if self._compression_mode == _COMPRESSION_MODE_XOR:
+                read_num_points = self._compression_num_bytes
+            if self._compression_mode == _COMPRESSION_MODE_ARITHMETIC_SEQUENCE:
+                read_num_points = 0
+        return read_dtype, read_num_points
+
     def _encode_options(self) -> uint16:
         """
         Encodes 16 bit options onto an unsigned 16-bit numpy integer
@@ -257,6 +1063,14 @@ class _PandaBar:
         """
         # start with the left-most bits and work right
         options = 0
+        options |= 1 if self._use_checksum else 0
+        options <<= 1
+        options |= 1 if self._use_block_compression else 0
+        options <<= 1
+        options |= 1 if self._use_validity else 0
+        options <<= 1
+        options |= 1 if self._use_segments else 0
+        options <<= 1
         options |= 1 if self._use_floating_point_rounding else 0
         options <<= 1
         options |= 1 if self._use_hash_table else 0
@@ -277,6 +1091,11 @@ class _PandaBar:
         self._use_compression = True if (from_int >> 1) & 1 else False
         self._use_hash_table = True if (from_int >> 2) & 1 else False
         self._use_floating_point_rounding = True if (from_int >> 3) & 1 else False
+        self._floating_point_rounding_is_detected = self._use_floating_point_rounding
+        self._use_segments = True if (from_int >> 4) & 1 else False
+        self._use_validity = True if (from_int >> 5) & 1 else False
+        self._use_block_compression = True if (from_int >> 6) & 1 else False
+        self._use_checksum = True if (from_int >> 7) & 1 else False
         return
 
     def _encode_details_bytes(self) -> bytes:
@@ -286,6 +1105,24 @@ class _PandaBar:
         """
         ret_bytes = [b'\x00' for _ in range(0, 32)]
         counter = 0
+        if self._is_time():
+            storage_units = self._time_units if self._time_storage_units is None else self._time_storage_units
+            ret_bytes[counter] = get_unit_data(self._time_units).order.to_bytes(1, 'little')
+            counter += 1
+            ret_bytes[counter] = get_unit_data(storage_units).order.to_bytes(1, 'little')
+            counter += 1
+        if self._use_segments:
+            # each segment carries its own details, the bar keeps the options new segments are encoded with.
+            # the number of decimals is stored plus one, 0 when it is not known
+            mode = 0 if self._compression_mode is None else get_type_char_int(self._compression_mode)
+            ret_bytes[counter] = mode.to_bytes(1, 'little')
+            counter += 1
+            ret_bytes[counter] = (1 if self._auto_compression else 0).to_bytes(1, 'little')
+            counter += 1
+            if self._use_floating_point_rounding and self._floating_point_rounding_num_decimals is not None:
+                ret_bytes[counter] = (self._floating_point_rounding_num_decimals + 1).to_bytes(1, 'little')
+            counter += 1
+            return b''.join(ret_bytes)
         if self._use_compression:
             ret_bytes[counter] = get_type_char_int(self._compression_mode).to_bytes(1, 'little')
             counter += 1
@@ -304,6 +1141,20 @@ class _PandaBar:
             for i in range(0, len(reference_value_bytes)):
                 ret_bytes[counter] = reference_value_bytes[i].to_bytes(1, 'little')
                 counter += 1
+            if self._compression_mode == _COMPRESSION_MODE_BIT_PACKED:
+                ret_bytes[counter] = self._compression_bit_width.to_bytes(1, 'little')
+                counter += 1
+            if self._compression_mode == _COMPRESSION_MODE_RUN_LENGTH:
+                ret_bytes[counter] = self._compression_run_length_dtype.itemsize.to_bytes(1, 'little')
+                counter += 1
+            if self._compression_mode in (_COMPRESSION_MODE_DELTA_OF_DELTA, _COMPRESSION_MODE_ARITHMETIC_SEQUENCE):
+                secondary_reference_value_bytes = array(
+                    [self._compression_secondary_reference_value],
+                    dtype=self._compression_reference_value_dtype
+                ).tobytes()
+                for i in range(0, len(secondary_reference_value_bytes)):
+                    ret_bytes[counter] = secondary_reference_value_bytes[i].to_bytes(1, 'little')
+                    counter += 1
         if self._use_floating_point_rounding:
             ret_bytes[counter] = self._floating_point_rounding_num_decimals.to_bytes(1, 'little')
             counter += 1
@@ -316,24 +1167,56 @@ class _PandaBar:
         :return: None, populates class internals
         """
         counter = 0
+        if self._is_time():
+            self._time_units = get_unit_data(int(from_bytes[counter])).units
+            counter += 1
+            self._time_storage_units = get_unit_data(int(from_bytes[counter])).units
+            counter += 1
+            self._dtype = dtype('{}[{}]'.format(self._dtype, self._time_units))
+        if self._use_segments:
+            self._compression_mode = get_type_char_char(from_bytes[counter]) if from_bytes[counter] > 0 else None
+            counter += 1
+            self._auto_compression = from_bytes[counter] > 0
+            counter += 1
+            if from_bytes[counter] > 0:
+                self._floating_point_rounding_num_decimals = from_bytes[counter] - 1
+            elif self._use_floating_point_rounding:
+                # the segments keep their own decimals, new ones store their floats as they are
+                self._use_floating_point_rounding = False
+                self._floating_point_rounding_is_detected = False
+            counter += 1
+            return
         if self._use_compression:
             compression_info = frombuffer(from_bytes[counter:(counter+5)], dtype=uint8, count=5)
             counter += 5
             self._compression_mode = get_type_char_char(compression_info[0])
             bytes_per_value = compression_info[1]
             type_char = get_type_char_char(compression_info[2])
-            self._compression_dtype = get_numpy_type(type_char, bytes_per_value)
-            self._compression_reference_value_dtype = get_numpy_type(
+            self._compression_dtype = dtype(get_numpy_type(type_char, bytes_per_value * 8))
+            self._compression_reference_value_dtype = dtype(get_numpy_type(
                 get_type_char_char(compression_info[4]),
                 compression_info[3] * 8
-            )
-            ref_value_bytes = self._bytes_per_value
+            ))
+            ref_value_bytes = self._compression_reference_value_dtype.itemsize
             self._compression_reference_value = frombuffer(
                 from_bytes[counter:counter+ref_value_bytes],
                 dtype=self._compression_reference_value_dtype,
                 count=1
             )[0]
             counter += ref_value_bytes
+            if self._compression_mode == _COMPRESSION_MODE_BIT_PACKED:
+                self._compression_bit_width = from_bytes[counter]
+                counter += 1
+            if self._compression_mode == _COMPRESSION_MODE_RUN_LENGTH:
+                self._compression_run_length_dtype = dtype(get_numpy_type('u', from_bytes[counter] * 8))
+                counter += 1
+            if self._compression_mode in (_COMPRESSION_MODE_DELTA_OF_DELTA, _COMPRESSION_MODE_ARITHMETIC_SEQUENCE):
+                self._compression_secondary_reference_value = frombuffer(
+                    from_bytes[counter:counter+ref_value_bytes],
+                    dtype=self._compression_reference_value_dtype,
+                    count=1
+                )[0]
+                counter += ref_value_bytes
         if self._use_floating_point_rounding:
             self._floating_point_rounding_num_decimals = from_bytes[counter]
             counter += 1
@@ -345,25 +1228,101 @@ class _PandaBar:
         that will be written to binary form
         :return: None
         """
-        if self._encoded_data is not None:
+        if self._encoded_data is not None or self._segments is not None:
             return
-        self._encoded_data = self._data
-
-        # TODO datetimes should be handled here
-
+        if self._compression_is_skipped:
+            self._use_compression = True
+            self._compression_is_skipped = False
+        if self._segment_size is not None:
+            self._encode_segments()
+            return
+        self._use_segments = False
+        self._encoded_data, self._validity = self._encodable_values()
+        self._use_validity = self._validity is not None
+        if self._use_validity:
+            self._num_valid_points = count_nonzero(self._validity)
+        self._string_bytes = None
+        if self._is_time():
+            self._encoded_data, self._time_storage_units = compress_time_delta_array(self._encoded_data)
+        if self._uses_string_offsets():
+            self._encoded_data, self._string_bytes = encode_utf8_strings(self._encoded_data)
+            self._string_num_bytes = self._string_bytes.size
         if self._use_floating_point_rounding:
             self._encoded_data = round_array_returning_integers(
                 self._encoded_data,
                 self._floating_point_rounding_num_decimals
             )
+        if self._use_hash_table:
+            self._dictionary, self._encoded_data = dictionary_encode_array(self._encoded_data)
         if self._use_compression:
-            self._compression_reference_value_dtype = self._encoded_data.dtype
-            mode = 'm' if self._compression_mode is None else self._compression_mode
-            compression_result = compress_array(self._encoded_data, mode)
-            self._compression_mode = mode
-            self._compression_dtype = compression_result.numpy_array.dtype
-            self._encoded_data = compression_result.numpy_array
-            self._compression_reference_value = compression_result.reference_value
+            mode = self._compression_mode
+            if mode is None:
+                # string offsets grow by the string lengths, which differences narrow best
+                mode = _COMPRESSION_MODE_ELEMENT_WISE if self._string_bytes is not None else _COMPRESSION_MODE_MINIMUM
+            if self._compression_mode in (None, _COMPRESSION_MODE_ARITHMETIC_SEQUENCE) or self._auto_compression:
+                # evenly spaced or constant data needs no data bytes at all
+                if get_arithmetic_sequence_step(self._encoded_data) is not None:
+                    mode = _COMPRESSION_MODE_ARITHMETIC_SEQUENCE
+                elif mode == _COMPRESSION_MODE_ARITHMETIC_SEQUENCE:
+                    mode = _COMPRESSION_MODE_MINIMUM
+            if self._auto_compression and mode != _COMPRESSION_MODE_ARITHMETIC_SEQUENCE and self._encoded_data.size > 0:
+                mode = select_compression_mode(self._encoded_data)
+            if mode == _COMPRESSION_MODE_BIT_PACKED and self._encoded_data.dtype.kind == 'f':
+                # only integers can be bit-packed
+                mode = _COMPRESSION_MODE_MINIMUM
+            if mode == _COMPRESSION_MODE_DELTA_OF_DELTA and self._encoded_data.dtype.kind == 'f':
+                # summing float residuals twice would compound rounding errors
+                mode = _COMPRESSION_MODE_ELEMENT_WISE
+            if mode in (_COMPRESSION_MODE_MINIMUM, _COMPRESSION_MODE_ELEMENT_WISE) and \
+                    self._encoded_data.dtype.kind == 'f' and not isfinite(self._encoded_data).all():
+                # differences between infinities are not numbers, XOR keeps them
+                mode = _COMPRESSION_MODE_XOR
+            compression_result = self._encoded_data
+            if mode is not None and self._encoded_data.size > 0:
+                compression_result = compress_array(self._encoded_data, mode)
+            if isinstance(compression_result, CompressionResult) and self._encoded_data.dtype.kind == 'f' and \
+                    not round_trips_after_compression(self._encoded_data, compression_result, mode):
+                # floats must read back bit for bit, XOR keeps every bit or they are stored as-is
+                mode = _COMPRESSION_MODE_XOR
+                compression_result = compress_array(self._encoded_data, mode)
+                if isinstance(compression_result, CompressionResult) and \
+                        compression_result.numpy_array.nbytes >= self._encoded_data.nbytes:
+                    compression_result = self._encoded_data
+            if not isinstance(compression_result, CompressionResult):
+                # the array was too small to benefit, has no valid rows or no mode makes it smaller, so it is
+                # stored as-is
+                self._use_compression = False
+                self._compression_is_skipped = True
+                self._encoded_data = compression_result
+            else:
+                self._compression_reference_value_dtype = self._encoded_data.dtype
+                self._compression_mode = mode
+                self._compression_dtype = compression_result.numpy_array.dtype
+                self._encoded_data = compression_result.numpy_array
+                self._compression_reference_value = compression_result.reference_value
+                self._compression_bit_width = compression_result.bit_width
+                self._compression_secondary_reference_value = compression_result.secondary_reference_value
+                if mode == _COMPRESSION_MODE_XOR:
+                    self._compression_num_bytes = compression_result.numpy_array.size
+                if mode == _COMPRESSION_MODE_RUN_LENGTH:
+                    self._compression_run_length_dtype = compression_result.run_lengths.dtype
+                    self._compression_num_runs = compression_result.run_lengths.size
+                    self._encoded_data = concatenate([
+                        self._encoded_data.view(uint8),
+                        compression_result.run_lengths.view(uint8)
+                    ])
+        if self._string_bytes is not None:
+            self._encoded_data = concatenate([self._encoded_data.view(uint8), self._string_bytes])
+        self._use_block_compression = self._block_compression_codec is not None and self._encoded_data.nbytes > 0
+        if self._use_block_compression:
+            self._encoded_data = block_compress(
+                self._encoded_data,
+                self._block_compression_codec,
+                self._block_compression_shuffle,
+                self._encoded_data.dtype.itemsize
+            )
+            self._block_compression_num_bytes = self._encoded_data.size
+        self._checksum = None
         return
 
     def _decode_data(self):
@@ -371,14 +1330,496 @@ class _PandaBar:
         Decodes data from internal encoded data
         :return: None, populates class internals
         """
-        self._data = self._encoded_data
+        if self._use_segments:
+            for c in self._segments:
+                c._decode_data()
+            self._data = concatenate([c._data for c in self._segments] + [zeros(0, dtype=self._dtype)])
+            self._num_points = self._data.size
+            self._validity = None
+            if any([c._validity is not None for c in self._segments]):
+                self._validity = concatenate([
+                    ones(c.num_points(), dtype=bool) if c._validity is None else c._validity for c in self._segments
+                ])
+            return
+        self._data = self._unblocked_encoded_data()
+        num_points = self._num_valid_points if self._use_validity else self._num_points
+        string_bytes = None
+        if self._uses_string_offsets():
+            offsets_dtype, offsets_count = self._encoded_values_dtype_and_count(num_points + 1)
+            string_bytes = self._data
+            self._data = frombuffer(string_bytes, dtype=offsets_dtype, count=offsets_count)
+            string_bytes = string_bytes[self._data.nbytes:]
+            num_points += 1
+        run_lengths = None
+        if self._use_compression and self._compression_mode == _COMPRESSION_MODE_RUN_LENGTH:
+            self._data, run_lengths = self._split_runs(self._data)
         if self._use_compression:
             self._data = decompress_array(
                 self._data,
                 self._compression_mode,
-                self._compression_reference_value
-            ).astype(self._dtype)
-        if self._use_floating_point_rounding:
-            self._data /= pow(10, self._floating_point_rounding_num_decimals)
+                self._compression_reference_value,
+                bit_width=self._compression_bit_width,
+                num_points=num_points,
+                secondary_reference_value=self._compression_secondary_reference_value,
+                run_lengths=run_lengths
+            )
+        self._data = self._finish_decoding(self._data)
+        if string_bytes is not None:
+            self._data = decode_utf8_strings(self._data, string_bytes, self._type_char)
+        if self._use_validity:
+            self._data = self._fill_nulls(self._data, self._validity)
         self._num_points = self._data.size
         return
+
+    def _unblocked_encoded_data(self) -> array:
+        """
+        Gets the encoded data, undoing block compression
+        :return: numpy array
+        """
+        if not self._use_block_compression:
+            return self._encoded_data
+        read_dtype, read_num_points = self._encoded_dtype_and_count(self._num_points)
+        item_size = dtype(read_dtype).itemsize
+        buffer = block_decompress(
+            self._encoded_data,
+            self._block_compression_codec,
+            self._block_compression_shuffle,
+            item_size,
+            item_size * read_num_points
+        )
+        return frombuffer(buffer, dtype=read_dtype, count=read_num_points)
+
+    def _is_string(self) -> bool:
+        """
+        Whether the bar holds 'U' (unicode) or 'S' (bytes) strings
+        :return: boolean
+        """
+        return self._type_char in (NumpyTypeChars.STRING.value, NumpyTypeChars.BYTES.value)
+
+    def _uses_string_offsets(self) -> bool:
+        """
+        Whether the bar is stored as string offsets and bytes, rather than as dictionary codes
+        :return: boolean
+        """
+        return self._is_string() and not self._use_hash_table
+
+    def _is_time(self) -> bool:
+        """
+        Whether the bar holds datetime64 or timedelta64 values
+        :return: boolean
+        """
+        return self._type_char in (NumpyTypeChars.DATETIME.value, NumpyTypeChars.TIMEDELTA.value)
+
+    def _has_native_nulls(self) -> bool:
+        """
+        Whether the bar's dtype has its own null value, NaN for floats and NaT for datetime64/timedelta64
+        :return: boolean
+        """
+        return self._type_char == NumpyTypeChars.FLOAT.value or self._is_time()
+
+    def _null_value(self):
+        """
+        :return: the value null rows hold in memory, NaN, NaT, or 0 and '' for the bars without a null value
+        """
+        if self._is_time():
+            return dtype(self._dtype).type('NaT')
+        if self._type_char == NumpyTypeChars.FLOAT.value:
+            return nan
+        return zeros(1, dtype=self._dtype)[0]
+
+    def _keeps_null_bits(self) -> bool:
+        """
+        Whether NaN/NaT are stored as they are rather than in the validity bitmap. 'x' and 'r' mode keep
+        every bit of a float, NaN payloads included, so a bar set to either keeps its NaN unless it is rounded
+        :return: boolean
+        """
+        return self._use_compression and not self._auto_compression and not self._use_floating_point_rounding and \
+            self._compression_mode in (_COMPRESSION_MODE_XOR, _COMPRESSION_MODE_RUN_LENGTH)
+
+    def _encodable_values(self) -> tuple:
+        """
+        Gets the values that are encoded, those of the valid rows, and the validity of the rows
+        :return: tuple like (numpy array, numpy boolean array or None if every row is valid)
+        """
+        validity = self._validity
+        if self._has_native_nulls():
+            validity = None
+            if not self._keeps_null_bits():
+                nulls = isnan(self._data) if self._type_char == NumpyTypeChars.FLOAT.value else isnat(self._data)
+                validity = ~nulls if nulls.any() else None
+        if validity is None:
+            return self._data, None
+        return self._data[validity], validity
+
+    def _fill_nulls(self, values: array, validity: array) -> array:
+        """
+        Spreads the decoded values of the valid rows out over all the rows, null rows holding _null_value
+        :param values: numpy array with one value per valid row
+        :param validity: numpy boolean array, one per row
+        :return: numpy array
+        """
+        rows = full(validity.size, self._null_value(), dtype=values.dtype)
+        rows[validity] = values
+        return rows
+
+    def _mask_nulls(self, data: array, validity: array) -> array:
+        """
+        Masks the null rows of a bar without a null value of its own, see get_data
+        :param data: numpy array
+        :param validity: numpy boolean array like data, or None
+        :return: numpy masked array, or data when there is nothing to mask
+        """
+        if validity is None or self._has_native_nulls():
+            return data
+        return MaskedArray(data, mask=~validity)
+
+    def _split_runs(self, encoded_data: array) -> tuple:
+        """
+        Splits the encoded bytes of an 'r' mode bar into its run values and run lengths
+        :param encoded_data: numpy uint8 array
+        :return: tuple like (run values, run lengths)
+        """
+        run_values = frombuffer(encoded_data, dtype=self._compression_dtype, count=self._compression_num_runs)
+        run_lengths = frombuffer(
+            encoded_data,
+            dtype=self._compression_run_length_dtype,
+            count=self._compression_num_runs,
+            offset=run_values.nbytes
+        )
+        return run_values, run_lengths
+
+    def _finish_decoding(self, values: array) -> array:
+        """
+        Turns decompressed values back into the bar's dtype, looking up dictionary codes and undoing any
+        floating point rounding. The offsets of a string bar come back as int64, see decode_utf8_strings
+        :param values: numpy array of decompressed values
+        :return: numpy array
+        """
+        if self._use_hash_table:
+            values = self._dictionary[values]
+        if self._uses_string_offsets():
+            return values.astype(int64, copy=False)
+        if self._is_time():
+            values = values.astype(int64, copy=False)
+            multiplier = get_unit_data(self._time_storage_units).multiplier // \
+                get_unit_data(self._time_units).multiplier
+            if multiplier != 1:
+                values = values * multiplier
+            return values.view(self._dtype)
+        if self._use_compression:
+            values = values.astype(self._dtype)
+        if self._use_floating_point_rounding:
+            values = values.astype(self._dtype) / pow(10, self._floating_point_rounding_num_decimals)
+        return values
+
+    def _encode_segments(self):
+        """
+        Splits the data into segments of _segment_size rows and encodes each one on its own
+        :return: None, populates class internals
+        """
+        self._use_segments = True
+        self._segments = []
+        self._segment_statistics = []
+        for start in range(0, self._data.size, self._segment_size):
+            chunk = self._data[start:start + self._segment_size]
+            validity = None if self._validity is None else self._validity[start:start + self._segment_size]
+            self._segments.append(self._new_segment(chunk, validity))
+            self._segment_statistics.append(self._compute_statistics(chunk, validity))
+        self._locate_segments([c.num_bytes_data(c.num_points()) for c in self._segments])
+        return
+
+    def _new_segment(self, data: array, validity: array = None) -> '_PandaBar':
+        """
+        Creates and encodes a segment holding data, using this bar's encoding options
+        :param data: numpy array with the segment's rows, or a numpy masked array
+        :param validity: optional numpy boolean array, False for the segment's null rows
+        :return: _PandaBar
+        """
+        segment = _PandaBar(self._identifier, self._bytes_per_value, self._type_char, is_index=self._is_index)
+        segment._use_compression = self._use_compression
+        segment._compression_mode = self._compression_mode
+        segment._auto_compression = self._auto_compression
+        segment._use_floating_point_rounding = self._use_floating_point_rounding and \
+            self._floating_point_rounding_num_decimals is not None
+        segment._floating_point_rounding_num_decimals = self._floating_point_rounding_num_decimals
+        segment._use_hash_table = self._use_hash_table
+        segment._block_compression_codec = self._block_compression_codec
+        segment._block_compression_shuffle = self._block_compression_shuffle
+        segment._use_checksum = self._use_checksum
+        segment.set_data(data, copy=False, validity=validity)
+        segment._encode_data()
+        return segment
+
+    def _locate_segments(self, num_bytes: list, offsets: list = None):
+        """
+        Records the byte offset of every segment's data relative to the start of the bar's data
+        :param num_bytes: list with the number of encoded bytes of each segment
+        :param offsets: list of offsets, or None if the segments are back to back
+        :return: None, populates class internals
+        """
+        if offsets is None:
+            offsets = []
+            offset = 0
+            for n in num_bytes:
+                offsets.append(offset)
+                offset += n
+        self._segment_offsets = list(offsets)
+        self._num_bytes_segments = max([o + n for o, n in zip(offsets, num_bytes)] + [0])
+        return
+
+    def append_data_to_file(self, file_handle, data: array, data_offset: int, segment_size: int = None) -> int:
+        """
+        Encodes data as new segments and writes them at the file handle's position, leaving the existing
+        segments where they are. A bar that is not segmented yet becomes the first segment; its data must
+        have been read (data_from_file) so its statistics can be computed.
+        :param file_handle: file handle in 'r+b' mode, positioned after data_offset
+        :param data: numpy array with the new rows
+        :param data_offset: byte offset of the start of this bar's data in the file
+        :param segment_size: number of rows per new segment, or None to append data as a single segment
+        :return: int, number of bytes written
+        """
+        if not self._use_segments:
+            self._wrap_as_segment()
+        written_bytes = 0
+        has_own_decimals = False
+        step = data.size if segment_size is None else segment_size
+        for start in range(0, data.size, max(step, 1)):
+            chunk = data[start:start + step].astype(self._dtype)
+            segment = self._new_segment(chunk)
+            values = segment._encodable_values()[0]
+            rounds = segment._use_floating_point_rounding and \
+                round_trips_after_rounding(values, segment._floating_point_rounding_num_decimals)
+            if self._use_floating_point_rounding and not rounds:
+                # the new rows would lose decimals at the bar's rounding, or the bar was read from file and its
+                # rounding is only known per segment, so they get their own
+                segment.set_floating_point_rounding(detect_decimal_precision(values))
+                segment._encode_data()
+                has_own_decimals = True
+            self._segment_offsets.append(file_handle.tell() - data_offset)
+            written_bytes += segment.data_to_file(file_handle)
+            self._segments.append(segment)
+            self._segment_statistics.append(self._compute_statistics(segment._data, segment._validity))
+        self._locate_segments([c.num_bytes_data(c.num_points()) for c in self._segments], self._segment_offsets)
+        self._num_points += data.size
+        self._data = None
+        if has_own_decimals:
+            # the bar's decimals no longer hold for every segment, so rewriting its rows must not round at them
+            self._use_floating_point_rounding = False
+            self._floating_point_rounding_num_decimals = None
+            self._floating_point_rounding_is_detected = False
+        return written_bytes
+
+    def _wrap_as_segment(self):
+        """
+        Turns this bar's single encoded run into the first segment of a segmented bar, without re-encoding
+        :return: None, populates class internals
+        """
+        if self._data is None:
+            self._decode_data()
+        segment = _PandaBar(
+            self._identifier,
+            self._bytes_per_value,
+            self._type_char,
+            options=int(self._encode_options()),
+            details_bytes=self._encode_details_bytes()
+        )
+        segment.decode_extra_information(self._encode_extra_information())
+        segment._num_points = self._num_points
+        segment._encoded_data = self._encoded_data
+        self._segments = [segment]
+        self._segment_statistics = [self._compute_statistics(self._data, self._validity)]
+        self._locate_segments([segment.num_bytes_data(segment.num_points())])
+        self._use_segments = True
+        self._segment_size = self._num_points
+        return
+
+    def _compute_statistics(self, data: array, validity: array = None) -> SegmentStatistics:
+        """
+        Computes the min/max/null-count statistics of a run of data
+        :param data: numpy array
+        :param validity: optional numpy boolean array, False for the null rows. NaN/NaT always count as null
+        :return: SegmentStatistics
+        """
+        nulls = None
+        if validity is not None:
+            nulls = ~validity
+        elif data.dtype.kind == 'f':
+            nulls = isnan(data)
+        elif data.dtype.kind in 'Mm':
+            nulls = isnat(data)
+        null_count = 0 if nulls is None else count_nonzero(nulls)
+        if null_count > 0:
+            data = data[~nulls]
+        if data.size == 0:
+            if data.dtype.kind in 'iu':
+                # integers have no NaN, so an empty range no value falls in stands for a segment without values
+                return SegmentStatistics(iinfo(data.dtype).max, iinfo(data.dtype).min, null_count)
+            missing_value = data.dtype.type('NaT') if data.dtype.kind in 'Mm' else nan
+            return SegmentStatistics(missing_value, missing_value, null_count)
+        if data.dtype.kind in 'US':
+            # numpy has no minimum/maximum for strings, but does have argmin/argmax
+            return SegmentStatistics(data[argmin(data)], data[argmax(data)], null_count)
+        return SegmentStatistics(amin(data), amax(data), null_count)
+
+    def _encode_extra_information(self) -> bytes:
+        """
+        Encodes the information that does not fit in the 32 details bytes
+        :return: bytes
+        """
+        ret_bytes = b''
+        if self._use_segments:
+            return self._encode_segment_table()
+        if self._use_hash_table:
+            ret_bytes += array([self._dictionary.size], dtype=uint32).tobytes()
+            if self._is_string():
+                # the table is as wide as the longest string
+                ret_bytes += array([self._dictionary.itemsize], dtype=uint32).tobytes()
+            ret_bytes += self._dictionary.tobytes()
+        if self._use_compression and self._compression_mode == _COMPRESSION_MODE_RUN_LENGTH:
+            ret_bytes += array([self._compression_num_runs], dtype=uint32).tobytes()
+        if self._use_compression and self._compression_mode == _COMPRESSION_MODE_XOR:
+            ret_bytes += array([self._compression_num_bytes], dtype=uint64).tobytes()
+        if self._uses_string_offsets():
+            ret_bytes += array([self._string_num_bytes], dtype=uint64).tobytes()
+        if self._use_validity:
+            # the number of rows, then one bit per row
+            ret_bytes += array([self._validity.size], dtype=uint64).tobytes()
+            ret_bytes += packbits(self._validity, bitorder='little').tobytes()
+        if self._use_block_compression:
+            ret_bytes += array([
+                BLOCK_COMPRESSION_CODECS.index(self._block_compression_codec),
+                BLOCK_COMPRESSION_SHUFFLES.index(self._block_compression_shuffle)
+            ], dtype=uint8).tobytes()
+            ret_bytes += array([self._block_compression_num_bytes], dtype=uint64).tobytes()
+        if self._use_checksum:
+            if self._checksum is None:
+                self._checksum = crc32(self._encoded_data)
+            ret_bytes += array([self._checksum], dtype=uint32).tobytes()
+        return ret_bytes
+
+    def _encode_segment_table(self) -> bytes:
+        """
+        Encodes the number of segments, one SEGMENT_INFO_DTYPE record per segment, then each segment's
+        own extra information
+        :return: bytes
+        """
+        table = zeros(len(self._segments), dtype=SEGMENT_INFO_DTYPE)
+        segments_extra_information = []
+        for i, (c, statistics) in enumerate(zip(self._segments, self._segment_statistics)):
+            c_extra_information = c._encode_extra_information()
+            segments_extra_information.append(c_extra_information)
+            table[i]['num_points'] = c.num_points()
+            table[i]['offset'] = self._segment_offsets[i]
+            table[i]['num_bytes'] = c.num_bytes_data(c.num_points())
+            table[i]['null_count'] = statistics.null_count
+            table[i]['min_value'] = self._encode_statistic(statistics.min_value)
+            table[i]['max_value'] = self._encode_statistic(statistics.max_value)
+            table[i]['options'] = c._encode_options()
+            table[i]['bytes_extra_information'] = len(c_extra_information)
+            table[i]['details'] = frombuffer(c._encode_details_bytes(), dtype=uint8)
+        return array([len(self._segments)], dtype=uint32).tobytes() + table.tobytes() +\
+            b''.join(segments_extra_information)
+
+    def _decode_segment_table(self, from_bytes: bytes) -> int:
+        """
+        Decodes the segment table written by _encode_segment_table
+        :param from_bytes: bytes starting at the segment table
+        :return: int, number of bytes decoded
+        """
+        num_segments = int(frombuffer(from_bytes, dtype=uint32, count=1)[0])
+        counter = 4
+        table = frombuffer(from_bytes, dtype=SEGMENT_INFO_DTYPE, count=num_segments, offset=counter)
+        counter += table.nbytes
+        self._segments = []
+        self._segment_statistics = []
+        for record in table:
+            segment = _PandaBar(
+                self._identifier,
+                self._bytes_per_value,
+                self._type_char,
+                options=int(record['options']),
+                num_extra_bytes_required=int(record['bytes_extra_information']),
+                details_bytes=record['details'].tobytes()
+            )
+            segment._num_points = int(record['num_points'])
+            segment.decode_extra_information(from_bytes[counter:counter + segment.num_extra_bytes_required()])
+            counter += segment.num_extra_bytes_required()
+            self._segments.append(segment)
+            self._segment_statistics.append(SegmentStatistics(
+                self._decode_statistic(record['min_value']),
+                self._decode_statistic(record['max_value'], upper_bound=True),
+                int(record['null_count'])
+            ))
+        self._locate_segments([int(n) for n in table['num_bytes']], [int(o) for o in table['offset']])
+        self._segment_size = self._segments[0].num_points() if num_segments > 0 else None
+        if num_segments > 0:
+            # rows appended to the bar are block compressed like its last segment
+            self._block_compression_codec = self._segments[-1]._block_compression_codec
+            self._block_compression_shuffle = self._segments[-1]._block_compression_shuffle
+        self._num_points = sum([c.num_points() for c in self._segments])
+        return counter
+
+    def _decode_dictionary(self, from_bytes: bytes) -> int:
+        """
+        Decodes the dictionary table written by _encode_extra_information
+        :param from_bytes: bytes starting at the dictionary table
+        :return: int, number of bytes decoded
+        """
+        table_size = int(frombuffer(from_bytes, dtype=uint32, count=1)[0])
+        counter = 4
+        table_dtype = int64 if self._use_floating_point_rounding or self._is_time() else self._dtype
+        if self._is_string():
+            item_size = int(frombuffer(from_bytes, dtype=uint32, count=1, offset=counter)[0])
+            counter += 4
+            table_dtype = dtype((self._type_char, item_size // self._bytes_per_value))
+        self._dictionary = frombuffer(from_bytes, dtype=table_dtype, count=table_size, offset=counter)
+        return counter + self._dictionary.nbytes
+
+    def _decode_validity(self, from_bytes: bytes) -> int:
+        """
+        Decodes the validity bitmap written by _encode_extra_information
+        :param from_bytes: bytes starting at the validity bitmap
+        :return: int, number of bytes decoded
+        """
+        num_points = int(frombuffer(from_bytes, dtype=uint64, count=1)[0])
+        num_bytes = (num_points + 7) // 8
+        bits = frombuffer(from_bytes, dtype=uint8, count=num_bytes, offset=8)
+        self._validity = unpackbits(bits, count=num_points, bitorder='little').view(bool)
+        self._num_valid_points = count_nonzero(self._validity)
+        return 8 + num_bytes
+
+    def _encode_statistic(self, value) -> array:
+        """
+        Stores a value of the bar's dtype in NUM_BYTES_SEGMENT_STATISTIC bytes. Strings keep the first
+        NUM_BYTES_SEGMENT_STATISTIC bytes of their UTF-8 encoding, see _decode_statistic
+        :param value: value to encode
+        :return: numpy uint8 array
+        """
+        if self._is_string():
+            if isinstance(value, str):
+                value_bytes = value.encode('utf-8')[:NUM_BYTES_SEGMENT_STATISTIC]
+            elif isinstance(value, bytes):
+                value_bytes = bytes(value)[:NUM_BYTES_SEGMENT_STATISTIC]
+            else:  # an empty segment has no minimum or maximum
+                value_bytes = b''
+        else:
+            value_bytes = array([value], dtype=self._dtype).tobytes()
+        return frombuffer(value_bytes.ljust(NUM_BYTES_SEGMENT_STATISTIC, b'\x00'), dtype=uint8)
+
+    def _decode_statistic(self, from_array: array, upper_bound: bool = False):
+        """
+        Reads a value of the bar's dtype stored by _encode_statistic.
+        A string cut short by _encode_statistic is a prefix, so it still bounds a minimum from below. As a
+        maximum it is followed by the largest character so it still bounds it from above
+        :param from_array: numpy uint8 array
+        :param upper_bound: boolean, whether the value is a maximum
+        :return: value
+        """
+        if self._is_string():
+            value_bytes = from_array.tobytes().rstrip(b'\x00')
+            may_be_cut = len(value_bytes) == NUM_BYTES_SEGMENT_STATISTIC
+            if self._type_char == NumpyTypeChars.BYTES.value:
+                return value_bytes + b'\xff' if upper_bound and may_be_cut else value_bytes
+            value = value_bytes.decode('utf-8', errors='ignore')
+            return value + '\U0010ffff' if upper_bound and may_be_cut else value
+        return frombuffer(from_array.tobytes(), dtype=self._dtype, count=1)[0]
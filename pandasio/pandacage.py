@@ -1,20 +1,62 @@
-from numpy import array, uint8, uint16, uint32
+from numpy import array, memmap, dtype, frombuffer, ones, flatnonzero, count_nonzero, searchsorted, asarray, uint8,\
+    uint16, uint32, uint64
+from numpy.ma import MaskedArray
 from typing import Union
-from pandasio.pandabar import _PandaBar, NUM_BYTES_PER_DEFINITION_WITHOUT_IDENTIFIER
+from pandasio.pandabar import _PandaBar, _get_panda_bar_info_dtype, NUM_BYTES_PER_DEFINITION_WITHOUT_IDENTIFIER
 from pandasio.exceptions import DataWrongShapeError,\
-    DataTypeNotSupportedError, CouldNotAcquireFileLockError
+    DataTypeNotSupportedError, CouldNotAcquireFileLockError, FileLayoutNotSupportedError, ChecksumMismatchError
 from pandasio.utils.binary import read_unsigned_int
+from pandasio.utils.datetime_utils import get_units_from_dtype
+from pandasio.utils.pandas_utils import parse_pandas_dtype, get_index_level_names, dataframe_from_arrays,\
+    pandas_values_to_numpy, is_supported_pandas_dtype, is_default_range_index
+from pandasio.utils.exceptions import DateUnitsError, InvalidPandasIndexError, CharConversionException
+from zlib import crc32
 from fcntl import flock, LOCK_EX, LOCK_SH, LOCK_UN, LOCK_NB
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+import operator
 import time
 import os
 
 
 MAX_WRITE_BLOCK_WAIT_SECONDS = 60
 MAX_READ_BLOCK_WAIT_SECONDS = 30
+NUM_BYTES_FILE_HEADER = 1 + 2 + 2 + 4 + 1
+NUM_BYTES_FOOTER_TRAILER = 8
+NUM_BYTES_CHECKSUM = 4
+# number of bytes read at a time when verifying a file
+NUM_BYTES_PER_VERIFY_BLOCK = 1 << 22
+FOOTER_DIRECTORY_DTYPE = dtype([('offset', uint64), ('num_bytes', uint64)])
+COMPARISON_OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge
+}
 
 
 def utils_supported_kinds() -> list:
-    return ['i', 'u', 'f']
+    return ['i', 'u', 'f', 'M', 'm', 'U', 'S']
+
+
+def segment_may_match(statistics, op: str, value) -> bool:
+    """
+    Checks a segment's min/max/null-count statistics against a predicate
+    :param statistics: SegmentStatistics of the segment
+    :param op: comparison operator, one of COMPARISON_OPERATORS
+    :param value: value compared against
+    :return: False if no row of the segment can satisfy the predicate, else True
+    """
+    # NaN statistics (an all-null segment) fail every comparison, which is what we want
+    if op == '==':
+        return statistics.min_value <= value <= statistics.max_value
+    if op == '!=':
+        return not (statistics.min_value == value == statistics.max_value and statistics.null_count == 0)
+    if op in ['<', '<=']:
+        return COMPARISON_OPERATORS[op](statistics.min_value, value)
+    return COMPARISON_OPERATORS[op](statistics.max_value, value)
 
 
 class PandaCage:
@@ -33,20 +75,187 @@ class PandaCage:
         self._num_bytes_for_identifier = None
         self._index_bars = {}  # like { identifier : PandaBar }
         self._bars = {}  # like { identifier : PandaBar }
+        self._bar_offsets = {}  # like { identifier : byte offset of the bar's data in the file }
+
+        # options
+        self._use_footer = False
+        self._use_checksums = True
+
+        # number of rows per row group, None if the file is not split into row groups
+        self._row_group_size = None
         self._MAX_WRITE_BLOCK_WAIT_SECONDS = MAX_WRITE_BLOCK_WAIT_SECONDS
         self._MAX_READ_BLOCK_WAIT_SECONDS = MAX_READ_BLOCK_WAIT_SECONDS
+
+        # memory-mapped read mode
+        self._mmap = None
+        self._mmap_handle = None
+        # map released by close() that the bars may still view, see _copy_mapped_data
+        self._closed_mmap = None
         return
 
+    @classmethod
+    def open(cls, file_path: str, mmap: bool = False, columns: list = None, where: list = None, workers: int = None,
+             verify: bool = False, index_range: tuple = None) -> 'PandaCage':
+        """
+        Creates a PandaCage and reads the file at file_path.
+        With mmap=True the file is mapped once and every bar's encoded data is a view into the mapping,
+        so pages are shared between processes and uncompressed bars are never copied onto the heap.
+        A mapped cage holds a shared lock on the file until close() is called.
+        :param file_path: path of the file to read
+        :param mmap: boolean indicating whether to memory-map the file instead of reading it
+        :param columns: optional list of bar names to read, see read()
+        :param where: optional list of predicates, see read()
+        :param workers: number of threads decoding the bars in parallel, see read()
+        :param verify: boolean indicating whether to check the checksums, see read()
+        :param index_range: optional (start, stop) range of the index, see read()
+        :return: PandaCage
+        """
+        cage = cls(file_path)
+        cage.read(mmap=mmap, columns=columns, where=where, workers=workers, verify=verify, index_range=index_range)
+        return cage
+
+    @classmethod
+    def verify(cls, file_path: str) -> bool:
+        """
+        Checks a file against its checksums without decoding it: the CRC32 of the file info, then that of
+        every bar's data, streamed from the file in blocks of NUM_BYTES_PER_VERIFY_BLOCK bytes.
+        Requires a file written with checksums, see write(); a file whose layout only makes sense without them raises
+        FileLayoutNotSupportedError
+        :param file_path: path of the file to check
+        :return: boolean, False if the file is truncated, damaged so its file info cannot be decoded, or any checksum
+        does not match
+        """
+        cage = cls(file_path)
+        handle = cage._get_fcntl_lock('r')
+        try:
+            try:
+                cage._read_file_info(handle, verify=True)
+            except FileLayoutNotSupportedError:
+                # a file written without checksums, or one whose checksums option bit was flipped
+                if cage._file_info_matches_file_size(handle):
+                    raise
+                return False
+            except (ValueError, TypeError, IndexError, KeyError, OverflowError, MemoryError, OSError,
+                    CharConversionException):
+                # file info too damaged to decode, before its checksum could even be read
+                return False
+            buffer = memoryview(bytearray(NUM_BYTES_PER_VERIFY_BLOCK))
+            for identifier, b in list(cage._index_bars.items()) + list(cage._bars.items()):
+                for offset, num_bytes, checksum in b.checksum_regions(cage._bar_offsets[identifier], cage._num_points):
+                    handle.seek(offset)
+                    running_checksum = 0
+                    while num_bytes > 0:
+                        num_bytes_read = handle.readinto(buffer[:min(num_bytes, NUM_BYTES_PER_VERIFY_BLOCK)])
+                        if num_bytes_read == 0:
+                            return False
+                        running_checksum = crc32(buffer[:num_bytes_read], running_checksum)
+                        num_bytes -= num_bytes_read
+                    if running_checksum != checksum:
+                        return False
+            return True
+        finally:
+            # release shared lock
+            flock(handle, LOCK_UN)
+            handle.close()
+
+    @classmethod
+    def from_dataframe(cls, df, index: bool = True, file_path: str = None, copy: bool = True) -> 'PandaCage':
+        """
+        Creates a PandaCage holding the columns of a pandas DataFrame, each as a bar of the column's dtype.
+        Columns of strings are stored as string bars. With index=True every level of the frame's index becomes
+        an index bar, unnamed levels being named like DataFrame.reset_index does. A default RangeIndex is not
+        stored, to_dataframe gives a cage without index bars one again.
+        Columns that would not read back as they are, such as bool, categorical or time zone aware ones, raise
+        DataTypeNotSupportedError before any data is set; convert them first, e.g. with astype
+        :param df: pandas DataFrame with string column names
+        :param index: boolean indicating whether to store the index levels as index bars
+        :param file_path: path of the file the cage will be written to
+        :param copy: boolean, when False columns that need no cast are kept by reference instead of copied,
+        see set_data. df must then not be modified until the cage has been written
+        :return: PandaCage
+        """
+        cage = cls(file_path)
+        names = [str(c) for c in df.columns]
+        if len(set(names)) != len(names):
+            raise InvalidPandasIndexError('Column names {} are not unique'.format(names))
+        columns = []  # like [(name, pandas Series or Index, is_index)]
+        if index and not is_default_range_index(df.index):
+            for i, name in enumerate(get_index_level_names(df.index)):
+                if name in names:
+                    raise InvalidPandasIndexError('Index level {} has the name of a column'.format(name))
+                columns.append((name, df.index.get_level_values(i), True))
+        columns += [(name, df[column], False) for name, column in zip(names, df.columns)]
+        for name, values, _ in columns:
+            if not is_supported_pandas_dtype(values):
+                raise DataTypeNotSupportedError('{} has dtype {}, which would not read back as it is'.format(
+                    name, values.dtype))
+        for name, values, is_index in columns:
+            values = pandas_values_to_numpy(values)
+            bytes_per_value, type_char = parse_pandas_dtype(values.dtype)
+            cage.set_data(values, name, is_index=is_index, bytes_per_value=bytes_per_value, type_char=type_char,
+                          copy=copy)
+        return cage
+
+    def close(self):
+        """
+        Releases the memory map and the shared lock held by a cage opened with mmap=True
+        :return: None
+        """
+        if self._mmap_handle is not None:
+            flock(self._mmap_handle, LOCK_UN)
+            self._mmap_handle.close()
+            self._mmap_handle = None
+        if self._mmap is not None:
+            self._closed_mmap = self._mmap
+        self._mmap = None
+        return
+
+    def _copy_mapped_data(self):
+        """
+        Copies every bar's data out of the memory map, also after close(), into memory, then releases the map
+        and its shared lock
+        :return: None
+        """
+        buffer = self._mmap if self._mmap is not None else self._closed_mmap
+        if buffer is None:
+            return
+        for b in list(self._index_bars.values()) + list(self._bars.values()):
+            b.copy_from_buffer(buffer)
+        self.close()
+        self._closed_mmap = None
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
     def set_data(self, data: array, name: str, is_index: bool=False, bytes_per_value: int=None,
-                 type_char: Union(int, str)=None):
+                 type_char: Union[int, str]=None, copy: bool=True, compression_mode: str=None,
+                 dictionary: bool=None, validity: array=None, block_compression: str=None, shuffle: str='byte'):
         """
         Assigns data for one of the columns in the PandaCage. If not first column, must match the shape of the
         existing data
-        :param data: numpy array containing data to set
+        :param data: numpy array containing data to set, or a numpy masked array whose masked rows are null
         :param name: name for the data
         :param is_index: boolean indicating whether the column is an index
         :param bytes_per_value: number of bytes per value. if entered, numpy array will downcast
         :param type_char: integer or single character string describing which type of data to downcast to
+        :param copy: boolean, when False and no cast is needed the cage keeps a reference to data instead of
+        copying it. data must then not be modified until the cage has been written
+        :param compression_mode: optional compression mode of the bar, 'm' (default), 'e', 'b' (bit-packed),
+        'd' (delta-of-delta), 'r' (run-length), 'x' (XOR with previous), 's' (arithmetic sequence) or 'a' (picked
+        from a sample of the data). bars left on the default mode are stored as 's' whenever their data allows it.
+        see _PandaBar.set_compression_mode
+        :param dictionary: optional boolean, store the distinct values once and each row as a code indexing into
+        them. see _PandaBar.set_dictionary_encoding
+        :param validity: optional boolean array like data, False for the null rows. NaN and NaT are always null.
+        only the valid rows are compressed, see _PandaBar.set_data
+        :param block_compression: optional general-purpose codec, 'zlib', 'lzma' or 'bz2', compressing the bar's
+        encoded bytes once more. see _PandaBar.set_block_compression
+        :param shuffle: how the bytes are shuffled before block compression, 'byte', 'bit' or None
         :return: None
         """
         if self._num_points is None:
@@ -55,143 +264,718 @@ class PandaCage:
             raise DataWrongShapeError('data size did not match existing shape of PandaCage')
         if data.dtype.kind not in utils_supported_kinds():
             raise DataTypeNotSupportedError('The provided numpy data array had data type that is not supported')
+        if data.dtype.kind in 'Mm':
+            try:
+                get_units_from_dtype(data.dtype)
+            except DateUnitsError:
+                raise DataTypeNotSupportedError('The provided datetime data had units that are not supported')
 
         # if existing
         if is_index and name in self._index_bars:
-            self._index_bars[name].set_data(data)
-            return
-        if is_index and name in self._bars:
-            self._bars[name].set_data(data)
-            return
-        bar = _PandaBar(
-            identifier=name,
-            bytes_per_value=array.dtype.itemsize if bytes_per_value is None else bytes_per_value,
-            type_char=array.dtype.kind if type_char is None else type_char,
-            is_index=is_index,
-            data=data
-        )
+            bar = self._index_bars[name]
+        elif not is_index and name in self._bars:
+            bar = self._bars[name]
+        else:
+            bar = _PandaBar(
+                identifier=name,
+                bytes_per_value=data.dtype.itemsize if bytes_per_value is None else bytes_per_value,
+                type_char=data.dtype.kind if type_char is None else type_char,
+                is_index=is_index
+            )
+        bar.set_data(data, copy=copy, validity=validity)
+        if compression_mode is not None:
+            bar.set_compression_mode(compression_mode)
+        if dictionary is not None:
+            bar.set_dictionary_encoding(dictionary)
+        if block_compression is not None:
+            bar.set_block_compression(block_compression, shuffle)
         if is_index:
             self._index_bars[name] = bar
         else:
             self._bars[name] = bar
         return
 
-    def get_data(self, name: str) -> array:
+    def get_data(self, name: str, copy: bool = True) -> array:
         """
         Retrieves the data identified by name
         :param name: string to lookup data
-        :return: numpy array with the data
+        :param copy: boolean, when False a read-only view of the data is returned instead of a copy
+        :return: numpy array with the data, a numpy masked array for an integer or string bar with null rows
         """
-        if name in self._index_bars:
-            return self._index_bars[name]
-        elif name in self._bars:
-            return self._bars[name]
-        raise KeyError('Could not find name {} in PandaCage'.format(name))
+        return self._get_bar(name).get_data(copy=copy)
 
-    def read(self):
+    def to_dataframe(self, columns: list = None, copy: bool = True):
+        """
+        Builds a pandas DataFrame with the index bars as its index and the other bars as its columns.
+        The columns sharing a dtype are decoded into one block, so the frame is consolidated without
+        copying the data again. Integer bars with null rows become pandas nullable integer columns and string
+        bars with null rows hold missing values. A cage that has not been read or given data reads its file first
+        :param columns: optional list of bar names to include, defaults to every non-index bar
+        :param copy: boolean, when False a bar that is the only one of its dtype, and a single index bar,
+        are shared with the cage instead of copied. those columns are then read-only
+        :return: pandas DataFrame
         """
-        This function reads the entire file contents into memory.
-        Later it can be improved to only read certain tags
+        if self._num_points is None and self.file_path is not None:
+            self.read(columns=columns)
+        names = list(self._bars) if columns is None else columns
+        return dataframe_from_arrays(
+            [(n, self._get_bar(n).get_data(copy=False)) for n in names],
+            [(i, b.get_data(copy=False)) for i, b in self._index_bars.items()],
+            0 if self._num_points is None else self._num_points,
+            copy=copy
+        )
+
+    def compression_modes(self) -> dict:
+        """
+        Tells which compression mode each bar is, or will be, written with, e.g. the mode picked for bars set
+        with compression_mode='a'. Bars that are not encoded yet are encoded, which write() then reuses
+        :return: dictionary like { name : list with one compression mode per row group }, None where a row group
+        is stored uncompressed
+        """
+        return dict([(i, b.compression_modes()) for i, b in
+                     list(self._index_bars.items()) + list(self._bars.items())])
+
+    def read(self, mmap: bool = False, columns: list = None, where: list = None, workers: int = None,
+             verify: bool = False, index_range: tuple = None):
+        """
+        This function reads the file contents into memory.
+        Index bars are always read. If columns is given, only those bars are read, the others are
+        skipped over using the byte offsets worked out from the bar definitions and never allocated.
+        If where is given, only the rows matching every predicate are kept. When the file is split into
+        row groups, the groups whose min/max/null-count statistics rule out a match are never read.
+        :param mmap: boolean, map the file and view the bars in place instead of reading them. see open()
+        :param columns: optional list of bar names to read, defaults to every bar
+        :param where: optional list of predicates like [('price', '>', 100)], combined with 'and'
+        :param workers: number of threads decoding the bars in parallel once they are read. the numpy calls
+        doing the decoding release the GIL, and every bar is decoded before read() returns.
+        None decodes each bar lazily on first access
+        :param verify: boolean, check the file info and the data bytes of every bar read against their CRC32s,
+        raising ChecksumMismatchError on a mismatch. the bytes are hashed as read, before decoding, and only
+        the selected columns and row groups are checked. see verify() to check a whole file
+        :param index_range: optional (start, stop) keeping only the rows with start <= index < stop, either bound
+        may be None. the first index bar must be sorted. the row groups outside the range are skipped, the
+        row bounds are found with a binary search of the index bar, then only those rows of the other bars are
+        read, see _PandaBar.data_slice_from_file. with mmap or verify the bars are read whole and then sliced
         :return: void
         """
-        with self._get_fcntl_lock('r') as handle:
-            try:
-                # read in the data
-                self._read_file_info(handle)
+        if workers is not None and workers < 1:
+            raise ValueError('workers must be positive, {} found'.format(workers))
+        self.close()
+        self._closed_mmap = None
+        self._validate_predicates(where)
+        handle = self._get_fcntl_lock('r')
+        try:
+            self._read_file_info(handle, verify=verify)
+            self._select_columns(columns, where)
+            self._select_row_groups(self._index_range_predicates(index_range))
+            self._select_row_groups(where)
+            if mmap:
+                self._mmap = memmap(handle, dtype=uint8, mode='r')
+                self._read_bar_data_from_buffer(self._mmap)
+            elif index_range is not None and not verify:
+                self._read_bar_data_in_index_range(handle, index_range)
+            else:
                 self._read_bar_data(handle)
-            finally:
-                # release shared lock
-                flock(handle, LOCK_UN)
+            if verify:
+                self._verify_bar_data()
+            if index_range is not None and (mmap or verify):
+                self._slice_rows(*self._index_range_rows(index_range))
+        except:
+            self._mmap = None
+            flock(handle, LOCK_UN)
+            handle.close()
+            raise
+        if mmap:
+            # the shared lock is kept until close() so no writer can truncate the mapped file
+            self._mmap_handle = handle
+        else:
+            # release shared lock
+            flock(handle, LOCK_UN)
+            handle.close()
+        if workers is not None:
+            self._decode_bars_in_parallel(workers)
+        self._filter_rows(where)
+        self._select_columns(columns)
         return
 
-    def write(self):
+    def iter_chunks(self, chunksize: int = 1000000, columns: list = None, as_dataframe: bool = False):
+        """
+        Generator reading the file incrementally, yielding dictionaries like { name : numpy array }
+        holding at most chunksize rows each, so peak memory is bounded by the chunk size.
+        Only the rows of each chunk are read; 'e' mode bars carry their running sum from one chunk to the next.
+        The shared lock is held until the generator is exhausted or closed.
+        :param chunksize: maximum number of rows per chunk
+        :param columns: optional list of bar names to read, see read(). index bars are always read
+        :param as_dataframe: boolean, yield each chunk as a pandas DataFrame built like to_dataframe(), the index
+        bars as its index, instead of a dictionary. the frames share the memory of the chunk's arrays
+        :return: generator of dictionaries, or of pandas DataFrames
+        """
+        if chunksize <= 0:
+            raise ValueError('chunksize must be positive, {} found'.format(chunksize))
+        handle = self._get_fcntl_lock('r')
+        try:
+            self._read_file_info(handle)
+            self._select_columns(columns)
+            bars = list(self._index_bars.items()) + list(self._bars.items())
+            for start in range(0, self._num_points, chunksize):
+                stop = min(start + chunksize, self._num_points)
+                chunk = dict([
+                    (i, b.data_slice_from_file(handle, self._bar_offsets[i], self._num_points, start, stop))
+                    for i, b in bars
+                ])
+                if as_dataframe:
+                    yield dataframe_from_arrays(
+                        [(i, chunk[i]) for i in self._bars],
+                        [(i, chunk[i]) for i in self._index_bars],
+                        stop - start,
+                        copy=False
+                    )
+                else:
+                    yield chunk
+        finally:
+            # release shared lock
+            flock(handle, LOCK_UN)
+            handle.close()
+        return
+
+    def write(self, footer: bool = None, row_group_size: int = None, workers: int = None,
+              detect_decimals: bool = True, checksums: bool = None, atomic: bool = False):
         """
         writes the file out to file_name.
         requires an exclusive LOCK_EX fcntl lock.
         blocks until it can get a lock
+        :param footer: boolean, write the bar data first and the bar definitions in a footer at the end
+        of the file, so each bar can be encoded and flushed on its own. None keeps the cage's current layout
+        :param row_group_size: number of rows per row group. each group of each bar is encoded on its own and
+        its min/max/null-count statistics are stored with the bar definitions, see read(where=...).
+        None keeps the cage's current row groups, 0 writes each bar as a single run
+        :param workers: number of threads encoding bars in parallel before anything is written. the numpy
+        calls doing the encoding release the GIL, so wide cages encode on several cores. all bars are then
+        held encoded at once, also in the footer layout. None or 1 encodes one bar at a time
+        :param detect_decimals: boolean, store float bars whose values come back exactly at some number of decimals
+        (e.g. prices) as rounded integers, see _PandaBar.detect_floating_point_rounding
+        :param checksums: boolean, store a CRC32 of the file info and of every bar's data bytes so read(verify=True)
+        and verify() can detect a corrupted or torn write. None keeps the cage's current setting, on for new cages
+        :param atomic: boolean, write into a temporary file in the same directory, fsync it and move it over
+        file_name with os.replace instead of taking the lock. readers never wait: those that already opened the
+        file keep reading the old one, the next ones read the new one. concurrent atomic writes each publish a
+        whole file and the last one wins, but appends made to the old file while it is being replaced are lost
         :return: void
         """
+        if workers is not None and workers < 1:
+            raise ValueError('workers must be positive, {} found'.format(workers))
+        # a mapped cage would otherwise hold its shared lock and write views of the file it is truncating
+        self._copy_mapped_data()
+        if atomic:
+            self._write_atomically(footer, row_group_size, workers, detect_decimals, checksums)
+            return
         # put a file in the same directory to block new shared requests
         # this prevents a popular file from blocking forever
         # note, this is a blocking function as it waits for other write events to finish
         file_is_new = not os.path.exists(self.file_path)
         with self._get_fcntl_lock('w') as handle:
             try:
-                self._prepare_for_write()
-                self._write_file_info(handle)
-                self._write_bar_data(handle)
-            except:  # TODO catch errors
+                self._write_to_handle(handle, footer, row_group_size, workers, detect_decimals, checksums)
+            except:
                 if file_is_new:
                     os.remove(self.file_path)
-                raise Exception()
+                raise
+            finally:
+                flock(handle, LOCK_UN)  # release lock
+                block_file_name = self._blocking_file_name()
+                if os.path.exists(block_file_name):
+                    os.remove(block_file_name)
+        return
+
+    def append(self, data_by_column: dict):
+        """
+        Appends rows to the file without rewriting it. Requires an exclusive LOCK_EX fcntl lock and a file
+        written in the footer layout, see write(footer=True).
+        Only the new rows are encoded, as new segments of every bar with their own reference value and
+        compression dtype, split by the file's row group size. They are written where the old footer was,
+        followed by a new footer, and num_points is updated in the file info. A bar that is not segmented
+        yet is read once so its existing run can become its first segment.
+        The cage is left empty; call read() to load the file.
+        :param data_by_column: dictionary like { name : numpy array }, with an array for every bar in the file.
+        Arrays are cast to their bar's data type, raising DataTypeNotSupportedError if any value would change
+        :return: void
+        """
+        num_points = None
+        for name, data in data_by_column.items():
+            if num_points is not None and data.size != num_points:
+                raise DataWrongShapeError('data sizes to append do not match')
+            if data.dtype.kind not in utils_supported_kinds():
+                raise DataTypeNotSupportedError('The provided numpy data array had data type that is not supported')
+            num_points = data.size
+        self.close()
+        self._closed_mmap = None
+        with self._get_fcntl_lock('a') as handle:
+            try:
+                self._read_file_info(handle)
+                if not self._use_footer:
+                    raise FileLayoutNotSupportedError('Can only append to files written with footer=True')
+                bars = list(self._index_bars.items()) + list(self._bars.items())
+                names = [i for i, _ in bars]
+                if sorted(names) != sorted(data_by_column):
+                    raise KeyError('Data to append must have exactly the names {}'.format(names))
+                for identifier, b in bars:
+                    if not b.can_append(data_by_column[identifier]):
+                        raise DataTypeNotSupportedError('Data to append to {} does not fit its data type without '
+                                                        'changing values'.format(identifier))
+                for identifier, b in bars:
+                    if b.segment_statistics() is None:
+                        handle.seek(self._bar_offsets[identifier])
+                        b.data_from_file(handle, self._num_points)
+
+                # the new segments overwrite the old footer
+                handle.seek(-NUM_BYTES_FOOTER_TRAILER, os.SEEK_END)
+                handle.seek(read_unsigned_int(handle.read(NUM_BYTES_FOOTER_TRAILER)))
+                for identifier, b in bars:
+                    b.append_data_to_file(handle, data_by_column[identifier], self._bar_offsets[identifier],
+                                          self._row_group_size)
+                self._num_points += num_points
+
+                definitions = [b.encode_info(self._num_bytes_for_identifier).byte_code for _, b in bars]
+                extra_information = [b.extra_information() for _, b in bars]
+                directory = [(self._bar_offsets[i], b.num_bytes_data(self._num_points)) for i, b in bars]
+                self._write_footer(handle, definitions, extra_information, directory)
+                handle.truncate()
+                handle.seek(0)
+                self._write_file_header(handle)
             finally:
                 flock(handle, LOCK_UN)  # release lock
                 block_file_name = self._blocking_file_name()
                 if os.path.exists(block_file_name):
                     os.remove(block_file_name)
+        self._index_bars = {}
+        self._bars = {}
+        self._num_points = None
         return
 
-    def _read_file_info(self, file_handle) -> int:
+    def _read_file_info(self, file_handle, verify: bool = False) -> int:
         """
         Reads the file info from a file_handle. Populates file internals
         :param file_handle: file handle object in 'rb' mode that is seeked to the correct position (0)
+        :param verify: boolean, check the file info against its CRC32 before decoding the bars' extra information,
+        raising ChecksumMismatchError if it does not match or the file is too short to hold it
         :return: int, seek bytes increased since file_handle was received
         """
-        self._timebox_version = read_unsigned_int(file_handle.read(1))
-        self._decode_options(int(read_unsigned_int(file_handle.read(2))))
-        num_bars = read_unsigned_int(file_handle.read(2))
-        self._num_points = read_unsigned_int(file_handle.read(4))
-        self._num_bytes_for_identifier = read_unsigned_int(file_handle.read(1))
-        bytes_seek = 1 + 2 + 2 + 4 + 1
+        file_size = os.fstat(file_handle.fileno()).st_size
+
+        def check_within_file(offset: int):
+            # lengths and offsets are checked before seeking or allocating, a damaged file may hold any value
+            if not 0 <= offset <= file_size:
+                error = ChecksumMismatchError if verify else ValueError
+                raise error('File {} is truncated or damaged'.format(self.file_path))
+            return
+
+        def read(num_bytes: int) -> bytes:
+            check_within_file(file_handle.tell() + num_bytes)
+            return file_handle.read(num_bytes)
+
+        header = read(NUM_BYTES_FILE_HEADER)
+        self._timebox_version = read_unsigned_int(header[0:1])
+        self._decode_options(int(read_unsigned_int(header[1:3])))
+        num_bars = read_unsigned_int(header[3:5])
+        self._num_points = read_unsigned_int(header[5:9])
+        self._num_bytes_for_identifier = read_unsigned_int(header[9:10])
+        bytes_seek = NUM_BYTES_FILE_HEADER
+        if verify and not self._use_checksums:
+            raise FileLayoutNotSupportedError('File {} was written without checksums'.format(self.file_path))
+
+        if self._use_footer:
+            # the trailer points at the footer, which holds the definitions and the bar directory
+            check_within_file(file_size - NUM_BYTES_FOOTER_TRAILER)
+            file_handle.seek(file_size - NUM_BYTES_FOOTER_TRAILER)
+            footer_offset = int(read_unsigned_int(read(NUM_BYTES_FOOTER_TRAILER)))
+            check_within_file(footer_offset)
+            file_handle.seek(footer_offset)
 
         bytes_for_bar_def = num_bars * (self._num_bytes_for_identifier + NUM_BYTES_PER_DEFINITION_WITHOUT_IDENTIFIER)
+        definitions = read(bytes_for_bar_def)
+        bytes_seek += bytes_for_bar_def
+
+        # the extra information of every bar follows the definitions, in the same order
+        bytes_for_extra_information = int(frombuffer(
+            definitions,
+            dtype=_get_panda_bar_info_dtype(self._num_bytes_for_identifier)
+        )['bytes_extra_information'].sum())
+        extra_information = read(bytes_for_extra_information)
+        bytes_seek += bytes_for_extra_information
+        directory = b''
+        if self._use_footer:
+            directory = read(num_bars * FOOTER_DIRECTORY_DTYPE.itemsize)
+            bytes_seek += len(directory) + NUM_BYTES_FOOTER_TRAILER
+        if self._use_checksums:
+            checksum = read(NUM_BYTES_CHECKSUM)
+            bytes_seek += NUM_BYTES_CHECKSUM
+            if verify and read_unsigned_int(checksum) != crc32(header + definitions + extra_information + directory):
+                raise ChecksumMismatchError('File info of {} does not match its checksum'.format(self.file_path))
+
         bars = _PandaBar.decode_panda_bars_definitions_from_bytes(
-            file_handle.read(bytes_for_bar_def),
-            num_bytes_for_identifier=self._num_bytes_for_identifier,
-            identifiers_are_strings=False
+            definitions,
+            num_bytes_for_identifier=self._num_bytes_for_identifier
         )
-        self._index_bars = dict([(i, b) for i, b in bars if b.is_index()])
-        self._bars = dict([(i, b) for i, b in bars if not b.is_index()])
-        bytes_seek += bytes_for_bar_def
+        self._index_bars = dict([(i, b) for i, b in bars.items() if b.is_index()])
+        self._bars = dict([(i, b) for i, b in bars.items() if not b.is_index()])
+        counter = 0
+        for b in bars.values():
+            b.decode_extra_information(extra_information[counter:counter + b.num_extra_bytes_required()])
+            counter += b.num_extra_bytes_required()
+        self._row_group_size = None if len(bars) == 0 else list(bars.values())[0].segment_size()
+
+        if self._use_footer:
+            directory = frombuffer(directory, dtype=FOOTER_DIRECTORY_DTYPE)
+            self._bar_offsets = dict(zip(bars, [int(d['offset']) for d in directory]))
+        else:
+            self._locate_bar_data(bytes_seek)
         return bytes_seek
 
+    def _file_info_matches_file_size(self, file_handle) -> bool:
+        """
+        Reads the file info again without checksums and checks that the file ends where it says it does, which
+        tells a file written without checksums from one whose checksums option bit was flipped
+        :param file_handle: file handle in 'rb' mode
+        :return: boolean
+        """
+        file_handle.seek(0)
+        try:
+            bytes_seek = self._read_file_info(file_handle)
+            if self._use_checksums:
+                return False
+            if self._use_footer:
+                end = file_handle.tell() + NUM_BYTES_FOOTER_TRAILER
+            else:
+                end = max([bytes_seek] + [self._bar_offsets[i] + b.num_bytes_data(self._num_points) for i, b in
+                                          list(self._index_bars.items()) + list(self._bars.items())])
+        except (ValueError, TypeError, IndexError, KeyError, OverflowError, MemoryError, OSError,
+                CharConversionException):
+            return False
+        return end == os.fstat(file_handle.fileno()).st_size
+
+    def _locate_bar_data(self, data_offset: int):
+        """
+        Works out the byte offset of every bar's data from the decoded bar definitions
+        :param data_offset: byte offset of the first bar's data in the file
+        :return: void, populates class internals
+        """
+        self._bar_offsets = {}
+        for identifier, b in list(self._index_bars.items()) + list(self._bars.items()):
+            self._bar_offsets[identifier] = data_offset
+            data_offset += b.num_bytes_data(self._num_points)
+        return
+
+    def _select_columns(self, columns: list = None, where: list = None):
+        """
+        Drops the non-index bars that were not asked for so they are never read
+        :param columns: list of bar names to keep, or None to keep every bar
+        :param where: optional list of predicates, the bars they refer to are kept as well
+        :return: void, populates class internals
+        """
+        if columns is None:
+            return
+        if where is not None:
+            columns = list(columns) + [p[0] for p in where]
+        missing = [c for c in columns if c not in self._bars and c not in self._index_bars]
+        if len(missing) > 0:
+            raise KeyError('Could not find names {} in PandaCage'.format(missing))
+        self._bars = dict([(i, b) for i, b in self._bars.items() if i in columns])
+        return
+
+    def _validate_predicates(self, where: list = None):
+        """
+        Checks that every predicate is like (name, operator, value) with a known operator
+        :param where: list of predicates, or None
+        :return: void, raises ValueError if a predicate is invalid
+        """
+        if where is None:
+            return
+        for predicate in where:
+            if len(predicate) != 3 or predicate[1] not in COMPARISON_OPERATORS:
+                raise ValueError('Predicate {} must be like (name, operator, value) with operator in {}'.format(
+                    predicate, list(COMPARISON_OPERATORS)))
+        return
+
+    def _get_bar(self, name: str) -> _PandaBar:
+        """
+        Looks up a bar, index or not, by name
+        :param name: name of the bar
+        :return: _PandaBar
+        """
+        if name in self._index_bars:
+            return self._index_bars[name]
+        elif name in self._bars:
+            return self._bars[name]
+        raise KeyError('Could not find name {} in PandaCage'.format(name))
+
+    def _select_row_groups(self, where: list = None):
+        """
+        Uses the row group statistics to drop the row groups in which no row can match the predicates,
+        before any data is read
+        :param where: list of predicates, or None
+        :return: void, populates class internals
+        """
+        if where is None or self._row_group_size is None:
+            return
+        keep = None
+        for name, op, value in where:
+            statistics = self._get_bar(name).segment_statistics()
+            matches = array([segment_may_match(s, op, value) for s in statistics], dtype=bool)
+            keep = matches if keep is None else keep & matches
+        indices = flatnonzero(keep)
+        bars = list(self._index_bars.values()) + list(self._bars.values())
+        for b in bars:
+            b.select_segments(indices)
+        self._num_points = bars[0].num_points()
+        return
+
+    def _index_range_predicates(self, index_range: tuple = None) -> Union[list, None]:
+        """
+        Turns an index range into predicates on the first index bar, so the row groups outside it are skipped
+        :param index_range: (start, stop), or None
+        :return: list of predicates, or None
+        """
+        if index_range is None:
+            return None
+        if len(self._index_bars) == 0:
+            raise ValueError('index_range needs an index bar, none found in {}'.format(self.file_path))
+        if len(index_range) != 2:
+            raise ValueError('index_range must be like (start, stop), {} found'.format(index_range))
+        name, index_bar = list(self._index_bars.items())[0]
+        # bounds like '2020-01-01' are compared to the statistics as values of the index, like _index_range_rows
+        start, stop = [None if b is None else asarray(b, dtype=index_bar.data_type())[()] for b in index_range]
+        predicates = []
+        if start is not None:
+            predicates.append((name, '>=', start))
+        if stop is not None:
+            predicates.append((name, '<', stop))
+        return predicates
+
+    def _index_range_rows(self, index_range: tuple) -> tuple:
+        """
+        Binary searches the first index bar, which must already hold its data, for the rows in index_range
+        :param index_range: (start, stop), either may be None
+        :return: tuple like (first row, row after the last row)
+        """
+        index = list(self._index_bars.values())[0].get_data(copy=False)
+        if index.size > 1 and not (index[1:] >= index[:-1]).all():
+            raise ValueError('index_range needs a sorted index bar, {} is not sorted'.format(
+                list(self._index_bars.keys())[0]))
+        start, stop = index_range
+        start_row = 0 if start is None else int(searchsorted(index, asarray(start, dtype=index.dtype), side='left'))
+        stop_row = index.size if stop is None else int(searchsorted(index, asarray(stop, dtype=index.dtype),
+                                                                      side='left'))
+        return start_row, max(start_row, stop_row)
+
+    def _read_bar_data_in_index_range(self, file_handle, index_range: tuple):
+        """
+        Reads the first index bar whole, then only the rows of the other bars that fall in index_range
+        :param file_handle: file handle in 'rb' mode
+        :param index_range: (start, stop), either may be None
+        :return: void, populates class internals
+        """
+        name, index_bar = list(self._index_bars.items())[0]
+        file_handle.seek(self._bar_offsets[name])
+        index_bar.data_from_file(file_handle, self._num_points)
+        start, stop = self._index_range_rows(index_range)
+        for identifier, b in list(self._index_bars.items()) + list(self._bars.items()):
+            if b is not index_bar:
+                b.set_data(b.data_slice_from_file(file_handle, self._bar_offsets[identifier], self._num_points,
+                                                  start, stop), copy=False)
+        index_bar.set_data(index_bar.get_data(copy=False)[start:stop], copy=False)
+        self._num_points = stop - start
+        return
+
+    def _slice_rows(self, start: int, stop: int):
+        """
+        Keeps only rows [start, stop) of bars that already hold their data
+        :param start: first row to keep
+        :param stop: row after the last row to keep
+        :return: void, populates class internals
+        """
+        for b in list(self._index_bars.values()) + list(self._bars.values()):
+            b.set_data(b.get_data(copy=False)[start:stop], copy=False)
+        self._num_points = stop - start
+        return
+
+    def _filter_rows(self, where: list = None):
+        """
+        Keeps only the rows that match every predicate
+        :param where: list of predicates, or None
+        :return: void, populates class internals
+        """
+        if where is None:
+            return
+        mask = ones(self._num_points, dtype=bool)
+        for name, op, value in where:
+            matches = COMPARISON_OPERATORS[op](self._get_bar(name).get_data(copy=False), value)
+            if isinstance(matches, MaskedArray):
+                # null rows match like NaN does, only '!='
+                matches = matches.filled(op == '!=')
+            mask &= matches
+        for b in list(self._index_bars.values()) + list(self._bars.values()):
+            b.set_data(b.get_data(copy=False)[mask], copy=False)
+        self._num_points = count_nonzero(mask)
+        return
+
+    def _write_to_handle(self, file_handle, footer: bool = None, row_group_size: int = None, workers: int = None,
+                         detect_decimals: bool = True, checksums: bool = None):
+        """
+        Applies the write options, then encodes and writes the whole file to file_handle. see write()
+        :param file_handle: empty file handle in 'w+b' mode
+        :param footer: see write()
+        :param row_group_size: see write()
+        :param workers: see write()
+        :param detect_decimals: see write()
+        :param checksums: see write()
+        :return: void
+        """
+        if footer is not None:
+            self._use_footer = footer
+        if row_group_size is not None:
+            self._row_group_size = row_group_size if row_group_size > 0 else None
+        if checksums is not None:
+            self._use_checksums = checksums
+        for b in list(self._index_bars.values()) + list(self._bars.values()):
+            b.set_checksums(self._use_checksums)
+            if detect_decimals:
+                b.detect_floating_point_rounding()
+            b.set_segment_size(self._row_group_size)
+        if workers is not None and workers > 1:
+            self._encode_bars_in_parallel(workers)
+        if self._use_footer:
+            self._write_bar_data_and_footer(file_handle)
+        else:
+            self._prepare_for_write()
+            self._write_file_info(file_handle)
+            self._write_bar_data(file_handle)
+        return
+
+    def _write_atomically(self, footer: bool = None, row_group_size: int = None, workers: int = None,
+                          detect_decimals: bool = True, checksums: bool = None):
+        """
+        Writes the file into a temporary file next to file_name, then publishes it with os.replace. see write()
+        :param footer: see write()
+        :param row_group_size: see write()
+        :param workers: see write()
+        :param detect_decimals: see write()
+        :param checksums: see write()
+        :return: void
+        """
+        temp_file_name = self._temporary_file_name()
+        file_descriptor = os.open(temp_file_name, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            with os.fdopen(file_descriptor, 'w+b') as handle:
+                # same permissions as a plain open() would give, or as the file being replaced
+                if os.path.exists(self.file_path):
+                    os.fchmod(handle.fileno(), os.stat(self.file_path).st_mode & 0o777)
+                self._write_to_handle(handle, footer, row_group_size, workers, detect_decimals, checksums)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(temp_file_name, self.file_path)
+        except:
+            if os.path.exists(temp_file_name):
+                os.remove(temp_file_name)
+            raise
+        # make the rename itself durable
+        directory_descriptor = os.open(os.path.dirname(os.path.abspath(self.file_path)), os.O_RDONLY)
+        try:
+            os.fsync(directory_descriptor)
+        finally:
+            os.close(directory_descriptor)
+        return
+
     def _write_file_info(self, file_handle) -> int:
         """
         Writes out the file info to the file handle
         :param file_handle: file handle object in 'wb' mode. pre-seeked to correct position (0)
         :return: int, seek bytes advanced in this method
         """
-        array([uint8(self._timebox_version)], dtype=uint8).tofile(file_handle)
-        array([uint16(self._encode_options())], dtype=uint16).tofile(file_handle)
-        num_bars = len(self._index_bars) + len(self._bars)
-        array([uint16(num_bars)], dtype=uint16).tofile(file_handle)
-        array([uint32(self._num_points)], dtype=uint32).tofile(file_handle)
+        bytes_seek = self._write_file_header(file_handle)
+        definition_bytes = self._encode_bar_definitions()
+        extra_information = b''.join([b.extra_information() for b in self._index_bars.values()] +
+                                     [b.extra_information() for b in self._bars.values()])
+        file_handle.write(definition_bytes)
+        file_handle.write(extra_information)
+        bytes_seek += len(definition_bytes) + len(extra_information)
+        if self._use_checksums:
+            checksum = crc32(self._file_header_bytes() + definition_bytes + extra_information)
+            array([uint32(checksum)], dtype=uint32).tofile(file_handle)
+            bytes_seek += NUM_BYTES_CHECKSUM
+        return bytes_seek
 
+    def _write_file_header(self, file_handle) -> int:
+        """
+        Writes out the fixed-size part of the file info
+        :param file_handle: file handle object in 'wb' mode. pre-seeked to correct position (0)
+        :return: int, seek bytes advanced in this method
+        """
+        file_handle.write(self._file_header_bytes())
+        return NUM_BYTES_FILE_HEADER
+
+    def _file_header_bytes(self) -> bytes:
+        """
+        Encodes the fixed-size part of the file info
+        :return: bytes, NUM_BYTES_FILE_HEADER long
+        """
+        num_bars = len(self._index_bars) + len(self._bars)
         self._update_required_bytes_for_tag_identifier()
-        array([uint8(self._num_bytes_for_identifier)], dtype=uint8).tofile(file_handle)
-        bytes_seek = 1 + 2 + 2 + 4 + 1
+        return array([uint8(self._timebox_version)], dtype=uint8).tobytes() +\
+            array([uint16(self._encode_options())], dtype=uint16).tobytes() +\
+            array([uint16(num_bars)], dtype=uint16).tobytes() +\
+            array([uint32(self._num_points)], dtype=uint32).tobytes() +\
+            array([uint8(self._num_bytes_for_identifier)], dtype=uint8).tobytes()
 
-        index_bytes_list = [b.encode_info(self._num_bytes_for_identifier, True)
-                            for _, b in self._index_bars]  # TODO make sure this is sorted
+    def _encode_bar_definitions(self) -> bytes:
+        """
+        Encodes the definitions of every bar. This encodes the data of any bar that is not yet encoded
+        :return: bytes
+        """
+        # bars are written in insertion order, index bars first. the data section follows the same order
+        index_bytes_list = [b.encode_info(self._num_bytes_for_identifier)
+                            for b in self._index_bars.values()]
         index_bytes = b''.join([b.byte_code for b in index_bytes_list])
-        index_num_bytes = sum([b.num_bytes for b in index_bytes_list])
-        bars_bytes_list = [b.encode_info(self._num_bytes_for_identifier, True)
-                           for _, b in self._bars]  # TODO make sure this is sorted
+        bars_bytes_list = [b.encode_info(self._num_bytes_for_identifier)
+                           for b in self._bars.values()]
         bars_bytes = b''.join([b.byte_code for b in bars_bytes_list])
-        bars_num_bytes = sum([b.num_bytes for b in bars_bytes_list])
-
-        file_handle.write(index_bytes)
-        file_handle.write(bars_bytes)
-        bytes_seek += index_num_bytes + bars_num_bytes
-
-        return bytes_seek
+        return index_bytes + bars_bytes
 
     def _prepare_for_write(self):
         """
         Performs sorting and compression to prepare for write
         :return: None
         """
-        raise NotImplementedError()  # TODO
+        self._validate_data_for_write()
+        for b in self._index_bars.values():
+            b.prepare_for_write()
+        for b in self._bars.values():
+            b.prepare_for_write()
+        return
+
+    def _encode_bars_in_parallel(self, workers: int):
+        """
+        Validates and encodes all bars on a pool of threads. The write methods then find
+        the bars already encoded and only write the buffers out in file order
+        :param workers: number of threads
+        :return: None
+        """
+        self._validate_data_for_write()
+        bars = list(self._index_bars.values()) + list(self._bars.values())
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # consuming the results re-raises the first exception of any bar
+            list(executor.map(lambda b: b.prepare_for_write(), bars))
+        return
+
+    def _decode_bars_in_parallel(self, workers: int):
+        """
+        Decodes all bars that have been read on a pool of threads
+        :param workers: number of threads
+        :return: None
+        """
+        bars = list(self._index_bars.values()) + list(self._bars.values())
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda b: b.prepare_for_read(), bars))
+        return
 
     def _validate_data_for_write(self):
         """
@@ -224,17 +1008,85 @@ class PandaCage:
             seek_bytes += self._bars[b].data_to_file(file_handle)
         return seek_bytes
 
-    def _read_bar_data(self, file_handle) -> int:
+    def _write_bar_data_and_footer(self, file_handle) -> int:
         """
-        reads in data from the file handle
-        :param file_handle: file handle in 'rb' mode, pre-seeked to the correct starting position
+        writes the file in the footer layout: the fixed-size file info, then each bar's data, encoded
+        and flushed one bar at a time, then a footer holding the bar definitions and a directory of
+        bar offsets and lengths, and finally a fixed-size trailer holding the offset of the footer
+        :param file_handle: file handle object in 'wb' mode. pre-seeked to correct position (0)
         :return: int, seek bytes advanced in this method
         """
-        seek_bytes = 0
-        for b in self._bars:
-            seek_bytes += self._bars[b].data_from_file(file_handle, self._num_points)
+        self._validate_data_for_write()
+        seek_bytes = self._write_file_header(file_handle)
+        definitions = []
+        extra_information = []
+        directory = []
+        for b in list(self._index_bars.values()) + list(self._bars.values()):
+            b.prepare_for_write()
+            num_bytes = b.data_to_file(file_handle)
+            definitions.append(b.encode_info(self._num_bytes_for_identifier).byte_code)
+            extra_information.append(b.extra_information())
+            b.release_encoded_data()
+            directory.append((seek_bytes, num_bytes))
+            seek_bytes += num_bytes
+
+        seek_bytes += self._write_footer(file_handle, definitions, extra_information, directory)
         return seek_bytes
 
+    def _write_footer(self, file_handle, definitions: list, extra_information: list, directory: list) -> int:
+        """
+        writes the footer at the file handle's position, followed by the checksum of the file info if the cage
+        stores checksums, and the trailer pointing at the footer
+        :param file_handle: file handle object in 'wb' mode, positioned after the last bar's data
+        :param definitions: list of encoded bar definitions, in bar order
+        :param extra_information: list of the bars' extra information bytes, in bar order
+        :param directory: list of (offset, num_bytes) tuples locating each bar's data, in bar order
+        :return: int, seek bytes advanced in this method
+        """
+        footer_offset = file_handle.tell()
+        footer_bytes = b''.join(definitions) + b''.join(extra_information) +\
+            array(directory, dtype=FOOTER_DIRECTORY_DTYPE).tobytes()
+        file_handle.write(footer_bytes)
+        if self._use_checksums:
+            checksum = crc32(self._file_header_bytes() + footer_bytes)
+            array([uint32(checksum)], dtype=uint32).tofile(file_handle)
+        array([uint64(footer_offset)], dtype=uint64).tofile(file_handle)
+        return len(footer_bytes) + NUM_BYTES_FOOTER_TRAILER + (NUM_BYTES_CHECKSUM if self._use_checksums else 0)
+
+    def _read_bar_data(self, file_handle) -> int:
+        """
+        reads in data from the file handle, seeking to each bar's offset
+        :param file_handle: file handle in 'rb' mode
+        :return: int, bytes read in this method
+        """
+        read_bytes = 0
+        for identifier, b in list(self._index_bars.items()) + list(self._bars.items()):
+            file_handle.seek(self._bar_offsets[identifier])
+            read_bytes += b.data_from_file(file_handle, self._num_points)
+        return read_bytes
+
+    def _verify_bar_data(self):
+        """
+        Checks the data bytes every bar has read against their checksums
+        :return: void, raises ChecksumMismatchError on a mismatch
+        """
+        for identifier, b in list(self._index_bars.items()) + list(self._bars.items()):
+            if not b.verify_checksums():
+                raise ChecksumMismatchError('Data of bar {} in {} does not match its checksum'.format(
+                    identifier, self.file_path))
+        return
+
+    def _read_bar_data_from_buffer(self, buffer) -> int:
+        """
+        points every bar at its data inside buffer without copying
+        :param buffer: buffer holding the whole file, e.g. a numpy memmap
+        :return: int, bytes spanned by the bar data
+        """
+        read_bytes = 0
+        for identifier, b in list(self._index_bars.items()) + list(self._bars.items()):
+            read_bytes += b.data_from_buffer(buffer, self._bar_offsets[identifier], self._num_points)
+        return read_bytes
+
     def _decode_options(self, from_int: int):
         """
         Reads the options from the 1-byte options bit
@@ -242,6 +1094,8 @@ class PandaCage:
         :return: void, populates class internals
         """
         # starting with the right-most bits and working left
+        self._use_footer = True if (from_int >> 0) & 1 else False
+        self._use_checksums = True if (from_int >> 1) & 1 else False
         return
 
     def _encode_options(self) -> int:
@@ -251,6 +1105,9 @@ class PandaCage:
         """
         # note, this needs to be in the opposite order as _decode_options
         options = 0
+        options |= 1 if self._use_checksums else 0
+        options <<= 1
+        options |= 1 if self._use_footer else 0
         return options
 
     def _update_required_bytes_for_tag_identifier(self):
@@ -258,7 +1115,7 @@ class PandaCage:
         Looks at the tag list and determines what the max bytes required is
         :return: void, updates class internals
         """
-        max_length = max([len(k) for k in self._tags])
+        max_length = max([len(k) for k in list(self._index_bars) + list(self._bars)])
         self._num_bytes_for_identifier = max_length * 4
         return
 
@@ -269,21 +1126,34 @@ class PandaCage:
         """
         return '{}.lock'.format(self.file_path)
 
+    def _temporary_file_name(self) -> str:
+        """
+        returns a unique file name in the same directory as file_path, so os.replace never crosses file systems
+        :return: file name of temporary file
+        """
+        return '{}.{}.tmp'.format(self.file_path, uuid4().hex)
+
     def _get_fcntl_lock(self, mode: str = 'r'):
         """
-        gets a lock of type 'w' (writing) or 'r' (reading). throws error if can't get lock in time
+        gets a lock of type 'w' (writing), 'a' (appending) or 'r' (reading). throws error if can't get lock in time
         this is a blocking function, but doesn't block for more than the specified
         _MAX_READ/WRITE_BLOCK_WAIT_SECONDS.
-        :param mode: single char, 'w' or 'r'
+        :param mode: single char, 'w', 'a' or 'r'. 'w' truncates the file once locked, 'a' leaves it as is
         :return: file handle if succeeded, raise exception if failed
         """
-        if mode not in ['r', 'w']:
+        if mode not in ['r', 'w', 'a']:
             raise ValueError('Could not get fcntl lock because mode specified was invalid: {}'.format(mode))
         block_file_name = self._blocking_file_name()
         count = 0
         sleep_seconds = 0.1
         file_locked = False
-        handle = open(self.file_path, 'rb' if mode is 'r' else 'wb')
+        if mode == 'r':
+            handle = open(self.file_path, 'rb')
+        elif mode == 'a':
+            handle = open(self.file_path, 'r+b')
+        else:
+            # don't truncate until the exclusive lock is held, readers may still be using the file
+            handle = open(self.file_path, 'r+b' if os.path.exists(self.file_path) else 'w+b')
         if mode == 'r':
             # check and see if a blocking file exists, meaning we're waiting for a write job to clear
             # then try to get the lock
@@ -297,7 +1167,7 @@ class PandaCage:
                         pass
                 count += 1
                 time.sleep(sleep_seconds)
-        if mode == 'w':
+        if mode in ['w', 'a']:
             block_file_is_mine = False
             while not file_locked and count <= (self._MAX_WRITE_BLOCK_WAIT_SECONDS / sleep_seconds):
                 if not os.path.exists(block_file_name):
@@ -319,4 +1189,6 @@ class PandaCage:
         if not file_locked:
             handle.close()
             raise CouldNotAcquireFileLockError
-        return handle
\ No newline at end of file
+        if mode == 'w':
+            handle.truncate(0)
+        return handle
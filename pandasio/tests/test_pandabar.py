@@ -1,5 +1,5 @@
 import unittest
-from numpy import float64
+from numpy import float64, arange, int64, int32
 from pandasio.pandabar import _PandaBar, _get_panda_bar_info_dtype
 from pandasio.exceptions import IdentifierByteRepresentationError
 from pandasio.utils.exceptions import NumBytesForStringInvalidError
@@ -180,6 +180,12 @@ class TestPandaBar(unittest.TestCase):
         p._use_compression = True
         p._is_index = True
         self.assertEqual(15, p._encode_options())
+
+        p._use_validity = True
+        self.assertEqual(47, p._encode_options())
+
+        p._use_block_compression = True
+        self.assertEqual(111, p._encode_options())
         return
 
     def test_panda_bar_decode_options(self):
@@ -280,6 +286,37 @@ class TestPandaBar(unittest.TestCase):
         self.assertTrue(p._use_hash_table)
         self.assertTrue(p._use_compression)
         self.assertTrue(p._is_index)
+        self.assertFalse(p._use_validity)
+
+        p._decode_options(32)
+        self.assertTrue(p._use_validity)
+        self.assertFalse(p._use_segments)
+        self.assertFalse(p._is_index)
+        self.assertFalse(p._use_block_compression)
+
+        p._decode_options(64)
+        self.assertTrue(p._use_block_compression)
+        self.assertFalse(p._use_validity)
+        return
+
+    def test_panda_bar_set_and_get_data_without_copy(self):
+        data = arange(10, dtype=int64)
+        p = _PandaBar('data', 8, NumpyTypeChars.INTEGER)
+        p.set_data(data)
+        self.assertFalse(p._data is data)
+        p.set_data(data, copy=False)
+        self.assertTrue(p._data is data)
+        p.set_data(data[::2], copy=False)  # not contiguous
+        self.assertTrue(p._data.flags.c_contiguous)
+        p.set_data(data.astype(int32), copy=False)  # needs a cast
+        self.assertEqual(int64, p._data.dtype)
+
+        view = p.get_data(copy=False)
+        self.assertFalse(view.flags.writeable)
+        with self.assertRaises(ValueError):
+            view[0] = 5
+        self.assertTrue(p.get_data().flags.writeable)
+        self.assertTrue(p._data.flags.writeable)
         return
 
 if __name__ == '__main__':
@@ -1,4 +1,5 @@
 import unittest
+from numpy import dtype, uint8, int64
 from pandasio.pandabar import _PandaBar
 from pandasio.utils.numpy_utils import NumpyTypeChars
 
@@ -23,5 +24,25 @@ class TestPandaBarDetailsBytes(unittest.TestCase):
         self.assertEqual(4, ret_bytes[0])
         return
 
+    def test_panda_bar_bit_packed_details_bytes(self):
+        p = _PandaBar('data', 8, NumpyTypeChars.INTEGER)
+        p._use_compression = True
+        p._compression_mode = 'b'
+        p._compression_dtype = dtype(uint8)
+        p._compression_reference_value_dtype = dtype(int64)
+        p._compression_reference_value = -5
+        p._compression_bit_width = 11
+        ret_bytes = p._encode_details_bytes()
+        self.assertEqual(11, ret_bytes[13])
+
+        q = _PandaBar('data', 8, NumpyTypeChars.INTEGER)
+        q._use_compression = True
+        q._decode_details_bytes(ret_bytes)
+        self.assertEqual('b', q._compression_mode)
+        self.assertEqual(-5, q._compression_reference_value)
+        self.assertEqual(11, q._compression_bit_width)
+        self.assertEqual((uint8, 3), q._encoded_dtype_and_count(2))
+        return
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,1095 @@
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+import numpy as np
+from pandasio.pandacage import PandaCage, segment_may_match
+from pandasio.pandabar import SegmentStatistics
+from pandasio.exceptions import DataWrongShapeError, DataTypeNotSupportedError, FileLayoutNotSupportedError,\
+    ChecksumMismatchError
+from pandasio.utils.exceptions import CompressionModeInvalidError, InvalidPandasIndexError,\
+    BlockCompressionInvalidError
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+
+class TestPandaCage(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.directory, 'test.cage')
+        return
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        return
+
+    def write_cage(self) -> PandaCage:
+        cage = PandaCage(self.file_path)
+        cage.set_data(np.arange(100, 200, dtype=np.int64), 'time', is_index=True)
+        cage.set_data(np.linspace(0, 1, 100), 'price')
+        cage.set_data(np.arange(100, dtype=np.uint8), 'small', compression_mode='m')
+        cage.write()
+        return cage
+
+    def test_set_data_errors(self):
+        cage = PandaCage(self.file_path)
+        cage.set_data(np.arange(4, dtype=np.int32), 'a')
+        with self.assertRaises(DataWrongShapeError):
+            cage.set_data(np.arange(5, dtype=np.int32), 'b')
+        with self.assertRaises(DataTypeNotSupportedError):
+            cage.set_data(np.array(['a', 'b', 'c', 'd'], dtype=object), 'c')
+        with self.assertRaises(KeyError):
+            cage.get_data('d')
+        return
+
+    def test_write_read_round_trip(self):
+        self.write_cage()
+        cage = PandaCage.open(self.file_path)
+        self.assertEqual(100, cage._num_points)
+        self.assertEqual(['time'], list(cage._index_bars))
+        self.assertEqual(['price', 'small'], list(cage._bars))
+        np.testing.assert_array_equal(np.arange(100, 200, dtype=np.int64), cage.get_data('time'))
+        np.testing.assert_array_equal(np.linspace(0, 1, 100), cage.get_data('price'))
+        np.testing.assert_array_equal(np.arange(100, dtype=np.uint8), cage.get_data('small'))
+        return
+
+    def test_float_bars_round_trip_exactly(self):
+        rng = np.random.default_rng(7)
+        values = {
+            'mixed': np.array([1e16, 1.0, 3.3, -1e16, -0.0, 0.0, 5e-324, -2.5] * 25),
+            'random': rng.standard_normal(200) * 10.0 ** rng.integers(-12, 12, 200),
+            'single': rng.random(200).astype(np.float32),
+            'zeros': np.array([0.0, -0.0, -0.0, 0.0] * 50)
+        }
+        for mode in [None, 'm', 'e', 'd', 'r', 'b', 'a']:
+            for row_group_size in [None, 64]:
+                cage = PandaCage(self.file_path)
+                for name, data in values.items():
+                    cage.set_data(data, name, compression_mode=mode)
+                cage.write(row_group_size=row_group_size)
+                read = PandaCage.open(self.file_path)
+                for name, data in values.items():
+                    bits = 'u{}'.format(data.itemsize)
+                    np.testing.assert_array_equal(data.view(bits), read.get_data(name).view(bits),
+                                                  err_msg='{} {}'.format(name, mode))
+        return
+
+    def test_mmap_read(self):
+        self.write_cage()
+        with PandaCage.open(self.file_path, mmap=True) as cage:
+            np.testing.assert_array_equal(np.arange(100, 200, dtype=np.int64), cage.get_data('time'))
+            np.testing.assert_array_equal(np.linspace(0, 1, 100), cage.get_data('price'))
+            np.testing.assert_array_equal(np.arange(100, dtype=np.uint8), cage.get_data('small'))
+
+            # uncompressed bars are views into the mapping, not copies
+            small = cage._bars['small']
+            small._decode_data()
+            self.assertIs(cage._mmap, small._data.base)
+            self.assertFalse(small._data.flags.writeable)
+        self.assertIsNone(cage._mmap)
+        self.assertIsNone(cage._mmap_handle)
+        return
+
+    def test_mmap_read_then_write(self):
+        cage = self.write_cage()
+        cage.set_data(np.arange(100, dtype=np.int64) * 1000, 'large', compression_mode='e')
+        for row_group_size, close in ((0, False), (0, True), (30, False), (30, True)):
+            cage.write(row_group_size=row_group_size)
+            cage = PandaCage.open(self.file_path, mmap=True)
+            cage.get_data('small')
+            if close:
+                cage.close()
+            cage.set_data(np.linspace(1, 2, 100), 'price')
+            cage.write()
+            self.assertIsNone(cage._mmap_handle)
+            read = PandaCage.open(self.file_path)
+            np.testing.assert_array_equal(np.arange(100, 200, dtype=np.int64), read.get_data('time'))
+            np.testing.assert_array_equal(np.linspace(1, 2, 100), read.get_data('price'))
+            np.testing.assert_array_equal(np.arange(100, dtype=np.uint8), read.get_data('small'))
+            np.testing.assert_array_equal(np.arange(100) * 1000, read.get_data('large'))
+            np.testing.assert_array_equal(np.arange(100, dtype=np.uint8), cage.get_data('small'))
+        return
+
+    def test_read_columns(self):
+        self.write_cage()
+        cage = PandaCage.open(self.file_path, columns=['small'])
+        self.assertEqual(['time'], list(cage._index_bars))
+        self.assertEqual(['small'], list(cage._bars))
+        np.testing.assert_array_equal(np.arange(100, 200, dtype=np.int64), cage.get_data('time'))
+        np.testing.assert_array_equal(np.arange(100, dtype=np.uint8), cage.get_data('small'))
+        with self.assertRaises(KeyError):
+            cage.get_data('price')
+
+        with PandaCage.open(self.file_path, mmap=True, columns=['price']) as cage:
+            self.assertEqual(['price'], list(cage._bars))
+            np.testing.assert_array_equal(np.linspace(0, 1, 100), cage.get_data('price'))
+
+        with self.assertRaises(KeyError):
+            PandaCage.open(self.file_path, columns=['not a bar'])
+        return
+
+    def test_footer_layout(self):
+        cage = self.write_cage()
+        header_size = os.path.getsize(self.file_path)
+        cage.write(footer=True)
+        # the footer adds a 16 byte directory entry per bar and an 8 byte trailer
+        self.assertEqual(header_size + 3 * 16 + 8, os.path.getsize(self.file_path))
+
+        cage = PandaCage.open(self.file_path)
+        self.assertTrue(cage._use_footer)
+        np.testing.assert_array_equal(np.arange(100, 200, dtype=np.int64), cage.get_data('time'))
+        np.testing.assert_array_equal(np.linspace(0, 1, 100), cage.get_data('price'))
+        np.testing.assert_array_equal(np.arange(100, dtype=np.uint8), cage.get_data('small'))
+
+        with PandaCage.open(self.file_path, mmap=True, columns=['small']) as cage:
+            self.assertEqual(['small'], list(cage._bars))
+            np.testing.assert_array_equal(np.arange(100, dtype=np.uint8), cage.get_data('small'))
+
+        # re-writing keeps the layout unless asked otherwise
+        cage = PandaCage.open(self.file_path)
+        cage.write()
+        self.assertTrue(PandaCage.open(self.file_path)._use_footer)
+        cage.write(footer=False)
+        self.assertEqual(header_size, os.path.getsize(self.file_path))
+        cage = PandaCage.open(self.file_path)
+        self.assertFalse(cage._use_footer)
+        np.testing.assert_array_equal(np.arange(100, 200, dtype=np.int64), cage.get_data('time'))
+        return
+
+    def test_segment_may_match(self):
+        s = SegmentStatistics(10, 20, 0)
+        self.assertTrue(segment_may_match(s, '==', 10))
+        self.assertFalse(segment_may_match(s, '==', 21))
+        self.assertTrue(segment_may_match(s, '!=', 10))
+        self.assertFalse(segment_may_match(SegmentStatistics(10, 10, 0), '!=', 10))
+        self.assertTrue(segment_may_match(SegmentStatistics(10, 10, 1), '!=', 10))
+        self.assertTrue(segment_may_match(s, '<', 11))
+        self.assertFalse(segment_may_match(s, '<', 10))
+        self.assertTrue(segment_may_match(s, '<=', 10))
+        self.assertTrue(segment_may_match(s, '>', 19))
+        self.assertFalse(segment_may_match(s, '>', 20))
+        self.assertTrue(segment_may_match(s, '>=', 20))
+        self.assertFalse(segment_may_match(SegmentStatistics(np.nan, np.nan, 5), '>', 0))
+        return
+
+    def test_row_groups(self):
+        cage = self.write_cage()
+        cage.write(row_group_size=30)
+        cage = PandaCage.open(self.file_path)
+        self.assertEqual(30, cage._row_group_size)
+        self.assertEqual([30, 30, 30, 10], cage._bars['price'].segment_num_points())
+        statistics = cage._bars['small'].segment_statistics()
+        self.assertEqual([0, 30, 60, 90], [s.min_value for s in statistics])
+        self.assertEqual([29, 59, 89, 99], [s.max_value for s in statistics])
+        np.testing.assert_array_equal(np.arange(100, 200, dtype=np.int64), cage.get_data('time'))
+        np.testing.assert_array_equal(np.linspace(0, 1, 100), cage.get_data('price'))
+        np.testing.assert_array_equal(np.arange(100, dtype=np.uint8), cage.get_data('small'))
+
+        # footer layout keeps the row groups
+        cage.write(footer=True)
+        cage = PandaCage.open(self.file_path)
+        self.assertEqual(30, cage._row_group_size)
+        np.testing.assert_array_equal(np.arange(100, dtype=np.uint8), cage.get_data('small'))
+
+        cage.write(footer=False, row_group_size=0)
+        cage = PandaCage.open(self.file_path)
+        self.assertIsNone(cage._row_group_size)
+        self.assertIsNone(cage._bars['small'].segment_statistics())
+        return
+
+    def test_row_groups_keep_bar_options(self):
+        noise = np.sin(np.arange(100) * 7.3) * 1e-3 + 1
+        price = np.round(100 + (np.arange(100) * 7919 % 500) / 100.0, 2)
+        cage = PandaCage(self.file_path)
+        cage.set_data(np.arange(100, dtype=np.int64), 'time', is_index=True)
+        cage.set_data(noise, 'noise', compression_mode='x')
+        cage.set_data(np.arange(100, dtype=np.int64) % 7, 'auto', compression_mode='a')
+        cage.set_data(price, 'price')
+        cage.write(footer=True, row_group_size=30)
+
+        cage = PandaCage.open(self.file_path)
+        self.assertEqual('x', cage._bars['noise']._compression_mode)
+        self.assertTrue(cage._bars['auto']._auto_compression)
+        self.assertEqual(2, cage._bars['price']._floating_point_rounding_num_decimals)
+        PandaCage(self.file_path).append({
+            'time': np.arange(100, 130), 'noise': noise[:30], 'auto': np.arange(30) % 7, 'price': price[:30]
+        })
+        cage = PandaCage.open(self.file_path)
+        self.assertEqual(['x'] * 5, cage._bars['noise'].compression_modes())
+        for row_group_size in (0, 50):
+            cage.write(row_group_size=row_group_size, detect_decimals=False)
+            cage = PandaCage.open(self.file_path)
+            np.testing.assert_array_equal(np.concatenate([noise, noise[:30]]), cage.get_data('noise'))
+            np.testing.assert_array_equal(np.concatenate([price, price[:30]]), cage.get_data('price'))
+            self.assertEqual('x', cage._bars['noise']._compression_mode)
+            self.assertEqual(2, cage._bars['price']._floating_point_rounding_num_decimals)
+        return
+
+    def test_read_where(self):
+        cage = self.write_cage()
+        cage.write(row_group_size=30)
+
+        # only the last row group can match, the others are never read
+        cage = PandaCage(self.file_path)
+        with open(self.file_path, 'rb') as handle:
+            cage._read_file_info(handle)
+        cage._select_row_groups([('small', '>=', 95)])
+        self.assertEqual(10, cage._num_points)
+        self.assertEqual([10], cage._bars['price'].segment_num_points())
+
+        cage = PandaCage.open(self.file_path, columns=['price'], where=[('small', '>=', 95)])
+        self.assertEqual(['price'], list(cage._bars))
+        np.testing.assert_array_equal(np.arange(195, 200, dtype=np.int64), cage.get_data('time'))
+        np.testing.assert_array_equal(np.linspace(0, 1, 100)[95:], cage.get_data('price'))
+
+        with PandaCage.open(self.file_path, mmap=True, where=[('time', '<', 110), ('small', '!=', 3)]) as cage:
+            self.assertEqual(9, cage._num_points)
+            np.testing.assert_array_equal([0, 1, 2, 4, 5, 6, 7, 8, 9], cage.get_data('small'))
+
+        # files without row groups are filtered row by row
+        self.write_cage()
+        cage = PandaCage.open(self.file_path, where=[('small', '==', 50)])
+        np.testing.assert_array_equal([150], cage.get_data('time'))
+
+        with self.assertRaises(ValueError):
+            PandaCage.open(self.file_path, where=[('small', '~', 50)])
+        return
+
+    def test_append(self):
+        cage = self.write_cage()
+        with self.assertRaises(FileLayoutNotSupportedError):
+            PandaCage(self.file_path).append({
+                'time': np.arange(200, 210), 'price': np.ones(10), 'small': np.arange(100, 110)})
+        cage.write(footer=True)
+
+        for i in range(0, 3):
+            PandaCage(self.file_path).append({
+                'time': np.arange(200 + 10 * i, 210 + 10 * i),
+                'price': np.full(10, 2.0 + i),
+                'small': np.arange(100 + 10 * i, 110 + 10 * i)
+            })
+        cage = PandaCage.open(self.file_path)
+        self.assertEqual(130, cage._num_points)
+        self.assertEqual([100, 10, 10, 10], cage._bars['price'].segment_num_points())
+        np.testing.assert_array_equal(np.arange(100, 230, dtype=np.int64), cage.get_data('time'))
+        np.testing.assert_array_equal(
+            np.concatenate([np.linspace(0, 1, 100), np.repeat([2.0, 3.0, 4.0], 10)]),
+            cage.get_data('price'))
+        np.testing.assert_array_equal(np.arange(130, dtype=np.uint8), cage.get_data('small'))
+
+        # the appended segments carry statistics
+        cage = PandaCage.open(self.file_path, where=[('price', '>=', 3.0)])
+        np.testing.assert_array_equal(np.arange(210, 230, dtype=np.int64), cage.get_data('time'))
+
+        with self.assertRaises(KeyError):
+            PandaCage(self.file_path).append({'time': np.arange(5)})
+        with self.assertRaises(DataWrongShapeError):
+            PandaCage(self.file_path).append({'time': np.arange(5), 'price': np.ones(4), 'small': np.arange(5)})
+
+        # values that would change in the bar's data type are turned down, and the file is left as it was
+        for time, price, small in [(np.array([1.5, 2.5]), np.ones(2), np.arange(2)),
+                                   (np.arange(2), np.ones(2), np.array([255, 256])),
+                                   (np.arange(2), np.array(['a', 'b']), np.arange(2)),
+                                   (np.arange(2, dtype=np.uint64) + 2 ** 63, np.ones(2), np.arange(2))]:
+            with self.assertRaises(DataTypeNotSupportedError):
+                PandaCage(self.file_path).append({'time': time, 'price': price, 'small': small})
+        self.assertEqual(130, PandaCage.open(self.file_path)._num_points)
+        PandaCage(self.file_path).append({
+            'time': np.arange(230, 232, dtype=np.int32),
+            'price': np.ma.MaskedArray([1.5, 2.0], mask=[False, True]).astype(np.float32),
+            'small': np.arange(2, dtype=np.int64)
+        })
+        np.testing.assert_array_equal([230, 231], PandaCage.open(self.file_path).get_data('time')[-2:])
+        return
+
+    def test_iter_chunks(self):
+        cage = PandaCage(self.file_path)
+        cage.set_data(np.arange(100, 200, dtype=np.int64) * 3, 'time', is_index=True)
+        cage.set_data(np.linspace(0, 1, 100), 'price')
+        cage.set_data(np.arange(100, dtype=np.int32) % 7, 'small')
+        cage._index_bars['time']._compression_mode = 'e'
+        for row_group_size in [0, 30]:
+            cage.write(row_group_size=row_group_size)
+            chunks = list(PandaCage(self.file_path).iter_chunks(chunksize=16))
+            self.assertEqual(7, len(chunks))
+            self.assertEqual([16] * 6 + [4], [c['time'].size for c in chunks])
+            np.testing.assert_array_equal(np.arange(100, 200, dtype=np.int64) * 3,
+                                          np.concatenate([c['time'] for c in chunks]))
+            np.testing.assert_array_equal(np.linspace(0, 1, 100), np.concatenate([c['price'] for c in chunks]))
+            np.testing.assert_array_equal(np.arange(100) % 7, np.concatenate([c['small'] for c in chunks]))
+
+        chunks = list(PandaCage(self.file_path).iter_chunks(chunksize=1000, columns=['small']))
+        self.assertEqual(1, len(chunks))
+        self.assertEqual(['time', 'small'], list(chunks[0]))
+        with self.assertRaises(ValueError):
+            list(PandaCage(self.file_path).iter_chunks(chunksize=0))
+        return
+
+    def test_read_index_range(self):
+        time = np.datetime64('2023-11-14T22:13:20', 'ns') + np.arange(1000) * np.timedelta64(1, 's')
+        symbol = np.ma.masked_array(np.array(['abc', 'de', '', 'f'] * 250), mask=[False, False, True, False] * 250)
+        cage = PandaCage(self.file_path)
+        cage.set_data(time, 'time', is_index=True)
+        cage.set_data(np.linspace(0, 1, 1000), 'price')
+        cage.set_data(np.arange(1000, dtype=np.int64) * 3, 'volume', compression_mode='e')
+        cage.set_data(np.arange(1000, dtype=np.uint8), 'small', compression_mode='m')
+        cage.set_data(symbol, 'symbol')
+        for row_group_size in [0, 300]:
+            cage.write(row_group_size=row_group_size)
+            for kwargs in [{}, {'mmap': True}, {'verify': True}]:
+                with PandaCage.open(self.file_path, index_range=(time[250], time[520]), **kwargs) as read:
+                    self.assertEqual(270, read._num_points)
+                    np.testing.assert_array_equal(time[250:520], read.get_data('time'))
+                    np.testing.assert_array_equal(np.linspace(0, 1, 1000)[250:520], read.get_data('price'))
+                    np.testing.assert_array_equal(np.arange(250, 520) * 3, read.get_data('volume'))
+                    np.testing.assert_array_equal(np.arange(1000, dtype=np.uint8)[250:520], read.get_data('small'))
+                    self.assertEqual(symbol[250:520].tolist(), read.get_data('symbol').tolist())
+
+        # open bounds, bounds between and past the index values, combined with where
+        read = PandaCage.open(self.file_path, index_range=(None, time[10]))
+        np.testing.assert_array_equal(time[:10], read.get_data('time'))
+        read = PandaCage.open(self.file_path, index_range=(time[990] + np.timedelta64(1, 'ms'), None))
+        np.testing.assert_array_equal(time[991:], read.get_data('time'))
+        read = PandaCage.open(self.file_path, index_range=(time[-1] + np.timedelta64(1, 's'), None))
+        self.assertEqual(0, read.get_data('price').size)
+        read = PandaCage.open(self.file_path, columns=['small'], where=[('small', '<', 30)],
+                              index_range=(time[20], time[200]))
+        np.testing.assert_array_equal(np.arange(20, 30), read.get_data('small'))
+        self.assertEqual(['small'], list(read._bars))
+
+        # bounds given as strings are read as values of the index, for the row groups as well as the rows
+        self.assertEqual(300, PandaCage.open(self.file_path)._row_group_size)
+        for kwargs in [{}, {'mmap': True}]:
+            with PandaCage.open(self.file_path, index_range=('2023-11-14T22:17:30', '2023-11-14T22:18'),
+                                **kwargs) as read:
+                np.testing.assert_array_equal(time[250:280], read.get_data('time'))
+                np.testing.assert_array_equal(np.linspace(0, 1, 1000)[250:280], read.get_data('price'))
+
+        cage = PandaCage(self.file_path)
+        cage.set_data(np.arange(10, 0, -1, dtype=np.int64), 'time', is_index=True)
+        cage.write()
+        with self.assertRaises(ValueError):
+            PandaCage.open(self.file_path, index_range=(3, 5))
+        cage = PandaCage(self.file_path)
+        cage.set_data(np.arange(10, dtype=np.int64), 'value')
+        cage.write()
+        with self.assertRaises(ValueError):
+            PandaCage.open(self.file_path, index_range=(3, 5))
+        return
+
+    def test_data_slice_from_file_element_wise(self):
+        cage = PandaCage(self.file_path)
+        data = 1700000000000000000 + np.cumsum(np.arange(1000, dtype=np.int64) % 13)
+        cage.set_data(data, 'time', is_index=True)
+        cage._index_bars['time']._compression_mode = 'e'
+        cage.write()
+        cage = PandaCage(self.file_path)
+        with open(self.file_path, 'rb') as handle:
+            cage._read_file_info(handle)
+            bar = cage._index_bars['time']
+            offset = cage._bar_offsets['time']
+            # a slice far from the start sums the earlier differences, the next one carries the sum along
+            np.testing.assert_array_equal(data[500:600], bar.data_slice_from_file(handle, offset, 1000, 500, 600))
+            np.testing.assert_array_equal(data[600:601], bar.data_slice_from_file(handle, offset, 1000, 600, 601))
+            np.testing.assert_array_equal(data[0:3], bar.data_slice_from_file(handle, offset, 1000, 0, 3))
+        return
+
+    def test_write_workers(self):
+        for footer, row_group_size in [(False, 0), (True, 0), (False, 30), (True, 30)]:
+            self.write_cage()
+            cage = PandaCage(self.file_path)
+            cage.read()
+            cage.write(footer=footer, row_group_size=row_group_size)
+            with open(self.file_path, 'rb') as f:
+                serial_bytes = f.read()
+            cage = PandaCage(self.file_path)
+            cage.read()
+            cage.write(footer=footer, row_group_size=row_group_size, workers=4)
+            with open(self.file_path, 'rb') as f:
+                self.assertEqual(serial_bytes, f.read())
+        cage = PandaCage(self.file_path)
+        cage.read()
+        np.testing.assert_array_equal(np.arange(100, 200), cage.get_data('time'))
+        with self.assertRaises(ValueError):
+            cage.write(workers=0)
+        return
+
+    def test_read_workers(self):
+        self.write_cage()
+        for mmap, where in [(False, None), (True, None), (False, [('time', '>=', 150)])]:
+            cage = PandaCage(self.file_path)
+            cage.read(mmap=mmap, where=where, workers=4)
+            for b in list(cage._index_bars.values()) + list(cage._bars.values()):
+                self.assertIsNotNone(b._data)
+            start = 0 if where is None else 50
+            np.testing.assert_array_equal(np.arange(100 + start, 200), cage.get_data('time'))
+            np.testing.assert_array_equal(np.linspace(0, 1, 100)[start:], cage.get_data('price'))
+            np.testing.assert_array_equal(np.arange(start, 100), cage.get_data('small'))
+            cage.close()
+        with PandaCage.open(self.file_path, mmap=True, workers=2) as cage:
+            self.assertIsNotNone(cage._bars['price']._data)
+            np.testing.assert_array_equal(np.linspace(0, 1, 100), cage.get_data('price'))
+        with self.assertRaises(ValueError):
+            PandaCage(self.file_path).read(workers=0)
+        return
+
+    def test_set_and_get_data_without_copy(self):
+        data = np.arange(100, 200, dtype=np.int64)
+        cage = PandaCage(self.file_path)
+        cage.set_data(data, 'time', is_index=True, copy=False)
+        self.assertTrue(cage._index_bars['time']._data is data)
+        cage.write()
+        cage = PandaCage(self.file_path)
+        cage.read()
+        view = cage.get_data('time', copy=False)
+        self.assertFalse(view.flags.writeable)
+        np.testing.assert_array_equal(data, view)
+        return
+
+    def test_bit_packed_compression(self):
+        quantity = (np.arange(1000, dtype=np.int64) * 7919) % 2000 - 1000
+        cage = PandaCage(self.file_path)
+        with self.assertRaises(CompressionModeInvalidError):
+            cage.set_data(quantity, 'quantity', compression_mode='z')
+        for footer, row_group_size in [(False, 300), (True, 0), (False, 0)]:
+            cage = PandaCage(self.file_path)
+            cage.set_data(np.arange(1000, dtype=np.int64), 'time', is_index=True)
+            cage.set_data(quantity, 'quantity', compression_mode='b')
+            cage.set_data(np.linspace(0, 1, 1000), 'price', compression_mode='b')
+            cage.write(footer=footer, row_group_size=row_group_size)
+            for mmap in [False, True]:
+                cage = PandaCage(self.file_path)
+                cage.read(mmap=mmap)
+                np.testing.assert_array_equal(quantity, cage.get_data('quantity'))
+                np.testing.assert_array_equal(np.linspace(0, 1, 1000), cage.get_data('price'))
+                cage.close()
+            chunks = list(PandaCage(self.file_path).iter_chunks(chunksize=333))
+            np.testing.assert_array_equal(quantity, np.concatenate([c['quantity'] for c in chunks]))
+
+        # 11 bits per value instead of 16
+        cage = PandaCage(self.file_path)
+        cage.read()
+        self.assertEqual('b', cage._bars['quantity']._compression_mode)
+        self.assertEqual(11, cage._bars['quantity']._compression_bit_width)
+        self.assertEqual(1375, cage._bars['quantity'].num_bytes_data(1000))
+        return
+
+    def test_delta_of_delta_compression(self):
+        jitter = (np.arange(1000) * 7919) % 5 - 2
+        time = 1700000000000000000 + np.arange(1000, dtype=np.int64) * 1000000 + jitter
+        for footer, row_group_size in [(False, 499), (True, 0), (False, 0)]:
+            cage = PandaCage(self.file_path)
+            cage.set_data(time, 'time', is_index=True, compression_mode='d')
+            cage.set_data(np.linspace(0, 1, 1000), 'price', compression_mode='d')
+            cage.write(footer=footer, row_group_size=row_group_size)
+            for mmap in [False, True]:
+                cage = PandaCage(self.file_path)
+                cage.read(mmap=mmap)
+                np.testing.assert_array_equal(time, cage.get_data('time'))
+                np.testing.assert_array_equal(np.linspace(0, 1, 1000), cage.get_data('price'))
+                cage.close()
+            chunks = list(PandaCage(self.file_path).iter_chunks(chunksize=97))
+            np.testing.assert_array_equal(time, np.concatenate([c['time'] for c in chunks]))
+
+        # residuals of a few nanoseconds fit in one byte
+        cage = PandaCage(self.file_path)
+        with open(self.file_path, 'rb') as handle:
+            cage._read_file_info(handle)
+            bar = cage._index_bars['time']
+            self.assertEqual('d', bar._compression_mode)
+            self.assertEqual(998, bar.num_bytes_data(1000))
+            offset = cage._bar_offsets['time']
+            np.testing.assert_array_equal(time[500:600], bar.data_slice_from_file(handle, offset, 1000, 500, 600))
+            np.testing.assert_array_equal(time[600:601], bar.data_slice_from_file(handle, offset, 1000, 600, 601))
+            np.testing.assert_array_equal(time[1:2], bar.data_slice_from_file(handle, offset, 1000, 1, 2))
+            np.testing.assert_array_equal(time[0:1], bar.data_slice_from_file(handle, offset, 1000, 0, 1))
+        return
+
+    def test_run_length_compression(self):
+        status = np.repeat(np.array([0, 3, 1, 3], dtype=np.int32), [400, 250, 1, 349])
+        reference = np.repeat(np.array([101.5, 101.75, np.nan]), [600, 300, 100])
+        for footer, row_group_size in [(False, 300), (True, 0), (False, 0)]:
+            cage = PandaCage(self.file_path)
+            cage.set_data(np.arange(1000, dtype=np.int64), 'time', is_index=True)
+            cage.set_data(status, 'status', compression_mode='r')
+            cage.set_data(reference, 'reference', compression_mode='r')
+            cage.write(footer=footer, row_group_size=row_group_size)
+            for mmap in [False, True]:
+                cage = PandaCage(self.file_path)
+                cage.read(mmap=mmap)
+                np.testing.assert_array_equal(status, cage.get_data('status'))
+                np.testing.assert_array_equal(reference, cage.get_data('reference'))
+                cage.close()
+            chunks = list(PandaCage(self.file_path).iter_chunks(chunksize=97))
+            np.testing.assert_array_equal(status, np.concatenate([c['status'] for c in chunks]))
+            np.testing.assert_array_equal(reference, np.concatenate([c['reference'] for c in chunks]))
+
+        # four runs of one byte values and two byte lengths
+        cage = PandaCage(self.file_path)
+        cage.read()
+        self.assertEqual('r', cage._bars['status']._compression_mode)
+        self.assertEqual(4, cage._bars['status']._compression_num_runs)
+        self.assertEqual(12, cage._bars['status'].num_bytes_data(1000))
+        return
+
+    def test_dictionary_encoding(self):
+        venues = np.array([1000001, 2000003, 1000001, 3000007, 2000003], dtype=np.int64)[np.arange(1000) * 7 % 5]
+        prices = np.array([99.5, 100.25, np.nan])[np.arange(1000) % 3]
+        for footer, row_group_size, mode in [(False, 300, 'm'), (True, 0, 'r'), (False, 0, 'b'), (False, 0, 'm')]:
+            cage = PandaCage(self.file_path)
+            cage.set_data(np.arange(1000, dtype=np.int64), 'time', is_index=True)
+            cage.set_data(venues, 'venue', dictionary=True, compression_mode=mode)
+            cage.set_data(prices, 'price', dictionary=True)
+            cage.write(footer=footer, row_group_size=row_group_size)
+            for mmap in [False, True]:
+                cage = PandaCage(self.file_path)
+                cage.read(mmap=mmap)
+                np.testing.assert_array_equal(venues, cage.get_data('venue'))
+                np.testing.assert_array_equal(prices, cage.get_data('price'))
+                cage.close()
+            chunks = list(PandaCage(self.file_path).iter_chunks(chunksize=97))
+            np.testing.assert_array_equal(venues, np.concatenate([c['venue'] for c in chunks]))
+            np.testing.assert_array_equal(prices, np.concatenate([c['price'] for c in chunks]))
+
+        # one byte codes, uncompressed as they are already one byte
+        cage = PandaCage(self.file_path)
+        cage.read()
+        self.assertTrue(cage._bars['venue']._use_hash_table)
+        np.testing.assert_array_equal([1000001, 2000003, 3000007], cage._bars['venue']._dictionary)
+        self.assertEqual(1000, cage._bars['venue'].num_bytes_data(1000))
+
+        # differences of the unsigned codes wrap around without overflow warnings
+        venues = np.array([50, 10, 30, 20, 40], dtype=np.int64)[np.arange(20000) * 7 % 5]
+        cage = PandaCage(self.file_path)
+        cage.set_data(np.arange(20000, dtype=np.int64), 'time', is_index=True)
+        cage.set_data(venues, 'venue', dictionary=True, compression_mode='d')
+        cage.write()
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            cage = PandaCage.open(self.file_path, index_range=(15000, 15010))
+        np.testing.assert_array_equal(venues[15000:15010], cage.get_data('venue'))
+        return
+
+    def test_arithmetic_sequence_compression(self):
+        time = np.datetime64('2023-11-14T22:13', 'ns') + np.arange(1000) * np.timedelta64(1, 'm')
+        row = np.arange(1000, dtype=np.int64)
+        venue = np.full(1000, 7, dtype=np.int32)
+        price = 100 + np.cumsum((np.arange(1000) * 7919) % 3 - 1) * 0.01
+        for footer, row_group_size in [(False, 300), (True, 0)]:
+            cage = PandaCage(self.file_path)
+            cage.set_data(time, 'time', is_index=True)
+            cage.set_data(row, 'row')
+            cage.set_data(venue, 'venue')
+            cage.set_data(price, 'price', compression_mode='s')
+            cage.write(footer=footer, row_group_size=row_group_size)
+            for mmap in [False, True]:
+                cage = PandaCage(self.file_path)
+                cage.read(mmap=mmap)
+                for name, expected in (('time', time), ('row', row), ('venue', venue), ('price', price)):
+                    np.testing.assert_array_equal(expected, cage.get_data(name))
+                cage.close()
+            chunks = list(PandaCage(self.file_path).iter_chunks(chunksize=97))
+            np.testing.assert_array_equal(time, np.concatenate([c['time'] for c in chunks]))
+            np.testing.assert_array_equal(row, np.concatenate([c['row'] for c in chunks]))
+
+        cage = PandaCage(self.file_path)
+        cage.read()
+        # prices are not evenly spaced, so they fall back to differences from the minimum
+        self.assertEqual({'time': ['s'], 'row': ['s'], 'venue': ['s'], 'price': ['m']}, cage.compression_modes())
+        for name in ['time', 'row', 'venue']:
+            bar = cage._index_bars[name] if name == 'time' else cage._bars[name]
+            self.assertEqual(0, bar.num_bytes_data(1000))
+        return
+
+    def test_xor_compression(self):
+        price = 100 + np.cumsum((np.arange(1000) * 7919) % 3 - 1) * 0.01
+        price[[10, 500]] = np.nan
+        for footer, row_group_size in [(False, 300), (True, 0), (False, 0)]:
+            cage = PandaCage(self.file_path)
+            cage.set_data(np.arange(1000, dtype=np.int64), 'time', is_index=True)
+            cage.set_data(price, 'price', compression_mode='x')
+            cage.write(footer=footer, row_group_size=row_group_size)
+            for mmap in [False, True]:
+                cage = PandaCage(self.file_path)
+                cage.read(mmap=mmap)
+                np.testing.assert_array_equal(price, cage.get_data('price'))
+                cage.close()
+            chunks = list(PandaCage(self.file_path).iter_chunks(chunksize=97))
+            np.testing.assert_array_equal(price, np.concatenate([c['price'] for c in chunks]))
+
+        cage = PandaCage(self.file_path)
+        cage.read()
+        self.assertEqual('x', cage._bars['price']._compression_mode)
+        self.assertLess(cage._bars['price'].num_bytes_data(1000), 8000 // 1.5)
+        return
+
+    def test_auto_compression(self):
+        time = 1700000000000000000 + np.arange(1000, dtype=np.int64) * 1000000
+        price = 100 + np.cumsum((np.arange(1000) * 7919) % 3 - 1) * 0.01
+        status = np.repeat(np.array([0, 3, 1], dtype=np.int32), [400, 250, 350])
+        cage = PandaCage(self.file_path)
+        cage.set_data(time, 'time', is_index=True, compression_mode='a')
+        cage.set_data(price, 'price', compression_mode='a')
+        cage.set_data(status, 'status', compression_mode='a')
+        # evenly spaced timestamps need no data bytes
+        self.assertEqual({'time': ['s'], 'price': ['x'], 'status': ['r']}, cage.compression_modes())
+        cage.write(row_group_size=400)
+        # constant row groups are arithmetic sequences with a step of 0
+        self.assertEqual(['s', 'r', 's'], cage.compression_modes()['status'])
+
+        cage = PandaCage(self.file_path)
+        cage.read()
+        np.testing.assert_array_equal(time, cage.get_data('time'))
+        np.testing.assert_array_equal(price, cage.get_data('price'))
+        np.testing.assert_array_equal(status, cage.get_data('status'))
+        self.assertEqual(['s', 's', 's'], cage.compression_modes()['time'])
+
+        # noisy floats are never stored larger than they are
+        noise = np.sin(np.arange(100000) * 7.3) * 1e6
+        cage = PandaCage(self.file_path)
+        cage.set_data(np.arange(100000, dtype=np.int64), 'time', is_index=True)
+        cage.set_data(noise, 'noise', compression_mode='a')
+        cage.write(row_group_size=1000)
+        self.assertEqual([None] * 100, cage.compression_modes()['noise'])
+        self.assertLessEqual(cage._bars['noise'].num_bytes_data(100000), noise.nbytes)
+        np.testing.assert_array_equal(noise, PandaCage.open(self.file_path).get_data('noise'))
+        return
+
+    def test_detect_decimals(self):
+        price = np.round(100 + (np.arange(1000) * 7919 % 5000) / 100.0, 2)
+        cage = PandaCage(self.file_path)
+        cage.set_data(np.arange(1000, dtype=np.int64), 'time', is_index=True)
+        cage.set_data(price, 'price')
+        cage.write(detect_decimals=False)
+        cage = PandaCage(self.file_path)
+        cage.read()
+        self.assertFalse(cage._bars['price']._use_floating_point_rounding)
+
+        cage.get_data('price')
+        cage.write(footer=True)
+        cage = PandaCage(self.file_path)
+        cage.read()
+        self.assertTrue(cage._bars['price']._use_floating_point_rounding)
+        self.assertEqual(2, cage._bars['price']._floating_point_rounding_num_decimals)
+        self.assertEqual(2, cage._bars['price']._compression_dtype.itemsize)
+        np.testing.assert_array_equal(price, cage.get_data('price'))
+
+        # appended rows with more decimals keep them
+        more_decimals = np.array([1.125, 2.5, 3.0625])
+        PandaCage(self.file_path).append({'time': np.arange(1000, 1003), 'price': more_decimals})
+        cage = PandaCage(self.file_path)
+        cage.read()
+        np.testing.assert_array_equal(np.concatenate([price, more_decimals]), cage.get_data('price'))
+
+        # and so does rewriting them, without the data being touched
+        cage.write(footer=True, row_group_size=300)
+        PandaCage(self.file_path).append({'time': np.arange(1003, 1005), 'price': np.array([1.2345678, 9.87654321])})
+        expected = np.concatenate([price, more_decimals, [1.2345678, 9.87654321]])
+        for row_group_size in [0, 400]:
+            cage = PandaCage.open(self.file_path)
+            cage.write(row_group_size=row_group_size)
+            np.testing.assert_array_equal(expected, PandaCage.open(self.file_path).get_data('price'))
+
+        # detected decimals go with the data they were detected on
+        cage = PandaCage(self.file_path)
+        cage.set_data(np.arange(3, dtype=np.int64), 'time', is_index=True)
+        cage.set_data(np.array([1.25, 2.5, 3.75]), 'p')
+        cage.write()
+        self.assertEqual(2, cage._bars['p']._floating_point_rounding_num_decimals)
+        for values in ([0.1, 0.7, 0.3], [1.23456, 2.5, 3.0]):
+            cage.set_data(np.array(values), 'p')
+            cage.write()
+            np.testing.assert_array_equal(values, PandaCage.open(self.file_path).get_data('p'))
+        read = PandaCage.open(self.file_path)
+        read.set_data(np.array([1.23456, 0.5, 7.0]), 'p')
+        read.write()
+        np.testing.assert_array_equal([1.23456, 0.5, 7.0], PandaCage.open(self.file_path).get_data('p'))
+
+        # asked for rounding is kept
+        cage.set_data(np.array([1.23456, 2.5, 3.0]), 'p')
+        cage._bars['p'].set_floating_point_rounding(2)
+        cage.write()
+        np.testing.assert_array_equal([1.23, 2.5, 3.0], PandaCage.open(self.file_path).get_data('p'))
+        return
+
+    def test_datetime_bars(self):
+        time = np.datetime64('2023-11-14T22:13:20', 'ns') + np.arange(1000) * np.timedelta64(1, 's')
+        duration = (np.arange(1000) % 7) * np.timedelta64(15, 'm')
+        duration = duration.astype('timedelta64[us]')
+        expiry = np.array(['2024-01-05', 'NaT', '2024-03-01', '2024-06-21'] * 250, dtype='datetime64[D]')
+        cage = PandaCage(self.file_path)
+        cage.set_data(time, 'time', is_index=True)
+        cage.set_data(duration, 'duration', compression_mode='a')
+        cage.set_data(expiry, 'expiry')
+        with self.assertRaises(DataTypeNotSupportedError):
+            cage.set_data(np.arange(1000).astype('datetime64[Y]'), 'year')
+        cage.write()
+        # nanoseconds that are whole seconds are stored as seconds
+        self.assertEqual('s', cage._index_bars['time']._time_storage_units)
+        self.assertEqual('m', cage._bars['duration']._time_storage_units)
+
+        cage = PandaCage(self.file_path)
+        cage.read()
+        for name, expected in (('time', time), ('duration', duration), ('expiry', expiry)):
+            self.assertEqual(expected.dtype, cage.get_data(name).dtype)
+            np.testing.assert_array_equal(expected, cage.get_data(name))
+
+        cage.write(footer=True, row_group_size=300)
+        cage = PandaCage(self.file_path)
+        cage.read(where=[('time', '>=', np.datetime64('2023-11-14T22:28:20', 'ns'))])
+        np.testing.assert_array_equal(time[900:], cage.get_data('time'))
+        np.testing.assert_array_equal(expiry[900:], cage.get_data('expiry'))
+
+        PandaCage(self.file_path).append({
+            'time': time[-1:] + np.timedelta64(1, 'ns'),
+            'duration': duration[:1],
+            'expiry': expiry[1:2]
+        })
+        cage = PandaCage(self.file_path)
+        cage.read()
+        np.testing.assert_array_equal(
+            np.concatenate([time, time[-1:] + np.timedelta64(1, 'ns')]),
+            cage.get_data('time')
+        )
+        np.testing.assert_array_equal(np.concatenate([expiry, expiry[1:2]]), cage.get_data('expiry'))
+        return
+
+    def test_string_bars(self):
+        symbol = np.array(['AAPL', 'MSFT', 'h\u00e9llo', '', 'x\u4e2d\U0001f600'] * 200)
+        order_id = np.array(['ORD{:07d}'.format(i * 7) for i in range(1000)])
+        raw = np.array([b'ab', b'', b'\x00x', b'xyz'] * 250)
+        for footer, row_group_size, dictionary in [(False, 0, False), (True, 300, False), (True, 300, True)]:
+            cage = PandaCage(self.file_path)
+            cage.set_data(np.arange(1000, dtype=np.int64), 'time', is_index=True)
+            cage.set_data(symbol, 'symbol', dictionary=dictionary)
+            cage.set_data(order_id, 'order_id')
+            cage.set_data(raw, 'raw', dictionary=dictionary)
+            cage.write(footer=footer, row_group_size=row_group_size)
+            for mmap in [False, True]:
+                cage = PandaCage(self.file_path)
+                cage.read(mmap=mmap)
+                for name, expected in (('symbol', symbol), ('order_id', order_id), ('raw', raw)):
+                    self.assertEqual(expected.dtype, cage.get_data(name).dtype)
+                    np.testing.assert_array_equal(expected, cage.get_data(name))
+                cage.close()
+            chunks = list(PandaCage(self.file_path).iter_chunks(chunksize=97))
+            for name, expected in (('symbol', symbol), ('order_id', order_id), ('raw', raw)):
+                np.testing.assert_array_equal(expected, np.concatenate([c[name] for c in chunks]))
+            cage = PandaCage(self.file_path)
+            cage.read(where=[('order_id', '>=', 'ORD0006300')])
+            np.testing.assert_array_equal(order_id[900:], cage.get_data('order_id'))
+
+        cage = PandaCage(self.file_path)
+        cage.read()
+        # each row group keeps the first bytes of its smallest and largest strings
+        self.assertEqual(['ORD00000', 'ORD00021', 'ORD00042', 'ORD00063'],
+                         [s.min_value for s in cage._bars['order_id'].segment_statistics()])
+        self.assertEqual('ORD00020\U0010ffff', cage._bars['order_id'].segment_statistics()[0].max_value)
+        return
+
+    def test_validity(self):
+        price = np.where(np.arange(1000) % 10 == 3, np.nan, 100 + np.arange(1000) * 0.25)
+        size = np.ma.MaskedArray((np.arange(1000) * 37) % 500, mask=np.arange(1000) % 7 == 0)
+        symbol = np.ma.MaskedArray(np.array(['AAPL', 'MSFT', 'IBM'])[np.arange(1000) % 3], mask=np.arange(1000) < 5)
+        for footer, row_group_size, mode in [(False, 0, None), (False, 0, 'e'), (True, 300, 'b'), (True, 300, 'a')]:
+            cage = PandaCage(self.file_path)
+            cage.set_data(np.arange(1000, dtype=np.int64), 'time', is_index=True)
+            cage.set_data(price, 'price', compression_mode=mode)
+            cage.set_data(size, 'size', compression_mode=mode)
+            cage.set_data(symbol, 'symbol')
+            cage.write(footer=footer, row_group_size=row_group_size)
+            cage = PandaCage.open(self.file_path)
+            # one NaN no longer stops the valid prices from being rounded and narrowed
+            self.assertTrue(cage._bars['price']._use_validity or cage._bars['price']._segments[0]._use_validity)
+            np.testing.assert_array_equal(price, cage.get_data('price'))
+            self.assertIsNone(cage._index_bars['time'].get_validity())
+            for name, expected in (('size', size), ('symbol', symbol)):
+                self.assertIsInstance(cage.get_data(name), np.ma.MaskedArray)
+                np.testing.assert_array_equal(expected.mask, cage.get_data(name).mask)
+                np.testing.assert_array_equal(expected.compressed(), cage.get_data(name).compressed())
+            np.testing.assert_array_equal(~size.mask, cage._bars['size'].get_validity())
+            chunks = list(PandaCage(self.file_path).iter_chunks(chunksize=97))
+            np.testing.assert_array_equal(price, np.concatenate([c['price'] for c in chunks]))
+            sizes = np.ma.concatenate([c['size'] for c in chunks])
+            np.testing.assert_array_equal(size.mask, sizes.mask)
+            np.testing.assert_array_equal(size.compressed(), sizes.compressed())
+
+        # null rows only match '!=', like NaN does
+        cage = PandaCage(self.file_path)
+        cage.read(where=[('size', '<', 10)])
+        np.testing.assert_array_equal(size.compressed()[size.compressed() < 10], cage.get_data('size'))
+        cage = PandaCage(self.file_path)
+        cage.read(where=[('size', '!=', 0)])
+        self.assertEqual(1000 - np.count_nonzero(size.filled(1) == 0), cage._num_points)
+
+        # an appended row group with no valid rows at all
+        PandaCage(self.file_path).append({
+            'time': np.arange(3, dtype=np.int64),
+            'price': np.full(3, np.nan),
+            'size': np.ma.MaskedArray(np.zeros(3, dtype=np.int64), mask=True),
+            'symbol': np.array(['A', 'B', 'C'])
+        })
+        cage = PandaCage.open(self.file_path)
+        self.assertEqual(3, cage._bars['size'].segment_statistics()[-1].null_count)
+        self.assertTrue(np.all(cage.get_data('size').mask[-3:]))
+        self.assertTrue(np.all(np.isnan(cage.get_data('price')[-3:])))
+
+        cage = PandaCage(self.file_path)
+        cage.set_data(np.arange(5, dtype=np.int32), 'a', validity=np.array([True, False, True, True, False]))
+        with self.assertRaises(DataWrongShapeError):
+            cage.set_data(np.arange(5), 'b', validity=np.ones(4, dtype=bool))
+        cage.write()
+        np.testing.assert_array_equal([0, 2, 3], PandaCage.open(self.file_path).get_data('a').compressed())
+
+        # a bar stored uncompressed while it held no values compresses the data it is given next
+        cage = PandaCage(self.file_path)
+        cage.set_data(np.arange(100000, dtype=np.int64), 'time', is_index=True)
+        cage.set_data(np.zeros(100000, dtype=np.int64), 'a', validity=np.zeros(100000, dtype=bool))
+        cage.write()
+        self.assertEqual([None], cage._bars['a'].compression_modes())
+        cage.set_data(np.arange(100000, dtype=np.int64) % 200, 'a')
+        cage.write()
+        self.assertEqual(['m'], cage._bars['a'].compression_modes())
+        self.assertEqual(100000, cage._bars['a'].num_bytes_data(100000))
+
+        # infinities are values, an infinite minimum must not turn the other rows into NaN
+        price = np.where(np.arange(1000) % 10 == 3, np.nan, 100 + np.arange(1000) * 0.25)
+        price[[5, 500]] = [-np.inf, np.inf]
+        for row_group_size, mode in [(0, None), (0, 'm'), (0, 'e'), (300, 'd'), (300, 'b'), (300, 'a')]:
+            cage = PandaCage(self.file_path)
+            cage.set_data(price, 'price', compression_mode=mode)
+            with warnings.catch_warnings():
+                warnings.simplefilter('error')
+                cage.write(row_group_size=row_group_size)
+            np.testing.assert_array_equal(price, PandaCage.open(self.file_path).get_data('price'))
+        return
+
+    def test_block_compression(self):
+        price = np.round(100 + np.cumsum((np.arange(20000) * 7919) % 3 - 1) * 0.01, 2)
+        price[::97] = np.nan
+        size = np.ma.MaskedArray((np.arange(20000) * 37) % 500, mask=np.arange(20000) % 7 == 0)
+        symbol = np.array(['AAPL', 'MSFT', 'IBM'])[(np.arange(20000) * 13) % 3]
+        num_bytes = {}
+        for codec, shuffle in [(None, None), ('zlib', 'byte'), ('lzma', 'bit'), ('bz2', None)]:
+            for footer, row_group_size in [(False, 0), (True, 6000)]:
+                cage = PandaCage(self.file_path)
+                cage.set_data(np.arange(20000, dtype=np.int64) * 3, 'time', is_index=True)
+                cage.set_data(price, 'price', block_compression=codec, shuffle=shuffle)
+                cage.set_data(size, 'size', block_compression=codec, shuffle=shuffle)
+                cage.set_data(symbol, 'symbol', block_compression=codec, shuffle=shuffle)
+                cage.write(footer=footer, row_group_size=row_group_size)
+                num_bytes[codec, footer] = os.path.getsize(self.file_path)
+                for mmap in [False, True]:
+                    cage = PandaCage.open(self.file_path, mmap=mmap)
+                    np.testing.assert_array_equal(price, cage.get_data('price'))
+                    np.testing.assert_array_equal(size.compressed(), cage.get_data('size').compressed())
+                    np.testing.assert_array_equal(symbol, cage.get_data('symbol'))
+                    cage.close()
+                chunks = list(PandaCage(self.file_path).iter_chunks(chunksize=1777))
+                np.testing.assert_array_equal(price, np.concatenate([c['price'] for c in chunks]))
+                np.testing.assert_array_equal(size.mask, np.ma.concatenate([c['size'] for c in chunks]).mask)
+                np.testing.assert_array_equal(symbol, np.concatenate([c['symbol'] for c in chunks]))
+        for codec in ['zlib', 'lzma', 'bz2']:
+            self.assertLess(num_bytes[codec, False], num_bytes[None, False])
+
+        # appended row groups are block compressed like the last one
+        PandaCage(self.file_path).append({
+            'time': np.arange(3, dtype=np.int64),
+            'price': price[:3],
+            'size': size[:3],
+            'symbol': symbol[:3]
+        })
+        cage = PandaCage.open(self.file_path)
+        self.assertEqual('bz2', cage._bars['symbol']._segments[-1]._block_compression_codec)
+        np.testing.assert_array_equal(price[:3], cage.get_data('price')[-3:])
+        with self.assertRaises(BlockCompressionInvalidError):
+            cage.set_data(cage.get_data('price'), 'other', block_compression='gzip')
+        return
+
+    def test_checksums(self):
+        def corrupt(offset: int):
+            with open(self.file_path, 'r+b') as f:
+                f.seek(offset)
+                value = f.read(1)
+                f.seek(offset)
+                f.write(bytes([value[0] ^ 1]))
+            return
+
+        for footer, row_group_size in [(False, 0), (True, 0), (True, 30)]:
+            self.write_cage().write(footer=footer, row_group_size=row_group_size)
+            self.assertTrue(PandaCage.verify(self.file_path))
+            for mmap in [False, True]:
+                cage = PandaCage.open(self.file_path, mmap=mmap, verify=True)
+                np.testing.assert_array_equal(np.arange(100, 200), cage.get_data('time'))
+                cage.close()
+
+            # the last byte of small's data
+            cage = PandaCage(self.file_path)
+            with open(self.file_path, 'rb') as f:
+                cage._read_file_info(f)
+            corrupt(cage._bar_offsets['small'] + 99)
+            self.assertFalse(PandaCage.verify(self.file_path))
+            for mmap in [False, True]:
+                with self.assertRaises(ChecksumMismatchError):
+                    PandaCage.open(self.file_path, mmap=mmap, verify=True)
+                # bars that are not read are not checked
+                PandaCage.open(self.file_path, mmap=mmap, columns=['price'], verify=True).close()
+            corrupt(cage._bar_offsets['small'] + 99)
+            self.assertTrue(PandaCage.verify(self.file_path))
+
+            corrupt(5)  # the number of points in the header
+            self.assertFalse(PandaCage.verify(self.file_path))
+            with self.assertRaises(ChecksumMismatchError):
+                PandaCage.open(self.file_path, verify=True)
+            corrupt(5)
+
+            # a torn write
+            os.truncate(self.file_path, os.path.getsize(self.file_path) - 20)
+            self.assertFalse(PandaCage.verify(self.file_path))
+
+        # rows appended to a file get checksums of their own
+        self.write_cage().write(footer=True, row_group_size=30)
+        PandaCage(self.file_path).append({
+            'time': np.arange(5, dtype=np.int64),
+            'price': np.linspace(0, 1, 5),
+            'small': np.arange(5, dtype=np.uint8)
+        })
+        self.assertTrue(PandaCage.verify(self.file_path))
+        self.assertEqual(105, PandaCage.open(self.file_path, verify=True).get_data('time').size)
+
+        cage = self.write_cage()
+        cage.write(checksums=False)
+        self.assertEqual(100, PandaCage.open(self.file_path).get_data('time').size)
+        with self.assertRaises(FileLayoutNotSupportedError):
+            PandaCage.verify(self.file_path)
+        with self.assertRaises(FileLayoutNotSupportedError):
+            PandaCage.open(self.file_path, verify=True)
+
+        # damaged file info is reported, not raised
+        self.write_cage().write(footer=True, checksums=True)
+        size = os.path.getsize(self.file_path)
+        for offset, value in ((size - 1, 0x7f), (size - 8, 0xff), (1, 0x02), (9, 0x40)):
+            with open(self.file_path, 'r+b') as f:
+                f.seek(offset)
+                original = f.read(1)
+                f.seek(offset)
+                f.write(bytes([original[0] ^ value]))
+            self.assertFalse(PandaCage.verify(self.file_path))
+            with self.assertRaises(ValueError):
+                PandaCage.open(self.file_path, verify=True)
+            with open(self.file_path, 'r+b') as f:
+                f.seek(offset)
+                f.write(original)
+            self.assertTrue(PandaCage.verify(self.file_path))
+        return
+
+    @unittest.skipIf(pd is None, 'pandas is not installed')
+    def test_dataframe_nullable_columns(self):
+        df = pd.DataFrame({
+            'size': pd.array([1, None, 3, 4], dtype='Int64'),
+            'venue': pd.array([None, 2, 3, None], dtype='UInt8'),
+            'price': [1.5, np.nan, 2.5, 3.0],
+            'symbol': ['AAPL', None, 'IBM', 'MSFT']
+        })
+        PandaCage.from_dataframe(df, index=False, file_path=self.file_path).write()
+        result = PandaCage(self.file_path).to_dataframe()
+        pd.testing.assert_frame_equal(df, result.reset_index(drop=True))
+        return
+
+    @unittest.skipIf(pd is None, 'pandas is not installed')
+    def test_dataframe_round_trip(self):
+        df = pd.DataFrame({
+            'price': 100 + np.cumsum((np.arange(1000) * 7919) % 3 - 1) * 0.01,
+            'size': (np.arange(1000) * 37) % 500,
+            'bid': 99 + np.arange(1000) * 0.001,
+            'venue': ((np.arange(1000) * 7) % 3).astype(np.uint8),
+            'symbol': np.array(['AAPL', 'MSFT', 'IBM', 'GOOG'])[np.arange(1000) % 4]
+        }, index=pd.MultiIndex.from_arrays([
+            np.datetime64('2023-11-14T22:13:20', 'ns') + np.arange(1000) * np.timedelta64(1, 's'),
+            np.arange(1000, dtype=np.int32) % 4
+        ], names=['time', None]))
+        PandaCage.from_dataframe(df, file_path=self.file_path).write()
+        result = PandaCage(self.file_path).to_dataframe()
+        self.assertEqual(['time', 'level_1'], list(result.index.names))
+        pd.testing.assert_frame_equal(df.rename_axis(['time', 'level_1']), result)
+        # the two float columns share one block, the strings get a block of their own
+        self.assertEqual(4, len(result._mgr.blocks))
+
+        chunks = list(PandaCage(self.file_path).iter_chunks(chunksize=300, as_dataframe=True))
+        self.assertEqual([300, 300, 300, 100], [len(c) for c in chunks])
+        pd.testing.assert_frame_equal(df.rename_axis(['time', 'level_1']), pd.concat(chunks))
+
+        result = PandaCage(self.file_path).to_dataframe(columns=['venue', 'price'])
+        self.assertEqual(['venue', 'price'], list(result.columns))
+        np.testing.assert_array_equal(df['price'].to_numpy(), result['price'].to_numpy())
+
+        # a single column of its dtype is shared with the cage when not copied
+        cage = PandaCage.open(self.file_path)
+        result = cage.to_dataframe(columns=['size'], copy=False)
+        self.assertTrue(np.shares_memory(cage.get_data('size', copy=False), result['size'].to_numpy()))
+
+        # a default range index is not stored, and comes back as one
+        df = pd.DataFrame({'a': np.arange(10), 'b': pd.array([1, None] * 5, dtype='Int64'), 's': ['x', 'yz'] * 5})
+        cage = PandaCage.from_dataframe(df, file_path=self.file_path)
+        self.assertEqual([], list(cage._index_bars))
+        cage.write()
+        result = PandaCage(self.file_path).to_dataframe()
+        self.assertIsInstance(result.index, pd.RangeIndex)
+        pd.testing.assert_frame_equal(df, result, check_index_type=True)
+        df.index = pd.RangeIndex(5, 15)
+        PandaCage.from_dataframe(df, file_path=self.file_path).write()
+        result = PandaCage(self.file_path).to_dataframe()
+        self.assertEqual(['index'], list(result.index.names))
+        np.testing.assert_array_equal(np.arange(5, 15), result.index.to_numpy())
+        with self.assertRaises(InvalidPandasIndexError):
+            PandaCage.from_dataframe(pd.DataFrame({'a': np.arange(3)}, index=pd.Index(np.arange(3), name='a')))
+
+        # columns that would not read back as they are raise before any data is set
+        for unsupported in [pd.DataFrame({'a': [True, False]}),
+                            pd.DataFrame({'a': pd.array([True, None], dtype='boolean')}),
+                            pd.DataFrame({'a': pd.Categorical(['x', 'y'])}),
+                            pd.DataFrame({'a': pd.date_range('2024-01-01', periods=2, tz='UTC')}),
+                            pd.DataFrame({'a': [1, 2]}, index=pd.date_range('2024-01-01', periods=2, tz='UTC')),
+                            pd.DataFrame({'a': [{'b': 1}, 2]})]:
+            with self.assertRaises(DataTypeNotSupportedError):
+                PandaCage.from_dataframe(unsupported)
+        return
+
+    def test_write_does_not_leave_lock_file(self):
+        self.write_cage()
+        self.assertFalse(os.path.exists(self.file_path + '.lock'))
+        return
+
+    def test_atomic_write(self):
+        cage = PandaCage(self.file_path)
+        cage.set_data(np.arange(100, 200, dtype=np.int64), 'time', is_index=True)
+        cage.set_data(np.linspace(0, 1, 100), 'price')
+        cage.write(atomic=True)
+        os.chmod(self.file_path, 0o640)
+        self.assertEqual(['test.cage'], os.listdir(self.directory))
+
+        # a reader holding the old file keeps reading it while a new one is published
+        with PandaCage.open(self.file_path, mmap=True) as old:
+            cage.set_data(np.arange(100, dtype=np.float64), 'price')
+            cage.write(atomic=True, footer=True)
+            np.testing.assert_array_equal(np.linspace(0, 1, 100), old.get_data('price'))
+            self.assertIsNotNone(old._mmap_handle)
+        self.assertEqual(['test.cage'], os.listdir(self.directory))
+        self.assertEqual(0o640, os.stat(self.file_path).st_mode & 0o777)
+        new = PandaCage.open(self.file_path, verify=True)
+        self.assertTrue(new._use_footer)
+        np.testing.assert_array_equal(np.arange(100), new.get_data('price'))
+
+        # a failed write leaves the published file and no temporary file behind
+        cage._bars['price'].set_data(np.zeros(5))
+        with self.assertRaises(DataWrongShapeError):
+            cage.write(atomic=True)
+        self.assertEqual(['test.cage'], os.listdir(self.directory))
+        np.testing.assert_array_equal(np.arange(100), PandaCage.open(self.file_path).get_data('price'))
+        return
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+from numpy import array, frombuffer, packbits, unpackbits, concatenate, ascontiguousarray, uint8
+from pandasio.utils.exceptions import BlockCompressionInvalidError
+import bz2
+import lzma
+import zlib
+
+# the position of a codec or shuffle in these lists is what is stored in the file
+BLOCK_COMPRESSION_CODECS = ['zlib', 'lzma', 'bz2']
+BLOCK_COMPRESSION_SHUFFLES = [None, 'byte', 'bit']
+# number of values bit-shuffled at a time, a multiple of 8 so every block starts on a byte
+NUM_VALUES_PER_BIT_SHUFFLE_BLOCK = 1 << 16
+
+
+def validate_block_compression(codec: str, shuffle: str = None):
+    """
+    Checks a codec and shuffle are ones block_compress knows
+    :param codec: one of BLOCK_COMPRESSION_CODECS
+    :param shuffle: one of BLOCK_COMPRESSION_SHUFFLES
+    :return: None, raises BlockCompressionInvalidError otherwise
+    """
+    if codec not in BLOCK_COMPRESSION_CODECS:
+        raise BlockCompressionInvalidError('Codec must be one of {}, {} found'.format(BLOCK_COMPRESSION_CODECS, codec))
+    if shuffle not in BLOCK_COMPRESSION_SHUFFLES:
+        raise BlockCompressionInvalidError('Shuffle must be one of {}, {} found'.format(
+            BLOCK_COMPRESSION_SHUFFLES, shuffle))
+    return
+
+
+def shuffle_bytes(buffer: array, item_size: int) -> array:
+    """
+    Groups the first bytes of every item together, then the second bytes, and so on. The high bytes of
+    narrowed integers are mostly equal, so the general-purpose codecs find long runs in them.
+    Bytes past the last whole item are left at the end
+    :param buffer: numpy uint8 array
+    :param item_size: number of bytes per item
+    :return: numpy uint8 array
+    """
+    num_items = buffer.size // item_size
+    if item_size <= 1 or num_items == 0:
+        return buffer
+    items = buffer[:num_items * item_size].reshape(num_items, item_size)
+    return concatenate([items.T.ravel(), buffer[num_items * item_size:]])
+
+
+def unshuffle_bytes(buffer: array, item_size: int) -> array:
+    """
+    Undoes shuffle_bytes
+    :param buffer: numpy uint8 array
+    :param item_size: number of bytes per item
+    :return: numpy uint8 array
+    """
+    num_items = buffer.size // item_size
+    if item_size <= 1 or num_items == 0:
+        return buffer
+    planes = buffer[:num_items * item_size].reshape(item_size, num_items)
+    return concatenate([planes.T.ravel(), buffer[num_items * item_size:]])
+
+
+def shuffle_bits(buffer: array, item_size: int) -> array:
+    """
+    Groups the first bits of every item together, then the second bits, and so on, like shuffle_bytes but
+    bit by bit. Suits narrowed values whose top bits are mostly zero. Items are shuffled in blocks of
+    NUM_VALUES_PER_BIT_SHUFFLE_BLOCK to bound memory; bytes past the last whole item are left at the end
+    :param buffer: numpy uint8 array
+    :param item_size: number of bytes per item
+    :return: numpy uint8 array
+    """
+    num_items = buffer.size // item_size
+    items = buffer[:num_items * item_size].reshape(num_items, item_size)
+    pieces = []
+    for start in range(0, num_items, NUM_VALUES_PER_BIT_SHUFFLE_BLOCK):
+        bits = unpackbits(items[start:start + NUM_VALUES_PER_BIT_SHUFFLE_BLOCK], axis=1)
+        pieces.append(packbits(ascontiguousarray(bits.T)))
+    return concatenate(pieces + [buffer[num_items * item_size:]])
+
+
+def unshuffle_bits(buffer: array, item_size: int, num_bytes: int) -> array:
+    """
+    Undoes shuffle_bits
+    :param buffer: numpy uint8 array
+    :param item_size: number of bytes per item
+    :param num_bytes: number of bytes before shuffling
+    :return: numpy uint8 array
+    """
+    num_items = num_bytes // item_size
+    pieces = []
+    counter = 0
+    for start in range(0, num_items, NUM_VALUES_PER_BIT_SHUFFLE_BLOCK):
+        block_num_items = min(NUM_VALUES_PER_BIT_SHUFFLE_BLOCK, num_items - start)
+        block_num_bytes = (block_num_items * item_size * 8 + 7) // 8
+        bits = unpackbits(buffer[counter:counter + block_num_bytes], count=block_num_items * item_size * 8)
+        pieces.append(packbits(ascontiguousarray(bits.reshape(item_size * 8, block_num_items).T), axis=1).ravel())
+        counter += block_num_bytes
+    return concatenate(pieces + [buffer[counter:counter + num_bytes - num_items * item_size]])
+
+
+def block_compress(buffer: array, codec: str, shuffle: str = None, item_size: int = 1) -> array:
+    """
+    Shuffles then compresses a buffer with one of the standard library's general-purpose codecs
+    :param buffer: numpy array, compressed as its bytes
+    :param codec: 'zlib', 'lzma' or 'bz2'
+    :param shuffle: None, 'byte' or 'bit', see shuffle_bytes and shuffle_bits
+    :param item_size: number of bytes per item the shuffle works on
+    :return: numpy uint8 array
+    """
+    validate_block_compression(codec, shuffle)
+    buffer = frombuffer(ascontiguousarray(buffer).tobytes(), dtype=uint8)
+    if shuffle == 'byte':
+        buffer = shuffle_bytes(buffer, item_size)
+    elif shuffle == 'bit':
+        buffer = shuffle_bits(buffer, item_size)
+    if codec == 'zlib':
+        compressed = zlib.compress(buffer.tobytes())
+    elif codec == 'lzma':
+        compressed = lzma.compress(buffer.tobytes())
+    else:
+        compressed = bz2.compress(buffer.tobytes())
+    return frombuffer(compressed, dtype=uint8)
+
+
+def block_decompress(buffer: array, codec: str, shuffle: str, item_size: int, num_bytes: int) -> array:
+    """
+    Undoes block_compress
+    :param buffer: numpy uint8 array
+    :param codec: 'zlib', 'lzma' or 'bz2'
+    :param shuffle: None, 'byte' or 'bit'
+    :param item_size: number of bytes per item the shuffle worked on
+    :param num_bytes: number of bytes before compression
+    :return: numpy uint8 array
+    """
+    validate_block_compression(codec, shuffle)
+    if codec == 'zlib':
+        decompressed = zlib.decompress(buffer.tobytes())
+    elif codec == 'lzma':
+        decompressed = lzma.decompress(buffer.tobytes())
+    else:
+        decompressed = bz2.decompress(buffer.tobytes())
+    buffer = frombuffer(decompressed, dtype=uint8)
+    if buffer.size != num_bytes:
+        raise BlockCompressionInvalidError('Expected {} bytes after decompressing, {} found'.format(
+            num_bytes, buffer.size))
+    if shuffle == 'byte':
+        return unshuffle_bytes(buffer, item_size)
+    if shuffle == 'bit':
+        return unshuffle_bits(buffer, item_size, num_bytes)
+    return buffer
@@ -118,26 +118,24 @@ def get_units_from_dtype(dtype) -> str:
 
 def compress_time_delta_array(arr: np.array) -> (np.array, str):
     """
-    Tries to compress the timedelta64 array by units
+    Tries to compress the datetime64 or timedelta64 array by units, moving to the least
+    granular units that still hold every value exactly. Works in integer math so that
+    large values (e.g. nanoseconds since epoch) do not lose precision.
     :param arr: numpy array
     :return: tuple, (numpy array of int64s, units string)
     """
-    mod_value = np.full(arr.shape, 0, dtype=np.uint64)
-    mod_result = np.full(arr.shape, 0, dtype=np.float64)
-    result_array = arr.astype(np.int64)
+    result_array = arr.view(np.int64)
     curr_units = get_units_from_dtype(arr.dtype)
     while True:
         try:
             try_units = get_less_granular_units(curr_units)
         except DateUnitsGranularityError:  # we couldn't get less granular
             break
-        divisor = get_conversion_multiplier(try_units, curr_units)
-        mod_value.fill(divisor)
-        np.mod(result_array, mod_value, mod_result)
+        divisor = get_unit_data(try_units).multiplier // get_unit_data(curr_units).multiplier
         # check if we are not successful
-        if np.count_nonzero(mod_result) > 0:
+        if np.count_nonzero(np.mod(result_array, divisor)) > 0:
             break
         # else, we are successful, update the result_array and curr_units
         curr_units = try_units
-        result_array = (result_array / divisor).astype(np.int64)
+        result_array = result_array // divisor
     return result_array, curr_units
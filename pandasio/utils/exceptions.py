@@ -48,3 +48,7 @@ class DataSizeNotPositiveError(ValueError):
 
 class NumBytesForStringInvalidError(ValueError):
     pass
+
+
+class BlockCompressionInvalidError(ValueError):
+    pass
@@ -1,6 +1,8 @@
 from numpy import array, isnan, frombuffer, bitwise_and, full, count_nonzero,\
-    frexp, amin, amax, ediff1d, cumsum, insert, add, around
-from numpy import dtype, float16, float32, uint8, int8, int64
+    frexp, amin, amax, ediff1d, cumsum, insert, around, packbits, unpackbits, zeros, concatenate,\
+    flatnonzero, repeat, unique, argmax, arange, bitwise_xor, ascontiguousarray, isfinite, signbit, absolute,\
+    array_equal
+from numpy import dtype, float16, float32, uint8, int8, int64, uint64
 from collections import namedtuple
 from pandasio.utils.binary import determine_required_bytes_unsigned_integer, determine_required_bytes_signed_integer
 from pandasio.utils.exceptions import ArrayNotFloatException, CompressionModeInvalidError, CompressionError, \
@@ -8,7 +10,28 @@ from pandasio.utils.exceptions import ArrayNotFloatException, CompressionModeInv
 from pandasio.utils.numpy_utils import get_numpy_type
 from pandasio.utils.validation import ensure_int
 
-CompressionResult = namedtuple('CompressionResult', ['numpy_array', 'reference_value'])
+CompressionResult = namedtuple('CompressionResult',
+                               ['numpy_array', 'reference_value', 'bit_width', 'secondary_reference_value',
+                                'run_lengths'],
+                               defaults=(None, None, None))
+COMPRESSION_MODES = ['e', 'm', 'b', 'd', 'r', 'x', 's']
+COMPRESSION_MODE_AUTO = 'a'
+COMPRESSION_MODE_ARITHMETIC_SEQUENCE = 's'
+# cheapest to decode first, used by select_compression_mode to break near ties
+COMPRESSION_MODES_BY_DECODE_COST = ['m', 'b', 'r', 'e', 'd', 'x']
+# modes that give back floats bit for bit, NaN included
+FLOAT_EXACT_COMPRESSION_MODES = ['r', 'x']
+# modes whose size depends on the range of the whole array rather than on neighbouring values
+RANGE_COMPRESSION_MODES = ['m', 'b']
+AUTO_COMPRESSION_SAMPLE_NUM_WINDOWS = 8
+AUTO_COMPRESSION_SAMPLE_WINDOW_SIZE = 4096
+AUTO_COMPRESSION_SIZE_TOLERANCE = 0.05
+MAX_DETECTED_NUM_DECIMALS = 15
+# values scaled past this no longer fit comfortably in the int64 that rounding produces
+MAX_ROUNDED_ABSOLUTE_VALUE = 2 ** 62
+DECIMAL_DETECTION_SAMPLE_SIZE = 4096
+# number of values packed or unpacked at a time, a multiple of 8 so every block starts on a byte
+NUM_VALUES_PER_BIT_PACKING_BLOCK = 1 << 16
 
 
 def compress_float_array(arr: array) -> array:
@@ -95,23 +118,95 @@ def compress_float_array(arr: array) -> array:
     return arr
 
 
+def pack_bits(arr: array, bit_width: int) -> array:
+    """
+    Packs unsigned integers into bit_width bits each, back to back with no padding between values.
+    Bits are stored least significant first, so value i starts at bit i * bit_width of the output
+    :param arr: numpy array of unsigned integers, each smaller than 2^bit_width
+    :param bit_width: number of bits per value, 0 to 64
+    :return: numpy uint8 array of ceil(arr.size * bit_width / 8) bytes
+    """
+    if bit_width < 0 or bit_width > 64:
+        raise ValueError('bit_width must be between 0 and 64, {} found'.format(bit_width))
+    values = arr.astype('<u8')
+    blocks = [zeros(0, dtype=uint8)]
+    for start in range(0, values.size, NUM_VALUES_PER_BIT_PACKING_BLOCK):
+        block = values[start:start + NUM_VALUES_PER_BIT_PACKING_BLOCK]
+        # one row of 64 bits per value, least significant first. keep the low bit_width of them
+        bits = unpackbits(block.view(uint8).reshape(-1, 8), axis=1, bitorder='little')[:, :bit_width]
+        blocks.append(packbits(bits.reshape(-1), bitorder='little'))
+    return concatenate(blocks)
+
+
+def unpack_bits(packed: array, bit_width: int, count: int, bit_offset: int = 0) -> array:
+    """
+    Unpacks count values of bit_width bits each, see pack_bits
+    :param packed: numpy uint8 array of packed values
+    :param bit_width: number of bits per value, 0 to 64
+    :param count: number of values to unpack
+    :param bit_offset: bit of packed[0] the first value starts at, 0 to 7
+    :return: numpy uint64 array of count values
+    """
+    if bit_width < 0 or bit_width > 64:
+        raise ValueError('bit_width must be between 0 and 64, {} found'.format(bit_width))
+    ret_array = zeros(count, dtype=uint64)
+    if bit_width == 0:
+        return ret_array
+    for start in range(0, count, NUM_VALUES_PER_BIT_PACKING_BLOCK):
+        stop = min(start + NUM_VALUES_PER_BIT_PACKING_BLOCK, count)
+        first_bit = bit_offset + start * bit_width
+        last_bit = bit_offset + stop * bit_width
+        bits = unpackbits(packed[first_bit // 8:(last_bit + 7) // 8], bitorder='little')
+        bits = bits[first_bit % 8:first_bit % 8 + (stop - start) * bit_width].reshape(-1, bit_width)
+        # widen every value back to 64 bits and read the rows as little-endian integers
+        padded_bits = zeros((stop - start, 64), dtype=uint8)
+        padded_bits[:, :bit_width] = bits
+        ret_array[start:stop] = packbits(padded_bits, axis=1, bitorder='little').view('<u8').reshape(-1)
+    return ret_array
+
+
 def compress_array(arr: array, mode: str) -> CompressionResult:
     """
     compresses the array by finding the minimum value.
     if mode is 'e', the differences between elements are stored
     if mode is 'm', the returned array holds the difference from minimum
+    if mode is 'b', the differences from minimum of an integer array are bit-packed at the narrowest bit width
+    that holds them all, see pack_bits
+    if mode is 'd', the differences between the differences of an integer array are stored (delta-of-delta),
+    so evenly spaced values compress to zeros and jittery ones to small residuals
+    if mode is 'r', runs of repeated values are stored once each, with the length of each run
+    if mode is 'x', each value's bits are XORed with the previous value's and only the meaningful bits are
+    kept, see compress_array_xor
+    if mode is 's', the array must be exactly start + i * step, and only start and step are kept
     :param arr: numpy source array
-    :param mode: string, must be 'e' or 'm'. 'e' is differences between elements, 'm' is difference from minimum
-    :return: CompressionResult named-tuple like numpy array, value. if mode='e', array has 1 fewer elements than arr
-    and value is the starting value. If mode='m', value is minimum
+    :param mode: string, must be 'e', 'm', 'b', 'd', 'r', 'x' or 's'. 'e' is differences between elements, 'm' is
+    difference from minimum, 'b' is bit-packed difference from minimum, 'd' is differences between differences,
+    'r' is run-length encoded, 'x' is XOR with the previous value, 's' is an arithmetic sequence
+    :return: CompressionResult named-tuple like numpy array, value, bit width, secondary value. if mode='e', array
+    has 1 fewer elements than arr and value is the starting value. If mode='m' or 'b', value is minimum.
+    bit width is only set if mode='b'. If mode='d', array has 2 fewer elements than arr, value is the starting
+    value and secondary value is the first difference. If mode='r', array holds the value of each run, less
+    value, and run lengths the number of rows in each run. If mode='x', array is a uint8 byte stream and value
+    is the starting value. If mode='s', array is empty, value is the starting value and secondary value the step
     """
-    if mode not in ['e', 'm']:
-        raise CompressionModeInvalidError('Mode must be "e" or "m", {} found'.format(mode))
+    if mode not in COMPRESSION_MODES:
+        raise CompressionModeInvalidError('Mode must be one of {}, {} found'.format(COMPRESSION_MODES, mode))
 
     if arr.dtype.kind not in ['f', 'u', 'i']:
         raise CompressionError('Could not compress. dtype kind {} not '
                                'eligible for compression.'.format(arr.dtype.kind))
 
+    if mode == 'b':
+        return compress_array_bit_packed(arr)
+    if mode == 'd':
+        return compress_array_delta_of_delta(arr)
+    if mode == 'r':
+        return compress_array_run_length(arr)
+    if mode == 'x':
+        return compress_array_xor(arr)
+    if mode == 's':
+        return compress_array_arithmetic_sequence(arr)
+
     # if we're already tiny, no compression
     if arr.dtype.kind in ['u', 'i'] and arr.itemsize == 1:
         return arr
@@ -130,7 +225,16 @@ def compress_array(arr: array, mode: str) -> CompressionResult:
 
     if mode == 'm':
         diff_array = arr - reference_value
+    return CompressionResult(narrow_array(diff_array), reference_value)
+
 
+def narrow_array(diff_array: array) -> array:
+    """
+    Casts an array of differences to the smallest dtype that holds its values,
+    whole bytes for integers and loss-less float widths for floats
+    :param diff_array: numpy array of differences
+    :return: numpy array
+    """
     # calculate the size of data needed
     max_value = amax(diff_array)
     min_value = amin(diff_array)
@@ -149,28 +253,346 @@ def compress_array(arr: array, mode: str) -> CompressionResult:
     if diff_array.dtype.kind == 'f':  # float
         # try to convert the array
         ret_array = compress_float_array(diff_array)
-    return CompressionResult(ret_array, reference_value)
+    return ret_array
+
+
+def compress_array_bit_packed(arr: array) -> CompressionResult:
+    """
+    bit-packs the differences of an integer array from its minimum, see compress_array
+    :param arr: numpy array of integers
+    :return: CompressionResult named-tuple like packed uint8 array, minimum, bit width
+    """
+    if arr.dtype.kind not in ['u', 'i']:
+        raise CompressionError('Could not bit-pack. dtype kind {} is not an integer.'.format(arr.dtype.kind))
+    if arr.size == 0:
+        return arr
+    reference_value = amin(arr)
+    # the difference may overflow a signed dtype, but read as unsigned of the same size it is exact
+    diff_array = (arr - reference_value).astype(get_numpy_type('u', arr.itemsize * 8))
+    bit_width = int(amax(diff_array)).bit_length()
+    return CompressionResult(pack_bits(diff_array, bit_width), reference_value, bit_width)
+
+
+def compress_array_delta_of_delta(arr: array) -> CompressionResult:
+    """
+    stores the differences between consecutive differences of an integer array, see compress_array
+    :param arr: numpy array of integers
+    :return: CompressionResult named-tuple like residuals array, starting value, None, first difference
+    """
+    if arr.dtype.kind not in ['u', 'i']:
+        raise CompressionError('Could not delta-of-delta encode. dtype kind {} is not an integer.'.format(
+            arr.dtype.kind))
+    # needs a first value and a first difference
+    if arr.size < 3:
+        return arr
+    differences = ediff1d(arr)
+    return CompressionResult(narrow_array(ediff1d(differences)), arr[0], None, differences[0])
+
+
+def compress_array_arithmetic_sequence(arr: array) -> CompressionResult:
+    """
+    stores an array that is exactly start + i * step as its start and step only, see compress_array
+    :param arr: numpy array
+    :return: CompressionResult named-tuple like empty array, starting value, None, step
+    """
+    step = get_arithmetic_sequence_step(arr)
+    if step is None:
+        raise CompressionError('Could not encode as an arithmetic sequence. The values are not evenly spaced.')
+    return CompressionResult(zeros(0, dtype=arr.dtype), arr[0], None, step)
+
+
+def get_arithmetic_sequence_step(arr: array):
+    """
+    Finds the step of an array whose values are exactly start + i * step, bit for bit, e.g. a regular index,
+    a row counter or a constant. Checked a block at a time so uneven arrays are turned down early
+    :param arr: numpy array
+    :return: step, in the dtype of arr, or None if arr is not an arithmetic sequence
+    """
+    if arr.dtype.kind not in ['f', 'u', 'i'] or arr.size == 0:
+        return None
+    if arr.dtype.kind == 'f' and not isfinite(arr[:2]).all():
+        # infinities and NaN never step evenly, and their differences are not numbers
+        return None
+    step = (arr[1:2] - arr[:1])[0] if arr.size > 1 else arr.dtype.type(0)
+    bits_dtype = dtype('<u{}'.format(arr.itemsize))
+    for start in range(0, arr.size, NUM_VALUES_PER_BIT_PACKING_BLOCK):
+        stop = min(start + NUM_VALUES_PER_BIT_PACKING_BLOCK, arr.size)
+        expected = arithmetic_sequence(arr[0], step, start, stop)
+        if not array_equal(arr[start:stop].view(bits_dtype), expected.view(bits_dtype)):
+            return None
+    return step
+
+
+def arithmetic_sequence(reference_value, step, start: int, stop: int) -> array:
+    """
+    Generates values [start, stop) of the sequence reference_value + i * step. Integers wrap around exactly
+    like the differences that found the step, and each float value only depends on its own i, so any slice
+    matches the whole sequence
+    :param reference_value: first value, its dtype is the dtype of the values
+    :param step: difference between consecutive values
+    :param start: first i to generate
+    :param stop: i after the last one to generate
+    :return: numpy array
+    """
+    reference_array = array([reference_value])
+    indices = arange(start, stop, dtype=int64)
+    if reference_array.dtype.kind == 'f':
+        return reference_array[0] + indices.astype(reference_array.dtype) * reference_array.dtype.type(step)
+    return (indices.astype(uint64) * array(step).astype(uint64) + reference_array.astype(uint64)).astype(
+        reference_array.dtype)
+
+
+def compress_array_run_length(arr: array) -> CompressionResult:
+    """
+    stores each run of repeated values once, see compress_array.
+    integer run values are stored as differences from their minimum, float run values as they are
+    :param arr: numpy array
+    :return: CompressionResult named-tuple like run values array, reference value, None, None, run lengths array
+    """
+    if arr.size == 0:
+        return arr
+    changes = arr[1:] != arr[:-1]
+    if arr.dtype.kind == 'f':
+        # NaN never equals NaN, but a run of NaN is still a run
+        changes &= ~(isnan(arr[1:]) & isnan(arr[:-1]))
+    run_starts = concatenate(([0], flatnonzero(changes) + 1))
+    run_lengths = ediff1d(concatenate((run_starts, [arr.size])))
+    run_values = arr[run_starts]
+    if arr.dtype.kind == 'f':
+        # subtracting a reference value from floats could lose precision
+        reference_value = arr.dtype.type(0)
+        run_values = compress_float_array(run_values)
+    else:
+        reference_value = amin(run_values)
+        run_values = narrow_array(run_values - reference_value)
+    run_lengths = run_lengths.astype(get_numpy_type('u', determine_required_bytes_unsigned_integer(
+        int(amax(run_lengths))) * 8))
+    return CompressionResult(run_values, reference_value, None, None, run_lengths)
+
+
+def compress_array_xor(arr: array) -> CompressionResult:
+    """
+    XORs the bits of each value with the bits of the previous value (Gorilla style). Slowly moving floats
+    share their sign, exponent and leading mantissa bits, so the XOR has long runs of leading and trailing
+    zeros, and repeated values XOR to zero. Exactly loss-less, NaN payloads included.
+    The uint8 stream holds, in order:
+    one bit per value after the first, set if its XOR is not zero;
+    the trailing zero count of each non-zero XOR, bit-packed;
+    the number of meaningful bits of each non-zero XOR less one, bit-packed;
+    the meaningful bits of the non-zero XORs back to back, in blocks padded to whole bytes.
+    Counts take 4, 5 or 6 bits for 16, 32 or 64-bit values
+    :param arr: numpy array of 2, 4 or 8 byte values
+    :return: CompressionResult named-tuple like uint8 stream, starting value
+    """
+    if arr.itemsize == 1 or arr.size < 2:
+        return arr
+    width = arr.itemsize * 8
+    count_bit_width = width.bit_length() - 1
+    bits = ascontiguousarray(arr).view(get_numpy_type('u', width))
+    xor_array = bits[1:] ^ bits[:-1]
+    is_nonzero = xor_array != 0
+    nonzero = xor_array[is_nonzero].astype('<u{}'.format(arr.itemsize))
+    columns = arange(width)
+    trailing_zeros = [zeros(0, dtype=int64)]
+    meaningful_lengths = [zeros(0, dtype=int64)]
+    meaningful_bits = [zeros(0, dtype=uint8)]
+    for start in range(0, nonzero.size, NUM_VALUES_PER_BIT_PACKING_BLOCK):
+        block = nonzero[start:start + NUM_VALUES_PER_BIT_PACKING_BLOCK]
+        # one row of width bits per value, least significant first
+        bit_matrix = unpackbits(block.view(uint8).reshape(-1, arr.itemsize), axis=1, bitorder='little')
+        lowest = argmax(bit_matrix, axis=1)
+        highest = width - 1 - argmax(bit_matrix[:, ::-1], axis=1)
+        is_meaningful = (columns >= lowest[:, None]) & (columns <= highest[:, None])
+        trailing_zeros.append(lowest)
+        meaningful_lengths.append(highest - lowest + 1)
+        meaningful_bits.append(packbits(bit_matrix[is_meaningful], bitorder='little'))
+    trailing_zeros = concatenate(trailing_zeros)
+    meaningful_lengths = concatenate(meaningful_lengths)
+    stream = concatenate([
+        packbits(is_nonzero, bitorder='little'),
+        pack_bits(trailing_zeros, count_bit_width),
+        pack_bits(meaningful_lengths - 1, count_bit_width)
+    ] + meaningful_bits)
+    return CompressionResult(stream, arr[0])
+
+
+def decompress_array_xor(stream: array, reference_value, num_points: int) -> array:
+    """
+    Decodes a uint8 stream written by compress_array_xor
+    :param stream: numpy uint8 array
+    :param reference_value: first value, its dtype is the dtype of the values
+    :param num_points: number of values
+    :return: numpy array
+    """
+    reference_array = array([reference_value])
+    width = reference_array.itemsize * 8
+    count_bit_width = width.bit_length() - 1
+    bits_dtype = dtype('<u{}'.format(reference_array.itemsize))
+    num_xors = num_points - 1
+    counter = (num_xors + 7) // 8
+    is_nonzero = unpackbits(stream[:counter], count=num_xors, bitorder='little').astype(bool)
+    num_nonzero = int(count_nonzero(is_nonzero))
+    num_count_bytes = (num_nonzero * count_bit_width + 7) // 8
+    trailing_zeros = unpack_bits(stream[counter:counter + num_count_bytes], count_bit_width, num_nonzero)
+    counter += num_count_bytes
+    meaningful_lengths = unpack_bits(stream[counter:counter + num_count_bytes], count_bit_width, num_nonzero) + 1
+    counter += num_count_bytes
+    trailing_zeros = trailing_zeros.astype(int64)
+    meaningful_lengths = meaningful_lengths.astype(int64)
+    columns = arange(width)
+    nonzero = zeros(num_nonzero, dtype=bits_dtype)
+    for start in range(0, num_nonzero, NUM_VALUES_PER_BIT_PACKING_BLOCK):
+        stop = min(start + NUM_VALUES_PER_BIT_PACKING_BLOCK, num_nonzero)
+        lowest = trailing_zeros[start:stop]
+        is_meaningful = (columns >= lowest[:, None]) & (columns < (lowest + meaningful_lengths[start:stop])[:, None])
+        num_bits = int(meaningful_lengths[start:stop].sum())
+        bit_matrix = zeros((stop - start, width), dtype=uint8)
+        bit_matrix[is_meaningful] = unpackbits(stream[counter:counter + (num_bits + 7) // 8], count=num_bits,
+                                               bitorder='little')
+        counter += (num_bits + 7) // 8
+        nonzero[start:stop] = packbits(bit_matrix, axis=1, bitorder='little').view(bits_dtype).reshape(-1)
+    xor_array = zeros(num_points, dtype=bits_dtype)
+    xor_array[0] = reference_array.view(bits_dtype)[0]
+    xor_array[1:][is_nonzero] = nonzero
+    return bitwise_xor.accumulate(xor_array).view(reference_array.dtype)
+
+
+def dictionary_encode_array(arr: array) -> tuple:
+    """
+    Replaces each value by its position in a sorted table of the distinct values.
+    decode with table[codes]
+    :param arr: numpy array
+    :return: tuple like (table, codes), codes in the dtype given by get_dictionary_codes_dtype
+    """
+    table, codes = unique(arr, return_inverse=True)
+    return table, codes.astype(get_dictionary_codes_dtype(table.size))
 
 
-def decompress_array(arr: array, mode: str, reference_value) -> array:
+def get_dictionary_codes_dtype(table_size: int) -> dtype:
+    """
+    Gets the narrowest unsigned integer dtype that can index a dictionary table
+    :param table_size: number of values in the table
+    :return: numpy dtype
+    """
+    return dtype(get_numpy_type('u', determine_required_bytes_unsigned_integer(max(table_size - 1, 0)) * 8))
+
+
+def estimate_compressed_size(arr: array, mode: str) -> int:
+    """
+    Compresses the array and measures the result
+    :param arr: numpy array
+    :param mode: compression mode, see compress_array
+    :return: number of bytes, or None if the mode cannot compress the array
+    """
+    try:
+        compression_result = compress_array(arr, mode)
+    except CompressionError:
+        return None
+    if not isinstance(compression_result, CompressionResult):
+        return arr.nbytes
+    num_bytes = compression_result.numpy_array.nbytes
+    if compression_result.run_lengths is not None:
+        num_bytes += compression_result.run_lengths.nbytes
+    return num_bytes
+
+
+def select_compression_mode(arr: array) -> str:
+    """
+    Picks the compression mode for an array by trial-compressing a sample of it with every mode.
+    The sample is AUTO_COMPRESSION_SAMPLE_NUM_WINDOWS evenly spaced windows of contiguous values, so
+    differences and runs look like those of the whole array. Modes whose size depends on the range of the array
+    see the window with the minimum and maximum of the whole array added. Of the modes whose estimated size is within
+    AUTO_COMPRESSION_SIZE_TOLERANCE of the smallest, the cheapest to decode is picked. Storing the array as it is
+    counts as the cheapest of all, so no mode is picked when none makes the sample smaller than that tolerance.
+    Float arrays only consider the modes that give them back bit for bit
+    :param arr: numpy array
+    :return: compression mode, see compress_array, or None to store the array uncompressed
+    """
+    window_size = AUTO_COMPRESSION_SAMPLE_WINDOW_SIZE
+    if arr.size <= AUTO_COMPRESSION_SAMPLE_NUM_WINDOWS * window_size:
+        windows = [arr]
+    else:
+        stride = (arr.size - window_size) // (AUTO_COMPRESSION_SAMPLE_NUM_WINDOWS - 1)
+        windows = [arr[i * stride:i * stride + window_size] for i in range(0, AUTO_COMPRESSION_SAMPLE_NUM_WINDOWS)]
+    # arithmetic sequences are found on the whole array rather than sampled, see get_arithmetic_sequence_step
+    modes = FLOAT_EXACT_COMPRESSION_MODES if arr.dtype.kind == 'f' else \
+        [m for m in COMPRESSION_MODES if m != COMPRESSION_MODE_ARITHMETIC_SEQUENCE]
+    extremes = array([amin(arr), amax(arr)], dtype=arr.dtype) if arr.size > 0 else arr
+    uncompressed_size = sum([w.nbytes for w in windows])
+    sizes = {}
+    for mode in modes:
+        if mode in RANGE_COMPRESSION_MODES:
+            window_sizes = [estimate_compressed_size(concatenate([w, extremes]), mode) for w in windows]
+        else:
+            window_sizes = [estimate_compressed_size(w, mode) for w in windows]
+        if None not in window_sizes:
+            sizes[mode] = sum(window_sizes)
+    smallest = min(list(sizes.values()) + [uncompressed_size])
+    if uncompressed_size <= smallest * (1 + AUTO_COMPRESSION_SIZE_TOLERANCE):
+        return None
+    for mode in COMPRESSION_MODES_BY_DECODE_COST:
+        if mode in sizes and sizes[mode] <= smallest * (1 + AUTO_COMPRESSION_SIZE_TOLERANCE):
+            return mode
+
+
+def get_accumulation_dtype(arr: array, reference_value):
+    """
+    Gets the dtype that differences should be summed in so integers are added back exactly,
+    the dtype of the reference value when both are integers
+    :param arr: array of differences
+    :param reference_value: value the differences are added to
+    :return: numpy dtype, or None to let numpy choose
+    """
+    reference_dtype = array(reference_value).dtype
+    if arr.dtype.kind in ['u', 'i'] and reference_dtype.kind in ['u', 'i']:
+        return reference_dtype
+    return None
+
+
+def decompress_array(arr: array, mode: str, reference_value, bit_width: int = None, num_points: int = None,
+                     bit_offset: int = 0, secondary_reference_value=None, run_lengths: array = None) -> array:
     """
     Decodes a numpy array using a specified mode and reference value.
     :param arr: array to decompress
-    :param mode: either 'e' for element-wise differences or 'm' for difference from minimum
-    :param reference_value: first value of decompressed array if 'e', else the min value of the decompressed array
+    :param mode: 'e' for element-wise differences, 'm' for difference from minimum, 'b' for bit-packed
+    difference from minimum, 'd' for differences between differences, 'r' for run values, 'x' for a stream of
+    XORs with the previous value or 's' for an arithmetic sequence
+    :param reference_value: first value of decompressed array if 'e', 'd', 'x' or 's', else the min value of the
+    decompressed array
+    :param bit_width: number of bits per value, only used if 'b'
+    :param num_points: number of values to unpack, only used if 'b', 'x' or 's'
+    :param bit_offset: bit of arr[0] the first value starts at, only used if 'b'
+    :param secondary_reference_value: first difference if 'd', step if 's'
+    :param run_lengths: number of rows in each run, only used if 'r'
     :return: numpy array with decompressed data
     """
-    if mode not in ['e', 'm']:
-        raise CompressionModeInvalidError('Mode must be "e" or "m", {} found'.format(mode))
+    if mode not in COMPRESSION_MODES:
+        raise CompressionModeInvalidError('Mode must be one of {}, {} found'.format(COMPRESSION_MODES, mode))
 
     if arr.dtype.kind not in ['f', 'u', 'i']:
         raise CompressionError('Could not compress. dtype kind {} not '
                                'eligible for compression.'.format(arr.dtype.kind))
     if mode == 'e':
-        ret_array = cumsum(arr) + reference_value
+        ret_array = cumsum(arr, dtype=get_accumulation_dtype(arr, reference_value)) + reference_value
         ret_array = insert(ret_array, 0, reference_value)
     elif mode == 'm':
-        ret_array = add(arr, full(arr.shape, reference_value))
+        reference_dtype = array(reference_value).dtype
+        # adding unsigned differences to a signed reference value would go through float64 and round
+        ret_array = arr.astype(reference_dtype) + reference_value
+    elif mode == 'x':
+        ret_array = decompress_array_xor(arr, reference_value, num_points)
+    elif mode == 's':
+        ret_array = arithmetic_sequence(reference_value, secondary_reference_value, 0, num_points)
+    elif mode == 'r':
+        reference_dtype = array(reference_value).dtype
+        ret_array = repeat(arr.astype(reference_dtype) + reference_value, run_lengths)
+    elif mode == 'd':
+        differences = decompress_array(arr, 'e', secondary_reference_value)
+        ret_array = decompress_array(differences, 'e', reference_value)
+    elif mode == 'b':
+        reference_dtype = array(reference_value).dtype
+        # unsigned differences wrap back into signed values exactly
+        ret_array = unpack_bits(arr, bit_width, num_points, bit_offset).astype(reference_dtype) + reference_value
     return ret_array
 
 
@@ -190,3 +612,63 @@ def round_array_returning_integers(arr: array, num_decimals: int) -> array:
     rounded_array = arr * pow(10, num_decimals)
     rounded_array = around(rounded_array)
     return rounded_array.astype(int64)
+
+
+def detect_decimal_precision(arr: array, max_num_decimals: int = MAX_DETECTED_NUM_DECIMALS) -> int:
+    """
+    Finds the smallest number of decimals at which a float array comes back exactly from
+    round_array_returning_integers, decoded as integers / 10^decimals. Each number of decimals is tried on
+    a strided sample first, and only checked against the whole array once the sample comes back exactly.
+    Arrays holding NaN, infinities or negative zeros never come back exactly
+    :param arr: numpy float array
+    :param max_num_decimals: largest number of decimals to try
+    :return: number of decimals, or None if no number of decimals up to max_num_decimals works
+    """
+    if arr.dtype.kind != 'f' or arr.size == 0:
+        return None
+    if count_nonzero(~isfinite(arr)) > 0 or count_nonzero(signbit(arr) & (arr == 0)) > 0:
+        return None
+    max_absolute_value = float(amax(absolute(arr)))
+    sample = arr[::max(1, arr.size // DECIMAL_DETECTION_SAMPLE_SIZE)]
+    for num_decimals in range(0, max_num_decimals + 1):
+        if max_absolute_value * pow(10, num_decimals) >= MAX_ROUNDED_ABSOLUTE_VALUE:
+            return None
+        if round_trips_after_rounding(sample, num_decimals) and round_trips_after_rounding(arr, num_decimals):
+            return num_decimals
+    return None
+
+
+def round_trips_after_rounding(arr: array, num_decimals: int) -> bool:
+    """
+    Checks whether rounding a float array to integers and dividing them back gives the same array
+    :param arr: numpy float array
+    :param num_decimals: number of decimals to keep
+    :return: boolean
+    """
+    rounded_array = round_array_returning_integers(arr, num_decimals)
+    return array_equal(rounded_array.astype(arr.dtype) / pow(10, num_decimals), arr)
+
+
+def round_trips_after_compression(arr: array, compression_result: CompressionResult, mode: str) -> bool:
+    """
+    Checks whether decompressing a compressed array gives back the same bits. Floats can round when they are
+    stored as differences, and -0.0 equals 0.0, so it can be lost from a run or a reference value
+    :param arr: numpy array that was compressed
+    :param compression_result: CompressionResult named-tuple returned by compress_array
+    :param mode: mode arr was compressed with
+    :return: boolean
+    """
+    decompressed_array = decompress_array(
+        compression_result.numpy_array,
+        mode,
+        compression_result.reference_value,
+        bit_width=compression_result.bit_width,
+        num_points=arr.size,
+        secondary_reference_value=compression_result.secondary_reference_value,
+        run_lengths=compression_result.run_lengths
+    )
+    if decompressed_array.size != arr.size:
+        return False
+    bits_dtype = dtype('<u{}'.format(arr.itemsize))
+    return array_equal(ascontiguousarray(decompressed_array.astype(arr.dtype)).view(bits_dtype),
+                       ascontiguousarray(arr).view(bits_dtype))
@@ -10,6 +10,9 @@ class NumpyTypeChars(Enum):
     INTEGER = 'i'
     FLOAT = 'f'
     STRING = 'U'
+    BYTES = 'S'
+    DATETIME = 'M'
+    TIMEDELTA = 'm'
 
 
 def get_type_char_int(type_char: Union[NumpyTypeChars, str, int]) -> int:
@@ -68,7 +71,8 @@ def get_type_char_char(type_char: Union[NumpyTypeChars, str, int]) -> str:
 def get_numpy_type(type_char: Union[NumpyTypeChars, str, int], size: int) -> np.dtype:
     """
     Gets the numpy data type corresponding to the type char ('i', 'u', 'f')
-    and size in bits of the value.
+    and size in bits of the value. Datetimes ('M') and timedeltas ('m') come back
+    without units, the units are stored separately.
     :param type_char: NumpyTypeChars, string, or integer corresponding to char in ('i', 'u', 'f')
     :param size: number of BITS in the data
     :return: numpy dtype
@@ -109,9 +113,102 @@ def get_numpy_type(type_char: Union[NumpyTypeChars, str, int], size: int) -> np.
             raise NumBytesForStringInvalidError('Could not get numpy type for string.'
                                                 ' Number of bits must be multiple of 32')
         return '<U{}'.format(num_chars)
+    elif type_char == NumpyTypeChars.DATETIME.value:
+        if size == 64:
+            return np.dtype('datetime64')
+    elif type_char == NumpyTypeChars.TIMEDELTA.value:
+        if size == 64:
+            return np.dtype('timedelta64')
     raise ValueError(
         'Could not find match for char {} and size {}'.format(
             type_char,
             size
         )
     )
+
+
+def _string_array_to_code_units(arr: np.array) -> tuple:
+    """
+    Lays out the characters of a 'U' or 'S' array back to back, dropping the padding of the fixed-width layout
+    :param arr: numpy array of kind 'U' (code points) or 'S' (bytes)
+    :return: tuple like (code units, lengths), a uint32 (for 'U') or uint8 (for 'S') array and an int64 array
+    """
+    unit_dtype = np.uint32 if arr.dtype.kind == NumpyTypeChars.STRING.value else np.uint8
+    width = arr.dtype.itemsize // np.dtype(unit_dtype).itemsize
+    if width == 0 or arr.size == 0:
+        return np.zeros(0, dtype=unit_dtype), np.zeros(arr.size, dtype=np.int64)
+    units = np.ascontiguousarray(arr).view(unit_dtype).reshape(arr.size, width)
+    # numpy pads with, and strips, trailing nulls, so a string ends after its last non-null unit
+    is_used = units != 0
+    lengths = np.where(is_used.any(axis=1), width - np.argmax(is_used[:, ::-1], axis=1), 0).astype(np.int64)
+    return units[np.arange(width) < lengths[:, None]], lengths
+
+
+def _code_units_to_string_array(units: np.array, lengths: np.array, kind: str) -> np.array:
+    """
+    Inverse of _string_array_to_code_units
+    :param units: uint32 (for 'U') or uint8 (for 'S') array of the characters back to back
+    :param lengths: int64 array with the number of characters of each string
+    :param kind: 'U' or 'S'
+    :return: numpy array of kind, as wide as the longest string
+    """
+    width = max(int(lengths.max()) if lengths.size > 0 else 0, 1)
+    padded = np.zeros((lengths.size, width), dtype=units.dtype)
+    padded[np.arange(width) < lengths[:, None]] = units
+    return padded.view('{}{}'.format(kind, width)).reshape(lengths.size)
+
+
+def encode_utf8_strings(arr: np.array) -> tuple:
+    """
+    Encodes a 'U' or 'S' array as one contiguous byte buffer and the offset of each string in it, without
+    creating a Python object per string. 'U' strings are encoded to UTF-8, 'S' strings are kept as they are.
+    string i is buffer[offsets[i]:offsets[i + 1]]
+    :param arr: numpy array of kind 'U' or 'S'
+    :return: tuple like (offsets, buffer), an int64 array of arr.size + 1 offsets and a uint8 array
+    """
+    units, lengths = _string_array_to_code_units(arr)
+    if arr.dtype.kind == NumpyTypeChars.STRING.value:
+        code_points = units
+        num_bytes = 1 + (code_points >= 0x80) + (code_points >= 0x800) + (code_points >= 0x10000)
+        starts = np.cumsum(num_bytes) - num_bytes
+        units = np.zeros(int(num_bytes.sum()), dtype=np.uint8)
+        lead_marks = np.array([0, 0, 0xC0, 0xE0, 0xF0], dtype=np.uint32)
+        units[starts] = lead_marks[num_bytes] | (code_points >> (6 * (num_bytes - 1)).astype(np.uint32))
+        for k in range(1, 4):
+            is_continued = num_bytes > k
+            shift = (6 * (num_bytes[is_continued] - 1 - k)).astype(np.uint32)
+            units[starts[is_continued] + k] = 0x80 | ((code_points[is_continued] >> shift) & 0x3F)
+        # characters per string become bytes per string
+        character_ends = np.cumsum(lengths)
+        byte_ends = np.concatenate(([0], np.cumsum(num_bytes)))[character_ends]
+        lengths = np.diff(np.concatenate(([0], byte_ends)))
+    offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+    return offsets, units.astype(np.uint8, copy=False)
+
+
+def decode_utf8_strings(offsets: np.array, buffer: np.array, kind: str) -> np.array:
+    """
+    Decodes the byte buffer and offsets written by encode_utf8_strings into a 'U' or 'S' array as wide as the
+    longest string, without creating a Python object per string
+    :param offsets: integer array of the offset of each string, then the end of the last string
+    :param buffer: uint8 array starting at the first string, offsets[0]
+    :param kind: 'U' to decode UTF-8, 'S' for bytes kept as they are
+    :return: numpy array
+    """
+    offsets = offsets.astype(np.int64) - int(offsets[0])
+    buffer = buffer[:int(offsets[-1])]
+    if kind != NumpyTypeChars.STRING.value:
+        return _code_units_to_string_array(buffer, np.diff(offsets), kind)
+    # every byte that is not a continuation byte (0b10xxxxxx) starts a character
+    is_lead = (buffer & 0xC0) != 0x80
+    starts = np.flatnonzero(is_lead)
+    lead = buffer[starts].astype(np.uint32)
+    num_bytes = 1 + (lead >= 0xC0) + (lead >= 0xE0) + (lead >= 0xF0)
+    lead_masks = np.array([0, 0x7F, 0x1F, 0x0F, 0x07], dtype=np.uint32)
+    code_points = lead & lead_masks[num_bytes]
+    for k in range(1, 4):
+        is_continued = num_bytes > k
+        code_points[is_continued] = (code_points[is_continued] << 6) | \
+            (buffer[starts[is_continued] + k].astype(np.uint32) & 0x3F)
+    character_offsets = np.concatenate(([0], np.cumsum(is_lead)))[offsets]
+    return _code_units_to_string_array(code_points, np.diff(character_offsets), kind)
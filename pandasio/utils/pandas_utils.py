@@ -1,17 +1,28 @@
 import numpy as np
-from pandasio.utils.exceptions import InvalidPandasDataTypeError
+from pandasio.utils.datetime_utils import get_units_from_dtype
+from pandasio.utils.exceptions import InvalidPandasDataTypeError, InvalidPandasIndexError, DateUnitsError
 
 
 def parse_pandas_dtype(dtype):
     """
     Parses the dtype and returns a tuple indicating the type and the size of the data type
     :param dtype: string or dtype object
-    :return: tuple like (8, 'f')
+    :return: tuple like (8, 'f'), or (8, 'M') and (8, 'm') for datetime64 and timedelta64, (4, 'U') and (1, 'S')
+    for strings
     """
     try:
         string_dtype = str(np.dtype(dtype))
     except TypeError:
         raise InvalidPandasDataTypeError('Could not parse dtype {} into a valid data type'.format(dtype))
+    if np.dtype(dtype).kind in ('U', 'S'):
+        # strings are variable-length, the size is that of one character
+        return np.dtype(np.dtype(dtype).kind + '1').itemsize, np.dtype(dtype).kind
+    if string_dtype.startswith('datetime64[') or string_dtype.startswith('timedelta64['):
+        try:
+            get_units_from_dtype(string_dtype)
+        except DateUnitsError:
+            raise InvalidPandasDataTypeError('Data type {} did not have acceptable units'.format(string_dtype))
+        return 8, np.dtype(dtype).kind
     if 'float' in string_dtype:
         if 'float64' == string_dtype:
             return 8, 'f'
@@ -39,3 +50,134 @@ def parse_pandas_dtype(dtype):
             return 8, 'i'
     raise InvalidPandasDataTypeError('Data type {} was not in acceptable list of float or int/unsigned int'
                                      ' or did not have acceptable bits'.format(string_dtype))
+
+
+def pandas_values_to_numpy(values) -> np.array:
+    """
+    Gets the numpy array of a pandas Series or Index. Columns of strings, which pandas keeps as Python
+    objects, become a numpy 'U' array. Missing values of strings and of pandas nullable integer columns are
+    masked in a numpy masked array, those of nullable float columns become NaN
+    :param values: pandas Series or Index
+    :return: numpy array, or numpy masked array
+    """
+    from pandas.api.types import is_string_dtype
+    if values.dtype.kind not in ('U', 'S') and is_string_dtype(values):
+        missing = values.isna()
+        if not missing.any():
+            return values.to_numpy(dtype=str)
+        return np.ma.MaskedArray(values.to_numpy(dtype=str, na_value=''), mask=np.asarray(missing))
+    numpy_dtype = getattr(values.dtype, 'numpy_dtype', None)
+    if numpy_dtype is not None and not isinstance(values.dtype, np.dtype):
+        # a pandas nullable dtype such as Int64 or Float64, its missing values are masked
+        missing = np.asarray(values.isna())
+        if numpy_dtype.kind == 'f':
+            return values.to_numpy(dtype=numpy_dtype, na_value=np.nan)
+        data = values.to_numpy(dtype=numpy_dtype, na_value=0)
+        return np.ma.MaskedArray(data, mask=missing) if missing.any() else data
+    return values.to_numpy()
+
+
+def is_supported_pandas_dtype(values) -> bool:
+    """
+    Checks whether a pandas Series or Index reads back with the same values once stored: integers, floats,
+    datetime64 and timedelta64 without a time zone, strings, and pandas nullable integers and floats.
+    Categorical columns would come back as plain values and booleans have no bar type, so they are not
+    :param values: pandas Series or Index
+    :return: boolean
+    """
+    import pandas as pd
+    from pandas.api.types import is_string_dtype
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return False
+    if is_string_dtype(values):
+        return True
+    numpy_dtype = getattr(values.dtype, 'numpy_dtype', values.dtype)
+    return isinstance(numpy_dtype, np.dtype) and numpy_dtype.kind in ('i', 'u', 'f', 'M', 'm')
+
+
+def is_default_range_index(index) -> bool:
+    """
+    Checks whether a pandas index is the RangeIndex pandas gives a frame by default, 0 to n - 1 without a name
+    :param index: pandas Index or MultiIndex
+    :return: boolean
+    """
+    import pandas as pd
+    return isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1 and index.name is None
+
+
+def get_index_level_names(index) -> list:
+    """
+    Gets the names of the levels of a pandas index, naming unnamed levels the way
+    DataFrame.reset_index does, 'index' for a single level and 'level_i' for level i of a MultiIndex
+    :param index: pandas Index or MultiIndex
+    :return: list of strings
+    """
+    if index.nlevels == 1:
+        return ['index' if index.name is None else str(index.name)]
+    names = ['level_{}'.format(i) if n is None else str(n) for i, n in enumerate(index.names)]
+    if len(set(names)) != len(names):
+        raise InvalidPandasIndexError('Index level names {} are not unique'.format(names))
+    return names
+
+
+def dataframe_from_arrays(columns: list, index: list, num_points: int, copy: bool = True):
+    """
+    Builds a pandas DataFrame from numpy arrays. The columns sharing a dtype are gathered into one 2-D block,
+    so the frame comes out consolidated and pandas does not copy the data again.
+    pandas is imported here so that only callers building frames need it
+    :param columns: list like [(name, numpy array)]
+    :param index: list like [(name, numpy array)] of index levels, empty for a range index
+    :param num_points: number of rows
+    :param copy: boolean, when False a dtype held by a single column, and a single index level, are used
+    as-is instead of copied, so the frame shares, and may not be able to write to, their memory
+    :return: pandas DataFrame
+    """
+    import pandas as pd
+    groups = {}  # like { dtype : [(name, numpy array)] }
+    frames = []
+    for name, values in columns:
+        if isinstance(values, np.ma.MaskedArray):
+            # columns with missing values do not go into blocks, pandas keeps them as extension arrays
+            frames.append(pd.DataFrame({name: _pandas_nullable_array(values, copy)}))
+        else:
+            groups.setdefault(values.dtype, []).append((name, values))
+    for group in groups.values():
+        if len(group) == 1 and not copy:
+            block = group[0][1].reshape(1, -1)
+        else:
+            block = np.empty((len(group), num_points), dtype=group[0][1].dtype)
+            for i, (_, values) in enumerate(group):
+                block[i] = values
+        frames.append(pd.DataFrame(block.T, columns=[n for n, _ in group], copy=False))
+    if len(frames) == 0:
+        frame = pd.DataFrame(index=pd.RangeIndex(num_points))
+    elif len(frames) == 1:
+        frame = frames[0]
+    else:
+        frame = pd.concat(frames, axis=1)
+    if list(frame.columns) != [n for n, _ in columns]:
+        frame = frame[[n for n, _ in columns]]
+    index = [(n, _pandas_nullable_array(v, copy) if isinstance(v, np.ma.MaskedArray) else v) for n, v in index]
+    if len(index) == 1:
+        frame.index = pd.Index(index[0][1], name=index[0][0], copy=copy)
+    elif len(index) > 1:
+        frame.index = pd.MultiIndex.from_arrays([v for _, v in index], names=[n for n, _ in index])
+    return frame
+
+
+def _pandas_nullable_array(values: np.ma.MaskedArray, copy: bool = True):
+    """
+    Turns a numpy masked array into an array pandas reads missing values from where it is masked, a nullable
+    integer array such as Int64 for integers and an object array holding None otherwise, which pandas
+    infers its string dtype from
+    :param values: numpy masked array
+    :param copy: boolean, when False an integer array shares the memory of values
+    :return: pandas extension array, or numpy object array
+    """
+    import pandas as pd
+    mask = np.ma.getmaskarray(values)
+    if values.dtype.kind in ('i', 'u'):
+        return pd.arrays.IntegerArray(np.ma.getdata(values), mask, copy=copy)
+    objects = np.ma.getdata(values).astype(object)
+    objects[mask] = None
+    return objects
@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+from pandasio.utils.block_compression import *
+from pandasio.utils.exceptions import *
+
+
+class TestBlockCompression(unittest.TestCase):
+    def test_shuffle_bytes(self):
+        buffer = np.arange(7, dtype=np.uint8)
+        np.testing.assert_array_equal([0, 2, 4, 1, 3, 5, 6], shuffle_bytes(buffer, 2))
+        np.testing.assert_array_equal(buffer, unshuffle_bytes(shuffle_bytes(buffer, 2), 2))
+        np.testing.assert_array_equal(buffer, shuffle_bytes(buffer, 1))
+        return
+
+    def test_shuffle_bits(self):
+        buffer = np.array([1, 0, 1, 0, 1, 0, 1, 0], dtype=np.uint8)
+        # the highest bits of the eight bytes come first, the lowest bits last
+        np.testing.assert_array_equal([0, 0, 0, 0, 0, 0, 0, 170], shuffle_bits(buffer, 1))
+        # a single item keeps its bits in order, the byte past it stays at the end
+        np.testing.assert_array_equal([1, 0, 1, 0, 1, 0, 1, 0, 255], shuffle_bits(np.append(buffer, np.uint8(255)), 8))
+        for item_size in [1, 2, 3, 8]:
+            for num_bytes in [0, 5, 64, 3 * NUM_VALUES_PER_BIT_SHUFFLE_BLOCK + 11]:
+                buffer = np.random.randint(0, 256, num_bytes, dtype=np.uint8)
+                shuffled = shuffle_bits(buffer, item_size)
+                self.assertEqual(num_bytes, shuffled.size)
+                np.testing.assert_array_equal(buffer, unshuffle_bits(shuffled, item_size, num_bytes))
+        return
+
+    def test_block_compress(self):
+        data = (np.arange(10000, dtype=np.int32) % 300).astype(np.uint16)
+        for codec in BLOCK_COMPRESSION_CODECS:
+            for shuffle in BLOCK_COMPRESSION_SHUFFLES:
+                compressed = block_compress(data, codec, shuffle, data.itemsize)
+                self.assertEqual(np.uint8, compressed.dtype)
+                self.assertLess(compressed.size, data.nbytes)
+                decompressed = block_decompress(compressed, codec, shuffle, data.itemsize, data.nbytes)
+                np.testing.assert_array_equal(data, decompressed.view(np.uint16))
+        with self.assertRaises(BlockCompressionInvalidError):
+            block_compress(data, 'gzip')
+        with self.assertRaises(BlockCompressionInvalidError):
+            block_compress(data, 'zlib', 'nibble')
+        with self.assertRaises(BlockCompressionInvalidError):
+            block_decompress(block_compress(data, 'zlib'), 'zlib', None, 1, data.nbytes + 1)
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -104,5 +104,18 @@ class TestDateTimeUtils(unittest.TestCase):
         self.assertEqual(1, comp_array_result[0][0])
         return
 
+    def test_compress_time_delta_array_keeps_large_values_exact(self):
+        # nanoseconds since epoch are beyond float64 precision
+        times = np.array([1700000000123456789, 1700000000123456000], dtype=np.int64).view('datetime64[ns]')
+        comp_array_result = compress_time_delta_array(times)
+        self.assertEqual('ns', comp_array_result[1])
+        np.testing.assert_array_equal(times.view(np.int64), comp_array_result[0])
+
+        times = np.array([1700000000123456000, 1700000000123457000], dtype=np.int64).view('datetime64[ns]')
+        comp_array_result = compress_time_delta_array(times)
+        self.assertEqual('us', comp_array_result[1])
+        np.testing.assert_array_equal([1700000000123456, 1700000000123457], comp_array_result[0])
+        return
+
 if __name__ == '__main__':
     unittest.main()
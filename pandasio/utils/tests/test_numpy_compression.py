@@ -1,5 +1,6 @@
 from pandasio.utils.exceptions import *
-from pandasio.utils.numpy_compression import compress_array
+from pandasio.utils.numpy_compression import compress_array, decompress_array, pack_bits, unpack_bits,\
+    dictionary_encode_array, select_compression_mode, arithmetic_sequence, round_trips_after_compression
 import unittest
 import numpy as np
 
@@ -133,6 +134,194 @@ class TestNumpyCompression(unittest.TestCase):
         self.assertEqual(2, compress_array(np.array([1], dtype=np.uint16), 'e').itemsize)
         return
 
+    def test_pack_bits(self):
+        data = np.array([1, 0, 3, 2, 1], dtype=np.uint8)
+        packed = pack_bits(data, 2)
+        self.assertEqual(2, packed.size)
+        self.assertEqual(0b10110001, packed[0])
+        self.assertEqual(0b00000001, packed[1])
+        np.testing.assert_array_equal(data, unpack_bits(packed, 2, 5))
+        np.testing.assert_array_equal(data[1:], unpack_bits(packed, 2, 4, bit_offset=2))
+
+        for bit_width in [1, 7, 11, 33, 64]:
+            data = (np.arange(100001, dtype=np.uint64) * 2654435761) % (1 << bit_width) if bit_width < 64 \
+                else np.array([0, (1 << 64) - 1, 12345], dtype=np.uint64)
+            packed = pack_bits(data, bit_width)
+            self.assertEqual((data.size * bit_width + 7) // 8, packed.size)
+            np.testing.assert_array_equal(data, unpack_bits(packed, bit_width, data.size))
+        self.assertEqual(0, pack_bits(np.zeros(10, dtype=np.uint8), 0).size)
+        np.testing.assert_array_equal(np.zeros(10), unpack_bits(pack_bits(np.zeros(10, dtype=np.uint8), 0), 0, 10))
+        with self.assertRaises(ValueError):
+            pack_bits(data, 65)
+        return
+
+    def test_compress_bit_packed(self):
+        data = np.array([1000, 1003, 1001, 3047], dtype=np.int64)
+        compression_result = compress_array(data, 'b')
+        self.assertEqual(1000, compression_result.reference_value)
+        self.assertEqual(11, compression_result.bit_width)
+        self.assertEqual(6, compression_result.numpy_array.size)
+        self.assertEqual(np.uint8, compression_result.numpy_array.dtype)
+        dec_array = decompress_array(compression_result.numpy_array, 'b', compression_result.reference_value,
+                                     bit_width=compression_result.bit_width, num_points=4)
+        self.assertEqual(np.int64, dec_array.dtype)
+        np.testing.assert_array_equal(data, dec_array)
+
+        for data in [np.array([-128, 127], dtype=np.int8), np.array([np.iinfo(np.int64).min, np.iinfo(np.int64).max])]:
+            compression_result = compress_array(data, 'b')
+            self.assertEqual(data.itemsize * 8, compression_result.bit_width)
+            dec_array = decompress_array(compression_result.numpy_array, 'b', compression_result.reference_value,
+                                         bit_width=compression_result.bit_width, num_points=2)
+            np.testing.assert_array_equal(data, dec_array)
+
+        with self.assertRaises(CompressionError):
+            compress_array(np.array([1.5, 2.5]), 'b')
+        return
+
+    def test_compress_delta_of_delta(self):
+        data = np.array([1000, 1010, 1020, 1031, 1040, 1050], dtype=np.int64)
+        compression_result = compress_array(data, 'd')
+        self.assertEqual(1000, compression_result.reference_value)
+        self.assertEqual(10, compression_result.secondary_reference_value)
+        self.assertEqual(1, compression_result.numpy_array.itemsize)
+        np.testing.assert_array_equal([0, 1, -2, 1], compression_result.numpy_array)
+        dec_array = decompress_array(compression_result.numpy_array, 'd', compression_result.reference_value,
+                                     secondary_reference_value=compression_result.secondary_reference_value)
+        self.assertEqual(np.int64, dec_array.dtype)
+        np.testing.assert_array_equal(data, dec_array)
+
+        data = 1700000000000000000 + np.arange(0, 10 ** 9, 10 ** 6, dtype=np.int64)
+        compression_result = compress_array(data, 'd')
+        self.assertEqual(1, compression_result.numpy_array.itemsize)
+        dec_array = decompress_array(compression_result.numpy_array, 'd', compression_result.reference_value,
+                                     secondary_reference_value=compression_result.secondary_reference_value)
+        np.testing.assert_array_equal(data, dec_array)
+
+        data = np.array([5, 1], dtype=np.int64)
+        self.assertFalse(isinstance(compress_array(data, 'd'), tuple))
+        with self.assertRaises(CompressionError):
+            compress_array(np.array([1.5, 2.5, 3.5]), 'd')
+        return
+
+    def test_compress_run_length(self):
+        data = np.array([7, 7, 7, 9, 9, 7, 7, 7, 7], dtype=np.int64)
+        compression_result = compress_array(data, 'r')
+        self.assertEqual(7, compression_result.reference_value)
+        np.testing.assert_array_equal([0, 2, 0], compression_result.numpy_array)
+        self.assertEqual(1, compression_result.numpy_array.itemsize)
+        np.testing.assert_array_equal([3, 2, 4], compression_result.run_lengths)
+        self.assertEqual(np.uint8, compression_result.run_lengths.dtype)
+        dec_array = decompress_array(compression_result.numpy_array, 'r', compression_result.reference_value,
+                                     run_lengths=compression_result.run_lengths)
+        self.assertEqual(np.int64, dec_array.dtype)
+        np.testing.assert_array_equal(data, dec_array)
+
+        data = np.repeat(np.array([1.25, np.nan, 3.0e300]), [1000, 3, 70000])
+        compression_result = compress_array(data, 'r')
+        np.testing.assert_array_equal([1000, 3, 70000], compression_result.run_lengths)
+        self.assertEqual(np.uint32, compression_result.run_lengths.dtype)
+        dec_array = decompress_array(compression_result.numpy_array, 'r', compression_result.reference_value,
+                                     run_lengths=compression_result.run_lengths)
+        np.testing.assert_array_equal(data, dec_array)
+        return
+
+    def test_compress_xor(self):
+        data = np.array([100.25, 100.25, 100.5, 100.25, 99.75], dtype=np.float64)
+        compression_result = compress_array(data, 'x')
+        self.assertEqual(100.25, compression_result.reference_value)
+        self.assertEqual(np.uint8, compression_result.numpy_array.dtype)
+        self.assertLess(compression_result.numpy_array.nbytes, data.nbytes // 2)
+        dec_array = decompress_array(compression_result.numpy_array, 'x', compression_result.reference_value,
+                                     num_points=data.size)
+        self.assertEqual(np.float64, dec_array.dtype)
+        np.testing.assert_array_equal(data, dec_array)
+
+        # NaN payloads, signed zeros and infinities come back bit for bit
+        nan_payloads = np.array([0x7ff8000000000001, 0x7ff8000000000002, 0xfff0000000000001], dtype=np.uint64)
+        walk = 100 + np.cumsum(np.arange(100000) % 3 - 1) * 0.01
+        for data in [np.concatenate([nan_payloads.view(np.float64), [-0.0, 0.0, np.inf, -np.inf]]),
+                     walk, walk.astype(np.float32), walk.astype(np.float16), np.arange(1000, dtype=np.int64)]:
+            compression_result = compress_array(data, 'x')
+            dec_array = decompress_array(compression_result.numpy_array, 'x', compression_result.reference_value,
+                                         num_points=data.size)
+            self.assertEqual(data.dtype, dec_array.dtype)
+            self.assertEqual(data.tobytes(), dec_array.tobytes())
+        return
+
+    def test_compress_arithmetic_sequence(self):
+        data = 1700000000000000000 + np.arange(1000, dtype=np.int64) * 60000000000
+        compression_result = compress_array(data, 's')
+        self.assertEqual(0, compression_result.numpy_array.nbytes)
+        self.assertEqual(data[0], compression_result.reference_value)
+        self.assertEqual(60000000000, compression_result.secondary_reference_value)
+        dec_array = decompress_array(compression_result.numpy_array, 's', compression_result.reference_value,
+                                     num_points=data.size,
+                                     secondary_reference_value=compression_result.secondary_reference_value)
+        self.assertEqual(np.int64, dec_array.dtype)
+        np.testing.assert_array_equal(data, dec_array)
+        np.testing.assert_array_equal(data[300:700], arithmetic_sequence(data[0], 60000000000, 300, 700))
+
+        # descending unsigned values, wrapping narrow integers, constants and floats
+        for data in [np.arange(200, 0, -1).astype(np.uint64), np.arange(1000).astype(np.int8),
+                     np.full(5, 3.25), np.linspace(0, 1, 100), np.arange(10, dtype=np.float32) * 0.1, np.arange(1)]:
+            compression_result = compress_array(data, 's')
+            dec_array = decompress_array(compression_result.numpy_array, 's', compression_result.reference_value,
+                                         num_points=data.size,
+                                         secondary_reference_value=compression_result.secondary_reference_value)
+            self.assertEqual(data.dtype, dec_array.dtype)
+            self.assertEqual(data.tobytes(), dec_array.tobytes())
+
+        for data in [np.array([1, 2, 4], dtype=np.int64), np.array([0.0, np.nan, 1.0]), np.array([0.0, -0.0]),
+                     np.array([-np.inf, 1.0, 2.0]), np.full(3, np.inf), np.zeros(0, dtype=np.int64)]:
+            with self.assertRaises(CompressionError):
+                compress_array(data, 's')
+        return
+
+    def test_select_compression_mode(self):
+        time = 1700000000000000000 + np.arange(100000, dtype=np.int64) * 1000
+        self.assertEqual('d', select_compression_mode(time))
+        noise = (np.arange(100000, dtype=np.int64) * 2654435761) % 2000
+        self.assertEqual('b', select_compression_mode(noise))
+        self.assertEqual('m', select_compression_mode(noise % 200))
+        # every window of the sample is constant, the range of the whole array still counts
+        self.assertEqual('r', select_compression_mode(np.repeat(np.arange(10, dtype=np.int64), 100000)))
+        self.assertEqual('x', select_compression_mode(100 + np.cumsum(noise % 3 - 1) * 0.01))
+        self.assertEqual('r', select_compression_mode(np.repeat(np.array([1.5, np.nan]), 50000)))
+        # no mode makes noisy floats smaller, so they are left uncompressed
+        self.assertIsNone(select_compression_mode(np.sin(np.arange(100000) * 7.3) * 1e6))
+        return
+
+    def test_round_trips_after_compression(self):
+        data = np.array([2 ** 60 + 1, 3, -5, 2 ** 60 + 3], dtype=np.int64)
+        compression_result = compress_array(data, 'm')
+        self.assertTrue(round_trips_after_compression(data, compression_result, 'm'))
+        np.testing.assert_array_equal(data, decompress_array(compression_result.numpy_array, 'm',
+                                                             compression_result.reference_value))
+
+        # differences from the minimum round large floats, and runs of 0.0 swallow -0.0
+        data = np.array([1e16, 1.0, 3.3, -1e16])
+        self.assertFalse(round_trips_after_compression(data, compress_array(data, 'm'), 'm'))
+        self.assertFalse(round_trips_after_compression(data, compress_array(data, 'e'), 'e'))
+        data = np.array([0.0, -0.0, 1.5, 1.5])
+        self.assertFalse(round_trips_after_compression(data, compress_array(data, 'r'), 'r'))
+        self.assertTrue(round_trips_after_compression(data, compress_array(data, 'x'), 'x'))
+        data = np.linspace(0, 1, 100)
+        self.assertTrue(round_trips_after_compression(data, compress_array(data, 'r'), 'r'))
+        return
+
+    def test_dictionary_encode_array(self):
+        data = np.array([20, 10, 30, 10, 20, 20], dtype=np.int64)
+        table, codes = dictionary_encode_array(data)
+        np.testing.assert_array_equal([10, 20, 30], table)
+        np.testing.assert_array_equal([1, 0, 2, 0, 1, 1], codes)
+        self.assertEqual(np.uint8, codes.dtype)
+        np.testing.assert_array_equal(data, table[codes])
+
+        table, codes = dictionary_encode_array(np.arange(300, dtype=np.int32) % 257)
+        self.assertEqual(257, table.size)
+        self.assertEqual(np.uint16, codes.dtype)
+        return
+
     def test_unable_to_compress_type(self):
         with self.assertRaises(CompressionError):
             compress_array(np.array(['x'], dtype='U1'), 'e')
@@ -116,5 +116,13 @@ class TestNumpyDecompression(unittest.TestCase):
         self.assertEqual(2, compress_array(np.array([1], dtype=np.uint16), 'e').itemsize)
         return
 
+    def test_decompress_large_int64(self):
+        data = 1700000000000000000 + np.arange(0, 1000, 3, dtype=np.int64)
+        compression_result = compress_array(data, 'e')
+        dec_array = decompress_array(compression_result.numpy_array, 'e', compression_result.reference_value)
+        self.assertEqual(np.int64, dec_array.dtype)
+        np.testing.assert_array_equal(data, dec_array)
+        return
+
 if __name__ == '__main__':
     unittest.main()
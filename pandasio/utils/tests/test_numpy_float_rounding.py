@@ -1,6 +1,6 @@
 import unittest
 import numpy as np
-from pandasio.utils.numpy_compression import round_array_returning_integers
+from pandasio.utils.numpy_compression import round_array_returning_integers, detect_decimal_precision
 from pandasio.utils.exceptions import *
 
 
@@ -52,5 +52,20 @@ class TestNumpyFloatRounding(unittest.TestCase):
         self.assertEqual(-4, i[0])
         return
 
+    def test_detect_decimal_precision(self):
+        prices = np.round(100 + (np.arange(100000) * 7919 % 5000) / 100.0, 2)
+        self.assertEqual(2, detect_decimal_precision(prices))
+        self.assertEqual(2, detect_decimal_precision(prices.astype(np.float32)))
+        self.assertEqual(4, detect_decimal_precision(np.array([0.0001, 1.5, -2.25])))
+        self.assertEqual(0, detect_decimal_precision(np.arange(10.0)))
+        self.assertIsNone(detect_decimal_precision(np.linspace(0, 1, 100)))
+        self.assertIsNone(detect_decimal_precision(np.array([1.5, np.nan])))
+        self.assertIsNone(detect_decimal_precision(np.array([1.5, np.inf])))
+        self.assertIsNone(detect_decimal_precision(np.array([-0.0, 1.0])))
+        self.assertIsNone(detect_decimal_precision(np.array([1e300])))
+        self.assertIsNone(detect_decimal_precision(np.arange(10)))
+        self.assertIsNone(detect_decimal_precision(np.array([0.001]), max_num_decimals=2))
+        return
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 from pandasio.utils.numpy_utils import *
 from pandasio.utils.exceptions import *
 
@@ -106,5 +107,28 @@ class TestNumpyUtils(unittest.TestCase):
             get_numpy_type('U', 4)
         return
 
+    def test_encode_decode_utf8_strings(self):
+        data = np.array(['h\u00e9llo', '', 'x\u4e2d', 'a\x00b', '\U0001f600z'])
+        offsets, buffer = encode_utf8_strings(data)
+        self.assertEqual(np.int64, offsets.dtype)
+        self.assertEqual(np.uint8, buffer.dtype)
+        self.assertEqual(''.join(data).encode('utf-8'), buffer.tobytes())
+        np.testing.assert_array_equal([0, 6, 6, 10, 13, 18], offsets)
+        decoded = decode_utf8_strings(offsets, buffer, 'U')
+        self.assertEqual(data.dtype, decoded.dtype)
+        np.testing.assert_array_equal(data, decoded)
+        # a run of the strings, with the bytes from the first of them on
+        np.testing.assert_array_equal(data[2:4], decode_utf8_strings(offsets[2:5], buffer[6:], 'U'))
+
+        data = np.array([b'ab', b'', b'\x00x', b'xyz'])
+        offsets, buffer = encode_utf8_strings(data)
+        self.assertEqual(b'ab\x00xxyz', buffer.tobytes())
+        np.testing.assert_array_equal(data, decode_utf8_strings(offsets, buffer, 'S'))
+
+        offsets, buffer = encode_utf8_strings(np.array(['', '']))
+        np.testing.assert_array_equal([0, 0, 0], offsets)
+        np.testing.assert_array_equal(['', ''], decode_utf8_strings(offsets, buffer, 'U'))
+        return
+
 if __name__ == '__main__':
     unittest.main()
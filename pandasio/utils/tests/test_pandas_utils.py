@@ -1,7 +1,12 @@
 import unittest
 import numpy as np
-from pandasio.utils.pandas_utils import parse_pandas_dtype
-from pandasio.utils.exceptions import InvalidPandasDataTypeError
+from pandasio.utils.pandas_utils import parse_pandas_dtype, dataframe_from_arrays, get_index_level_names,\
+    pandas_values_to_numpy, is_supported_pandas_dtype, is_default_range_index
+from pandasio.utils.exceptions import InvalidPandasDataTypeError, InvalidPandasIndexError
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
 
 
 class TestPandasUtils(unittest.TestCase):
@@ -55,7 +60,96 @@ class TestPandasUtils(unittest.TestCase):
         with self.assertRaises(InvalidPandasDataTypeError):
             parse_pandas_dtype('really not a dtype')
         with self.assertRaises(InvalidPandasDataTypeError):
-            parse_pandas_dtype('datetime64[s]')
+            parse_pandas_dtype('datetime64[Y]')
+        return
+
+    def test_parse_pandas_dtype_datetime(self):
+        self.assertEqual((8, 'M'), parse_pandas_dtype('datetime64[s]'))
+        self.assertEqual((8, 'm'), parse_pandas_dtype(np.dtype('timedelta64[ns]')))
+        self.assertEqual((4, 'U'), parse_pandas_dtype('<U12'))
+        self.assertEqual((1, 'S'), parse_pandas_dtype('S3'))
+        return
+
+    @unittest.skipIf(pd is None, 'pandas is not installed')
+    def test_pandas_values_to_numpy(self):
+        values = pandas_values_to_numpy(pd.Series(['a', 'bcd']))
+        self.assertEqual(np.dtype('<U3'), values.dtype)
+        np.testing.assert_array_equal(['a', 'bcd'], values)
+        self.assertEqual(np.int64, pandas_values_to_numpy(pd.Index([1, 2])).dtype)
+        values = pandas_values_to_numpy(pd.Series(['a', None]))
+        self.assertIsInstance(values, np.ma.MaskedArray)
+        np.testing.assert_array_equal([False, True], values.mask)
+        self.assertEqual('a', values[0])
+        values = pandas_values_to_numpy(pd.Series([1, None, 3], dtype='Int32'))
+        self.assertEqual(np.int32, values.dtype)
+        np.testing.assert_array_equal([False, True, False], values.mask)
+        np.testing.assert_array_equal([1, 3], values.compressed())
+        self.assertNotIsInstance(pandas_values_to_numpy(pd.Series([1, 2], dtype='Int32')), np.ma.MaskedArray)
+        values = pandas_values_to_numpy(pd.Series([1.5, None], dtype='Float64'))
+        self.assertEqual(np.float64, values.dtype)
+        self.assertTrue(np.isnan(values[1]))
+        return
+
+    @unittest.skipIf(pd is None, 'pandas is not installed')
+    def test_dataframe_from_arrays(self):
+        a = np.arange(5, dtype=np.float64)
+        b = np.arange(5, dtype=np.int64)
+        c = a * 2
+        frame = dataframe_from_arrays([('a', a), ('b', b), ('c', c)], [('t', b * 10)], 5)
+        self.assertEqual(['a', 'b', 'c'], list(frame.columns))
+        self.assertEqual(2, len(frame._mgr.blocks))
+        np.testing.assert_array_equal(c, frame['c'].to_numpy())
+        np.testing.assert_array_equal(b * 10, frame.index.to_numpy())
+        self.assertFalse(np.shares_memory(b, frame['b'].to_numpy()))
+
+        frame = dataframe_from_arrays([('a', a), ('b', b), ('c', c)], [], 5, copy=False)
+        self.assertTrue(np.shares_memory(b, frame['b'].to_numpy()))
+        self.assertIsInstance(frame.index, pd.RangeIndex)
+
+        frame = dataframe_from_arrays([], [('x', a), ('y', b)], 5)
+        self.assertEqual(['x', 'y'], list(frame.index.names))
+        self.assertEqual(0, len(frame.columns))
+
+        mask = np.array([False, True, False, False, True])
+        frame = dataframe_from_arrays([('a', a), ('b', np.ma.MaskedArray(b, mask=mask)),
+                                       ('s', np.ma.MaskedArray(np.array(['v'] * 5), mask=mask))], [], 5)
+        self.assertEqual(['a', 'b', 's'], list(frame.columns))
+        self.assertEqual('Int64', str(frame['b'].dtype))
+        np.testing.assert_array_equal(mask, frame['b'].isna().to_numpy())
+        np.testing.assert_array_equal(mask, frame['s'].isna().to_numpy())
+        self.assertEqual(3, frame['b'].iloc[3])
+        return
+
+    @unittest.skipIf(pd is None, 'pandas is not installed')
+    def test_get_index_level_names(self):
+        self.assertEqual(['index'], get_index_level_names(pd.RangeIndex(3)))
+        self.assertEqual(['t'], get_index_level_names(pd.Index([1, 2], name='t')))
+        index = pd.MultiIndex.from_arrays([[1, 2], [3, 4]], names=[None, 'b'])
+        self.assertEqual(['level_0', 'b'], get_index_level_names(index))
+        with self.assertRaises(InvalidPandasIndexError):
+            get_index_level_names(pd.MultiIndex.from_arrays([[1, 2], [3, 4]], names=['level_1', None]))
+
+    @unittest.skipIf(pd is None, 'pandas is not installed')
+    def test_is_supported_pandas_dtype(self):
+        for values in [pd.Series([1, 2]), pd.Series([1.5, 2.5], dtype=np.float32), pd.Series(['a', None]),
+                       pd.Series(['a', 'b'], dtype=object), pd.Series([1, None], dtype='Int64'),
+                       pd.Series(pd.date_range('2024-01-01', periods=2)), pd.Index(pd.to_timedelta([1, 2], 's'))]:
+            self.assertTrue(is_supported_pandas_dtype(values))
+        for values in [pd.Series([True, False]), pd.Series([True, None], dtype='boolean'),
+                       pd.Series(['a', 'b'], dtype='category'), pd.Series([1, 2], dtype='category'),
+                       pd.Series(pd.date_range('2024-01-01', periods=2, tz='UTC')), pd.Series([{'a': 1}, 2]),
+                       pd.Series([1 + 2j])]:
+            self.assertFalse(is_supported_pandas_dtype(values))
+        return
+
+    @unittest.skipIf(pd is None, 'pandas is not installed')
+    def test_is_default_range_index(self):
+        self.assertTrue(is_default_range_index(pd.RangeIndex(3)))
+        self.assertTrue(is_default_range_index(pd.DataFrame({'a': []}).index))
+        self.assertFalse(is_default_range_index(pd.RangeIndex(1, 4)))
+        self.assertFalse(is_default_range_index(pd.RangeIndex(3, name='a')))
+        self.assertFalse(is_default_range_index(pd.Index([0, 1, 2])))
+        return
 
 if __name__ == '__main__':
     unittest.main()
@@ -7,6 +7,7 @@ echo ""
 coverage erase
 
 coverage run -a --omit "venv/*" -m pandasio.utils.tests.test_binary
+coverage run -a --omit "venv/*" -m pandasio.utils.tests.test_block_compression
 coverage run -a --omit "venv/*" -m pandasio.utils.tests.test_datetime_utils
 coverage run -a --omit "venv/*" -m pandasio.utils.tests.test_numpy_compression
 coverage run -a --omit "venv/*" -m pandasio.utils.tests.test_numpy_decompression
@@ -18,6 +19,7 @@ coverage run -a --omit "venv/*" -m pandasio.utils.tests.test_validation
 
 coverage run -a --omit "venv/*" -m pandasio.tests.test_pandabar
 coverage run -a --omit "venv/*" -m pandasio.tests.test_pandabar_details_bytes
+coverage run -a --omit "venv/*" -m pandasio.tests.test_pandacage
 
 report_coverage=false
 include_missing=false